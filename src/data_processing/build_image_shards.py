@@ -0,0 +1,177 @@
+# In src/data_processing/build_image_shards.py
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import math
+import os
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+from split_files import list_split_images
+
+# Must match SHARD_INDEX_VERSION in src/training/sharded_dataset.py
+SHARD_INDEX_VERSION = 1
+SHARD_INDEX_NAME = "shard_index.json"
+
+
+def _decode_and_resize(args):
+    """
+    Worker: decodes one image and resizes its long side to `imgsz`, the same
+    resize Ultralytics applies before letterboxing (aspect ratio kept).
+    """
+    img_path, imgsz = args
+    im = cv2.imread(str(img_path))
+    if im is None:
+        return None
+    h0, w0 = im.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+        im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+    return im, (h0, w0)
+
+
+def _signature(img_path: Path) -> list:
+    stat = img_path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def build_split_shards(images, shard_dir: Path, split: str, imgsz: int, shard_size: int, workers: int):
+    """
+    Decodes and resizes the images of one split into fixed-size uint8 shards.
+
+    Each shard is a (count, imgsz, imgsz, 3) .npy array that np.load can
+    memory-map; every frame sits in the top-left corner of its slot, and the
+    index records its resized and original height and width, so the label
+    coordinates (normalised to the original image) stay valid.
+
+    Returns:
+        tuple[list[dict], dict]: The shard descriptions and the per-image index entries.
+    """
+    shards, entries = [], {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for shard_id, start in enumerate(range(0, len(images), shard_size)):
+            chunk = images[start : start + shard_size]
+            shard_file = f"{split}_{shard_id:05d}.npy"
+            shard = np.lib.format.open_memmap(
+                shard_dir / shard_file, mode="w+", dtype=np.uint8, shape=(len(chunk), imgsz, imgsz, 3)
+            )
+            decoded = pool.map(_decode_and_resize, [(p, imgsz) for p in chunk], chunksize=16)
+            for slot, (img_path, result) in enumerate(
+                tqdm(zip(chunk, decoded), total=len(chunk), desc=f"{split} shard {shard_id}")
+            ):
+                if result is None:
+                    print(f"  ⚠️ Could not decode {img_path}; it will be read from disk.")
+                    continue
+                im, (h0, w0) = result
+                h, w = im.shape[:2]
+                shard[slot, :h, :w] = im
+                entries[str(Path(img_path).resolve())] = {
+                    "shard": shard_file,
+                    "slot": slot,
+                    "shape": [h, w],
+                    "orig_shape": [h0, w0],
+                    "signature": _signature(img_path),
+                }
+            shard.flush()
+            del shard
+            shards.append({"file": shard_file, "count": len(chunk)})
+    return shards, entries
+
+
+def build_image_shards(dataset_name: str, splits, imgsz: int, shard_size: int, workers: int = None):
+    """
+    Pre-decodes the frames of a generated dataset into memory-mapped shards at
+    the training image size, so training reads small uint8 arrays instead of
+    decoding full-resolution PNGs every epoch. Splits whose images are
+    unchanged since the last build are skipped.
+
+    Args:
+        dataset_name (str): Dataset folder under data/ (e.g. 'final_dataset').
+        splits (list[str]): Splits to shard (usually 'train' and 'val').
+        imgsz (int): Training image size (must match imgsz= of model.train).
+        shard_size (int): Frames per shard file.
+        workers (int): Decoding processes (default: all cores).
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    dataset_path = project_root / "data" / dataset_name
+    shard_dir = dataset_path / f"shards_{imgsz}"
+    index_path = shard_dir / SHARD_INDEX_NAME
+    workers = workers or os.cpu_count() or 1
+
+    yaml_files = list(dataset_path.glob("*.yaml"))
+    if not yaml_files:
+        print(f"❌ ERROR: No dataset YAML found in {dataset_path}")
+        return
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    index = {"version": SHARD_INDEX_VERSION, "imgsz": imgsz, "splits": {}, "images": {}}
+    if index_path.exists():
+        with open(index_path, "r") as f:
+            previous = json.load(f)
+        if previous.get("version") == SHARD_INDEX_VERSION and previous.get("imgsz") == imgsz:
+            index = previous
+
+    # 2. Shard each split that changed
+    for split in splits:
+        images = list_split_images(dataset_path, split)
+        if not images:
+            print(f"⚠️ WARNING: No images found for split '{split}'. Skipping.")
+            continue
+
+        current = index["splits"].get(split, {})
+        unchanged = len(current.get("images", [])) == len(images) and all(
+            index["images"].get(str(p.resolve()), {}).get("signature") == _signature(p) for p in images
+        )
+        if unchanged:
+            print(f"  ♻️ '{split}' shards are up to date ({len(images)} frames).")
+            continue
+
+        print(f"--- Sharding '{split}': {len(images)} frames at {imgsz}px ---")
+        for old in current.get("shards", []):
+            (shard_dir / old["file"]).unlink(missing_ok=True)
+        for key in current.get("images", []):
+            index["images"].pop(key, None)
+
+        shards, entries = build_split_shards(images, shard_dir, split, imgsz, shard_size, workers)
+        index["splits"][split] = {"shards": shards, "images": list(entries)}
+        index["images"].update(entries)
+
+        # Save after every split so an interrupted build keeps finished splits
+        tmp_path = index_path.with_name(index_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        tmp_path.replace(index_path)
+
+    size_gb = sum(p.stat().st_size for p in shard_dir.glob("*.npy")) / 1e9
+    print(f"\n✅ Shards ready in {shard_dir} ({size_gb:.1f} GB).")
+    print("   Train with them using the --shards flag of the training scripts.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pre-decode dataset frames into memory-mapped uint8 shards for training."
+    )
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        default="final_dataset",
+        help="Dataset folder under data/ (e.g. final_dataset or balanced_dataset).",
+    )
+    parser.add_argument("--splits", type=str, nargs="+", default=["train", "val"], help="Splits to shard.")
+    parser.add_argument("--imgsz", type=int, default=640, help="Training image size.")
+    parser.add_argument("--shard-size", type=int, default=1024, help="Frames per shard file.")
+    parser.add_argument("--workers", type=int, default=None, help="Decoding processes (default: all cores).")
+
+    args = parser.parse_args()
+    build_image_shards(
+        dataset_name=args.dataset,
+        splits=args.splits,
+        imgsz=args.imgsz,
+        shard_size=args.shard_size,
+        workers=args.workers,
+    )
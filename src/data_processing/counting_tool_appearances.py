@@ -1,14 +1,161 @@
 # In src/data_processing/counting_tool_appearances.py
 
 from pathlib import Path
-from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import numpy as np
 from tqdm import tqdm
 
+from label_index import build_label_index
 
-def analyze_consolidated_dataset():
+# Longest class id (in digits) accepted by the bulk parser
+MAX_CLASS_DIGITS = 3
+_WHITESPACE = np.frombuffer(b" \t\r\n", dtype=np.uint8)
+
+
+def parse_class_column(buf: bytes) -> np.ndarray:
+    """
+    Extracts the leading integer (the class id) of every line in a YOLO
+    label file without splitting lines in Python. Lines that do not start
+    with an integer followed by whitespace are skipped.
+    """
+    data = np.frombuffer(buf, dtype=np.uint8)
+    if data.size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Start offset of every line
+    starts = np.concatenate(([0], np.flatnonzero(data == ord("\n")) + 1))
+    starts = starts[starts < data.size]
+
+    # Look at the first few characters of each line at once
+    width = MAX_CLASS_DIGITS + 1
+    padded = np.concatenate([data, np.full(width, ord(" "), dtype=np.uint8)])
+    window = padded[starts[:, None] + np.arange(width)]
+    is_digit = (window >= ord("0")) & (window <= ord("9"))
+
+    # Number of leading digits; the character after them must be whitespace
+    n_digits = np.argmin(is_digit, axis=1)
+    terminator = window[np.arange(len(starts)), n_digits]
+    valid = (n_digits > 0) & np.isin(terminator, _WHITESPACE)
+
+    digits = (window[valid, :MAX_CLASS_DIGITS].astype(np.int64) - ord("0"))
+    n_digits = n_digits[valid]
+    positions = np.arange(MAX_CLASS_DIGITS)
+    powers = n_digits[:, None] - 1 - positions
+    digits = np.where(powers >= 0, digits, 0) * 10 ** np.clip(powers, 0, None)
+    return digits.sum(axis=1)
+
+
+def _count_chunk(args):
+    """Worker: builds the (videos x classes) count matrix for one chunk of files."""
+    label_files, video_ids, num_videos, num_classes = args
+
+    class_chunks = []
+    lengths = np.empty(len(label_files), dtype=np.int64)
+    for i, label_file in enumerate(label_files):
+        with open(label_file, "rb") as f:
+            class_ids = parse_class_column(f.read())
+        class_chunks.append(class_ids)
+        lengths[i] = len(class_ids)
+
+    if not class_chunks:
+        return np.zeros((num_videos, num_classes), dtype=np.int64)
+
+    class_ids = np.concatenate(class_chunks)
+    row_videos = np.repeat(np.asarray(video_ids, dtype=np.int64), lengths)
+    valid = class_ids < num_classes
+    flat = row_videos[valid] * num_classes + class_ids[valid]
+    counts = np.bincount(flat, minlength=num_videos * num_classes)
+    return counts.reshape(num_videos, num_classes)
+
+
+def scan_video_class_counts(label_files, num_classes: int, workers: int = None):
+    """
+    Counts tool instances per video by scanning the label files in parallel.
+
+    Args:
+        label_files (list[Path]): The YOLO .txt label files to scan.
+        num_classes (int): Number of classes (columns of the result).
+        workers (int): Number of worker processes (default: all cores).
+
+    Returns:
+        tuple[list[str], np.ndarray]: Video names and the (videos x classes) matrix.
+    """
+    workers = workers or os.cpu_count() or 1
+    label_files = [str(f) for f in label_files]
+
+    video_names = sorted({Path(f).stem.split("_")[0] for f in label_files})
+    video_to_id = {name: i for i, name in enumerate(video_names)}
+    video_ids = [video_to_id[Path(f).stem.split("_")[0]] for f in label_files]
+
+    # Several chunks per worker keeps the pool busy when file sizes vary
+    num_chunks = max(1, min(len(label_files), workers * 4))
+    bounds = np.linspace(0, len(label_files), num_chunks + 1).astype(int)
+    jobs = [
+        (label_files[a:b], video_ids[a:b], len(video_names), num_classes)
+        for a, b in zip(bounds[:-1], bounds[1:])
+    ]
+
+    counts = np.zeros((len(video_names), num_classes), dtype=np.int64)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_counts in tqdm(
+            pool.map(_count_chunk, jobs), total=len(jobs), desc=f"Scanning ({workers} workers)"
+        ):
+            counts += chunk_counts
+
+    return video_names, counts
+
+
+def print_tool_report(video_names, counts: np.ndarray, class_id_to_name: dict):
+    """
+    Prints the per-video and grand total tool instance report.
+
+    Args:
+        video_names (list[str]): Video names, one per row of `counts`.
+        counts (np.ndarray): A (videos x classes) instance count matrix.
+        class_id_to_name (dict): Maps class ids (matrix columns) to tool names.
+    """
+    print("\n\n--- Tool Instance Report for Consolidated 25 Videos ---")
+
+    # Per-Video Breakdown
+    order = sorted(range(len(video_names)), key=lambda i: int(video_names[i].replace("VID", "")))
+
+    for row in order:
+        video_counts = counts[row]
+        total_in_video = int(video_counts.sum())
+        print(f"\n--- Report for {video_names[row]} (Total: {total_in_video} instances) ---")
+        if total_in_video == 0:
+            print("  No tools found.")
+            continue
+        for class_id in np.argsort(-video_counts, kind="stable"):
+            if video_counts[class_id] == 0:
+                break
+            tool_name = class_id_to_name[int(class_id)]
+            print(f"  - {tool_name:<12}: {video_counts[class_id]:>6} instances")
+
+    # Grand Total Summary
+    grand_total_counts = counts.sum(axis=0)
+    grand_total = int(grand_total_counts.sum())
+    print(f"\n\n--- Grand Total Summary (Total: {grand_total} instances) ---")
+    for class_id in np.argsort(-grand_total_counts, kind="stable"):
+        count = grand_total_counts[class_id]
+        if count == 0:
+            break
+        percentage = (count / grand_total) * 100
+        tool_name = class_id_to_name[int(class_id)]
+        print(f"  - {tool_name:<12}: {count:>6} instances ({percentage:5.2f}%)")
+
+
+def analyze_consolidated_dataset(fast_scan: bool = False, workers: int = None):
     """
     Scans the consolidated 25-video dataset to count tool instances,
     with corrected path logic to work from within 'src/data_processing'.
+
+    Args:
+        fast_scan (bool): Re-scan all label files with a process pool instead
+            of reading the persistent label index.
+        workers (int): Number of worker processes for the fast scan.
     """
     # 1. Configuration
     # --- THE FIX: Go up three levels instead of two to find the project root ---
@@ -36,10 +183,7 @@ def analyze_consolidated_dataset():
         print("       Please ensure the path is correct and the data exists.")
         return
 
-    # 2. Data Structures
-    video_counts = {}
-    grand_total_counts = Counter()
-
+    # 2. Collect the label files
     print(f"Scanning for label files in: {labels_base_path}")
     all_label_files = list(labels_base_path.glob("*.txt"))
 
@@ -47,47 +191,18 @@ def analyze_consolidated_dataset():
         print("❌ ERROR: No .txt label files were found.")
         return
 
-    for label_file in tqdm(all_label_files, desc="Analyzing label files"):
-        video_name = label_file.stem.split("_")[0]
+    # 3. Count instances per video and class with a single bincount
+    if fast_scan:
+        video_names, counts = scan_video_class_counts(
+            all_label_files, num_classes=len(CLASS_ID_TO_NAME), workers=workers
+        )
+    else:
+        index = build_label_index(all_label_files, labels_base_path.parent / "label_index.npz")
+        video_names = list(index.videos)
+        counts = index.video_class_counts(num_classes=len(CLASS_ID_TO_NAME))
 
-        if video_name not in video_counts:
-            video_counts[video_name] = Counter()
-
-        with open(label_file, "r") as f:
-            for line in f:
-                try:
-                    class_id = int(line.split()[0])
-                    if class_id in CLASS_ID_TO_NAME:
-                        class_name = CLASS_ID_TO_NAME[class_id]
-                        video_counts[video_name][class_name] += 1
-                        grand_total_counts[class_name] += 1
-                except (ValueError, IndexError):
-                    continue
-
-    # 3. Generate and Print the Report
-    print("\n\n--- Tool Instance Report for Consolidated 25 Videos ---")
-
-    # Per-Video Breakdown
-    sorted_video_names = sorted(
-        video_counts.keys(), key=lambda v: int(v.replace("VID", ""))
-    )
-
-    for video_name in sorted_video_names:
-        counts = video_counts[video_name]
-        total_in_video = sum(counts.values())
-        print(f"\n--- Report for {video_name} (Total: {total_in_video} instances) ---")
-        if not counts:
-            print("  No tools found.")
-            continue
-        for tool_name, count in counts.most_common():
-            print(f"  - {tool_name:<12}: {count:>6} instances")
-
-    # Grand Total Summary
-    grand_total = sum(grand_total_counts.values())
-    print(f"\n\n--- Grand Total Summary (Total: {grand_total} instances) ---")
-    for tool_name, count in grand_total_counts.most_common():
-        percentage = (count / grand_total) * 100
-        print(f"  - {tool_name:<12}: {count:>6} instances ({percentage:5.2f}%)")
+    # 4. Generate and Print the Report
+    print_tool_report(video_names, counts, CLASS_ID_TO_NAME)
 
     print(
         "\n✅ Analysis complete. Use this report to create your strategic train/val/test split."
@@ -95,9 +210,25 @@ def analyze_consolidated_dataset():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Count tool instances in the consolidated dataset."
+    )
+    parser.add_argument(
+        "--fast-scan",
+        action="store_true",
+        help="Re-scan every label file with a process pool instead of using the label index.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes for --fast-scan (default: all cores).",
+    )
+    args = parser.parse_args()
+
     try:
         from tqdm import tqdm
     except ImportError:
         print("Please install tqdm for a progress bar: pip install tqdm")
     finally:
-        analyze_consolidated_dataset()
+        analyze_consolidated_dataset(fast_scan=args.fast_scan, workers=args.workers)
@@ -3,15 +3,41 @@
 import shutil
 from pathlib import Path
 from tqdm import tqdm
+import argparse
 import yaml
-from collections import Counter
-import random
 
-def create_balanced_dataset():
+from label_index import build_label_index
+from split_files import (
+    LINK_MODES,
+    image_to_label_path,
+    list_split_images,
+    place_file,
+    place_split_images,
+    write_image_list,
+)
+from undersampling import select_balanced_frames
+
+def class_count(value: str):
+    """argparse type for a per-class override written as 'CLASS=N', e.g. 'Grasper=3000'."""
+    name, sep, count = value.rpartition('=')
+    if not sep or not name or not count.isdigit():
+        raise argparse.ArgumentTypeError(f"expected CLASS=N with N >= 0, got {value!r}")
+    return name, int(count)
+
+def create_balanced_dataset(link_mode: str = 'copy', seed: int = 0, class_ceilings=None, class_floors=None):
     """
     Creates a new, more balanced dataset from the final_dataset.
     - Copies val and test sets directly.
     - Undersamples the training set by enforcing a max instance count per class.
+
+    Args:
+        link_mode (str): How files are placed in the new dataset: 'copy', 'hardlink',
+            'symlink', or 'manifest' (image list files pointing at the originals).
+        seed (int): Seed for the frame selection, so a split can be reproduced.
+        class_ceilings (dict): Per-class instance ceilings, e.g. {'Grasper': 3000},
+            overriding INSTANCE_CEILING.
+        class_floors (dict): Per-class instance minimums for rare classes. Floors
+            take priority over ceilings.
     """
     # 1. Configuration
     project_root = Path(__file__).resolve().parent.parent.parent
@@ -19,80 +45,88 @@ def create_balanced_dataset():
     output_path = project_root / 'data' / 'balanced_dataset'
     
     CLASS_NAMES = ['Grasper', 'Bipolar', 'Hook', 'Scissors', 'Clipper', 'Irrigator', 'Spec.bag']
-    CLASS_ID_TO_NAME = {i: name for i, name in enumerate(CLASS_NAMES)}
     
     # This is the maximum number of instances any single class can have in the new training set.
     # Set this value based on your analysis to control the level of undersampling.
     # A good starting point is just above the count of your 3rd or 4th most common class.
     INSTANCE_CEILING = 4000
 
+    class_ceilings = dict(class_ceilings or {})
+    class_floors = dict(class_floors or {})
+    unknown = sorted((set(class_ceilings) | set(class_floors)) - set(CLASS_NAMES))
+    if unknown:
+        raise ValueError(f"Unknown classes {unknown}; expected one of {CLASS_NAMES}")
+
     # 2. Setup Directories
     print(f"Creating balanced dataset folder at: {output_path}")
     if output_path.exists(): shutil.rmtree(output_path)
-    for split in ['train', 'val', 'test']:
-        (output_path / 'images' / split).mkdir(parents=True, exist_ok=True)
-        (output_path / 'labels' / split).mkdir(parents=True, exist_ok=True)
+    output_path.mkdir(parents=True)
+    if link_mode != 'manifest':
+        for split in ['train', 'val', 'test']:
+            (output_path / 'images' / split).mkdir(parents=True, exist_ok=True)
+            (output_path / 'labels' / split).mkdir(parents=True, exist_ok=True)
 
     # 3. Copy Validation and Test sets directly without changes
-    print("Copying validation and test sets...")
+    # (the source may itself be a manifest-mode split, so resolve its image lists)
+    print(f"Copying validation and test sets (link mode: {link_mode})...")
     for split in ['val', 'test']:
-        shutil.copytree(source_path / 'images' / split, output_path / 'images' / split, dirs_exist_ok=True)
-        shutil.copytree(source_path / 'labels' / split, output_path / 'labels' / split, dirs_exist_ok=True)
+        place_split_images(list_split_images(source_path, split), output_path, split, link_mode)
     print("Validation and test sets copied.")
 
     # 4. Create the new, undersampled training set
     print(f"\nCreating new training set with an instance ceiling of {INSTANCE_CEILING} per class...")
-    source_train_labels = list((source_path / 'labels' / 'train').glob('*.txt'))
-    
-    # Shuffle the list to ensure the selection is random
-    random.shuffle(source_train_labels)
-    
-    class_counts = Counter()
+    train_images = {img_path.stem: img_path for img_path in list_split_images(source_path, 'train')}
+    source_train_labels = [
+        label_path
+        for label_path in (image_to_label_path(p) for p in train_images.values())
+        if label_path.exists()
+    ]
+
+    # Parse the training labels once into the persistent index and get a
+    # (frames x classes) instance matrix instead of re-reading every file
+    index = build_label_index(source_train_labels, source_path / 'label_index_train.npz')
+    frame_counts = index.frame_class_counts(num_classes=len(CLASS_NAMES))
+
+    # Select frames on the count matrix: rarest classes are visited first,
+    # so common classes hitting their ceiling no longer crowd out rare ones
+    ceilings = [class_ceilings.get(name, INSTANCE_CEILING) for name in CLASS_NAMES]
+    floors = [class_floors.get(name, 0) for name in CLASS_NAMES]
+    selected_frames = select_balanced_frames(frame_counts, ceilings, floors=floors, seed=seed)
+    class_counts = frame_counts[selected_frames].sum(axis=0)
+
     frames_copied = 0
-    
-    for label_path in tqdm(source_train_labels, desc="Undersampling training set"):
-        # First, check what classes are in this frame
-        classes_in_frame = Counter()
-        with open(label_path, 'r') as f:
-            for line in f:
-                try:
-                    class_id = int(line.split()[0])
-                    classes_in_frame[CLASS_ID_TO_NAME[class_id]] += 1
-                except (ValueError, IndexError):
-                    continue
-
-        # Decide if we can add this frame
-        can_add_frame = True
-        for class_name, count in classes_in_frame.items():
-            if class_counts[class_name] + count > INSTANCE_CEILING:
-                can_add_frame = False
-                break
-        
-        # If we can add it, copy the files and update the counts
-        if can_add_frame:
-            # Update main counter
-            class_counts.update(classes_in_frame)
-            
-            # Copy image file
-            img_path = source_path / 'images' / 'train' / f"{label_path.stem}.png"
-            if img_path.exists():
-                shutil.copy(img_path, output_path / 'images' / 'train' / img_path.name)
-                # Copy label file
-                shutil.copy(label_path, output_path / 'labels' / 'train' / label_path.name)
-                frames_copied += 1
+    selected_images = []
+
+    for frame in tqdm(selected_frames, desc="Undersampling training set"):
+        # Copy image file
+        label_path = Path(index.files[frame])
+        img_path = train_images[label_path.stem]
+        if link_mode == 'manifest':
+            selected_images.append(img_path)
+            frames_copied += 1
+        elif img_path.exists():
+            place_file(img_path, output_path / 'images' / 'train' / img_path.name, link_mode)
+            # Copy label file
+            place_file(label_path, output_path / 'labels' / 'train' / label_path.name, link_mode)
+            frames_copied += 1
+
+    if link_mode == 'manifest':
+        write_image_list(output_path / 'train.txt', sorted(selected_images))
 
     print(f"\nUndersampling complete. Created a new training set with {frames_copied} images.")
     print("Final training set instance counts:")
-    for name in CLASS_NAMES:
-        print(f"  - {name:<12}: {class_counts[name]}")
+    for class_id, name in enumerate(CLASS_NAMES):
+        print(f"  - {name:<12}: {class_counts[class_id]}")
 
     # 5. Create the YAML file for the new balanced dataset
     print("\nCreating 'balanced_dataset.yaml' file...")
+    if link_mode == 'manifest':
+        splits = {split: f'{split}.txt' for split in ['train', 'val', 'test']}
+    else:
+        splits = {split: f'images/{split}' for split in ['train', 'val', 'test']}
     yaml_data = {
         'path': str(output_path.resolve()),
-        'train': 'images/train',
-        'val': 'images/val',
-        'test': 'images/test',
+        **splits,
         'names': CLASS_NAMES
     }
     yaml_filepath = output_path / 'balanced_dataset.yaml'
@@ -102,4 +136,41 @@ def create_balanced_dataset():
     print("✅ Balanced dataset is ready for training.")
 
 if __name__ == '__main__':
-    create_balanced_dataset()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create an undersampled, class-balanced dataset.")
+    parser.add_argument(
+        '--link-mode',
+        type=str,
+        default='copy',
+        choices=LINK_MODES,
+        help="How dataset files are created: full copies, hard links, symlinks, or "
+             "image list files ('manifest') that reference the final_dataset originals."
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help="Random seed for the frame selection (the same seed reproduces the same split)."
+    )
+    parser.add_argument(
+        '--ceiling',
+        type=class_count,
+        action='append',
+        default=[],
+        metavar='CLASS=N',
+        help="Per-class instance ceiling overriding the default of 4000 (repeatable), e.g. --ceiling Grasper=3000."
+    )
+    parser.add_argument(
+        '--floor',
+        type=class_count,
+        action='append',
+        default=[],
+        metavar='CLASS=N',
+        help="Minimum instances kept for a class (repeatable); floors take priority over ceilings."
+    )
+    args = parser.parse_args()
+    create_balanced_dataset(
+        link_mode=args.link_mode,
+        seed=args.seed,
+        class_ceilings=dict(args.ceiling),
+        class_floors=dict(args.floor),
+    )
\ No newline at end of file
@@ -0,0 +1,249 @@
+# In src/data_processing/create_dedup_split.py
+
+import shutil
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import yaml
+from tqdm import tqdm
+
+from create_final_split import CLASS_NAMES
+from label_index import build_label_index
+from near_duplicates import cluster_near_duplicates, perceptual_hash, select_representatives
+from split_files import (
+    LINK_MODES,
+    image_to_label_path,
+    list_split_images,
+    place_split_images,
+    write_text_if_changed,
+)
+
+HASH_INDEX_VERSION = 1
+
+
+def _frame_order_key(img_path: Path):
+    """Sorts frames by video, then by their trailing frame counter ('VID01_000123')."""
+    video, _, counter = img_path.stem.rpartition("_")
+    return (video, int(counter)) if video and counter.isdigit() else (img_path.stem, -1)
+
+
+def build_hash_index(image_paths, index_path: Path, workers: int) -> np.ndarray:
+    """
+    Perceptual hashes of `image_paths`, computed in parallel. Hashes of
+    images whose size and mtime are unchanged are reused from the saved
+    index, so trying other thresholds does not read the images again.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (images x 8) packed hashes in the order of
+            `image_paths`, and a mask of the images that could be read.
+    """
+    files = [str(p) for p in image_paths]
+    stats = [p.stat() for p in image_paths]
+    sizes = np.asarray([s.st_size for s in stats], dtype=np.int64)
+    mtimes = np.asarray([s.st_mtime_ns for s in stats], dtype=np.int64)
+
+    cached = {}
+    if index_path.exists():
+        with np.load(index_path, allow_pickle=False) as data:
+            if int(data["version"]) == HASH_INDEX_VERSION:
+                for i, name in enumerate(data["files"]):
+                    cached[str(name)] = (int(data["sizes"][i]), int(data["mtimes"][i]), data["hashes"][i])
+
+    hashes = np.zeros((len(files), 8), dtype=np.uint8)
+    valid = np.ones(len(files), dtype=bool)
+    todo = []
+    for i, name in enumerate(files):
+        entry = cached.get(name)
+        if entry is not None and entry[0] == sizes[i] and entry[1] == mtimes[i]:
+            hashes[i] = entry[2]
+        else:
+            todo.append(i)
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(perceptual_hash, [files[i] for i in todo], chunksize=64)
+            for i, result in zip(todo, tqdm(results, total=len(todo), desc="Hashing frames")):
+                if result is None:
+                    valid[i] = False
+                else:
+                    hashes[i] = result
+
+        arrays = {
+            "version": np.asarray(HASH_INDEX_VERSION),
+            "files": np.asarray(files, dtype=str)[valid],
+            "sizes": sizes[valid],
+            "mtimes": mtimes[valid],
+            "hashes": hashes[valid],
+        }
+        tmp_path = index_path.with_name(index_path.name + ".tmp.npz")
+        np.savez(tmp_path, **arrays)
+        tmp_path.replace(index_path)
+
+    print(f"Hash index: {len(files)} frames, {len(todo)} hashed -> {index_path.name}")
+    return hashes, valid
+
+
+def create_dedup_dataset(
+    dataset_name: str = "final_dataset",
+    max_distance: int = 8,
+    min_class_ratio: float = 1.0,
+    link_mode: str = "manifest",
+    workers: int = None,
+):
+    """
+    Creates a copy of a dataset whose training set keeps one frame per group
+    of near-duplicate frames. Training frames are hashed in parallel
+    (perceptual hash) and clustered within each video, only among frames with
+    the same instances per class; every cluster keeps its first frame. Classes
+    that lose a larger share of their instances than the set as a whole are
+    topped up with the most distinct remaining frames. Val and test are kept
+    unchanged, so scores stay comparable.
+
+    Args:
+        dataset_name (str): Dataset folder under data/ to deduplicate (e.g. 'final_dataset').
+        max_distance (int): Largest perceptual-hash distance (of 64 bits) between
+            a frame and the first frame of its cluster.
+        min_class_ratio (float): Each class keeps at least this multiple of the
+            overall share of instances kept (0 disables the top-up).
+        link_mode (str): How files are placed in the new dataset: 'copy', 'hardlink',
+            'symlink', or 'manifest' (image list files pointing at the originals).
+        workers (int): Hashing processes (default: all cores).
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    source_path = project_root / "data" / dataset_name
+    output_name = f"{dataset_name}_dedup"
+    output_path = project_root / "data" / output_name
+    workers = workers or os.cpu_count() or 1
+
+    train_images = sorted(list_split_images(source_path, "train"), key=_frame_order_key)
+    if not train_images:
+        print(f"❌ ERROR: No training images found in {source_path}")
+        return
+
+    # 2. Setup Directories
+    print(f"Creating deduplicated dataset folder at: {output_path}")
+    if output_path.exists():
+        shutil.rmtree(output_path)
+    output_path.mkdir(parents=True)
+
+    # 3. Val and test are placed unchanged
+    print(f"Placing validation and test sets (link mode: {link_mode})...")
+    for split in ["val", "test"]:
+        place_split_images(list_split_images(source_path, split), output_path, split, link_mode)
+
+    # 4. Hash the training frames and count their instances per class
+    hashes, readable = build_hash_index(train_images, source_path / "hash_index_train.npz", workers)
+    if not readable.all():
+        print(f"⚠️ WARNING: {int((~readable).sum())} training images could not be read and are left out.")
+
+    label_paths = [image_to_label_path(p) for p in train_images]
+    index = build_label_index([p for p in label_paths if p.exists()], source_path / "label_index_train.npz")
+    index_counts = index.frame_class_counts(num_classes=len(CLASS_NAMES))
+    frame_of_label = {Path(f).stem: i for i, f in enumerate(index.files)}
+    frame_counts = np.zeros((len(train_images), len(CLASS_NAMES)), dtype=np.int64)
+    for i, img_path in enumerate(train_images):
+        if img_path.stem in frame_of_label:
+            frame_counts[i] = index_counts[frame_of_label[img_path.stem]]
+
+    # 5. Cluster within each video, among frames with the same label contents
+    videos = np.asarray([img_path.stem.split("_")[0] for img_path in train_images])
+    _, video_ids = np.unique(videos, return_inverse=True)
+    _, groups = np.unique(np.column_stack([video_ids, frame_counts]), axis=0, return_inverse=True)
+    groups = groups.reshape(-1)
+    order = np.flatnonzero(readable)  # train_images is already in time order
+    print(f"\nClustering near-duplicates (max distance {max_distance} bits)...")
+    cluster, leaders, distance = cluster_near_duplicates(hashes, groups, order, max_distance)
+    kept = select_representatives(frame_counts[order], np.searchsorted(order, leaders), distance[order], min_class_ratio)
+    kept = order[kept]
+
+    # 6. Place the kept training frames and write the cluster report
+    kept_images = [train_images[i] for i in kept]
+    place_split_images(kept_images, output_path, "train", link_mode)
+
+    is_kept = np.zeros(len(train_images), dtype=bool)
+    is_kept[kept] = True
+    pd.DataFrame(
+        {
+            "image": [str(p) for p in train_images],
+            "video": videos,
+            "cluster": np.where(readable, cluster, -1),
+            "distance": np.where(readable, distance, -1),
+            "kept": is_kept,
+        }
+    ).to_csv(output_path / "dedup_clusters.csv", index=False)
+
+    # 7. Report the reduction
+    before_counts = frame_counts.sum(axis=0)
+    after_counts = frame_counts[kept].sum(axis=0)
+    before_bytes = sum(p.stat().st_size for p in train_images)
+    after_bytes = sum(p.stat().st_size for p in kept_images)
+    print(
+        f"\nDeduplication complete: {len(train_images)} -> {len(kept_images)} training frames "
+        f"({100 * (1 - len(kept_images) / len(train_images)):.1f}% smaller), "
+        f"{len(leaders)} clusters, {len(kept_images) - len(leaders)} top-up frames."
+    )
+    print(f"Training images on disk: {before_bytes / 1e9:.2f} GB -> {after_bytes / 1e9:.2f} GB")
+    print("Training set instance counts (before -> after):")
+    for class_id, name in enumerate(CLASS_NAMES):
+        share = after_counts[class_id] / max(before_counts[class_id], 1)
+        print(f"  - {name:<12}: {before_counts[class_id]:>7} -> {after_counts[class_id]:>7} ({100 * share:.1f}%)")
+
+    # 8. Create the YAML file for the deduplicated dataset
+    if link_mode == "manifest":
+        splits = {split: f"{split}.txt" for split in ["train", "val", "test"]}
+    else:
+        splits = {split: f"images/{split}" for split in ["train", "val", "test"]}
+    yaml_data = {
+        "path": str(output_path.resolve()),
+        **splits,
+        "names": CLASS_NAMES,
+    }
+    yaml_filepath = output_path / f"{output_name}.yaml"
+    write_text_if_changed(yaml_filepath, yaml.dump(yaml_data, sort_keys=False, default_flow_style=False))
+    print(f"\n✅ Deduplicated dataset is ready: {yaml_filepath}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create a dataset whose training set drops near-duplicate frames of the same video."
+    )
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        default="final_dataset",
+        help="Dataset folder under data/ to deduplicate (e.g. final_dataset or balanced_dataset).",
+    )
+    parser.add_argument(
+        "--max-distance",
+        type=int,
+        default=8,
+        help="Largest perceptual-hash distance (of 64 bits) for two frames to count as near-duplicates.",
+    )
+    parser.add_argument(
+        "--min-class-ratio",
+        type=float,
+        default=1.0,
+        help="Each class keeps at least this multiple of the overall share of instances kept (0 disables).",
+    )
+    parser.add_argument(
+        "--link-mode",
+        type=str,
+        default="manifest",
+        choices=LINK_MODES,
+        help="How dataset files are created: full copies, hard links, symlinks, or "
+        "image list files ('manifest') that reference the original files.",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Hashing processes (default: all cores).")
+
+    args = parser.parse_args()
+    create_dedup_dataset(
+        dataset_name=args.dataset,
+        max_distance=args.max_distance,
+        min_class_ratio=args.min_class_ratio,
+        link_mode=args.link_mode,
+        workers=args.workers,
+    )
@@ -3,69 +3,97 @@
 import shutil
 from pathlib import Path
 from tqdm import tqdm
+import argparse
 import yaml
 
-
-def create_final_dataset_split():
+from split_files import (
+    LINK_MODES,
+    file_signature,
+    image_to_label_path,
+    load_split_manifest,
+    save_split_manifest,
+    sync_split_files,
+    write_image_list,
+    write_text_if_changed,
+)
+
+
+CLASS_NAMES = [
+    "Grasper",
+    "Bipolar",
+    "Hook",
+    "Scissors",
+    "Clipper",
+    "Irrigator",
+    "Spec.bag",
+]
+
+# Whole videos go to one split, so no test video is ever seen in training
+SPLIT_MAP = {
+    "train": [
+        "VID01",
+        "VID02",
+        "VID06",
+        "VID07",
+        "VID11",
+        "VID17",
+        "VID23",
+        "VID31",
+        "VID39",
+        "VID68",
+        "VID74",
+        "VID92",
+    ],
+    "val": ["VID04", "VID37", "VID96"],
+    "test": [
+        "VID12",
+        "VID13",
+        "VID25",
+        "VID30",
+        "VID70",
+        "VID73",
+        "VID75",
+        "VID103",
+        "VID110",
+        "VID111",
+    ],
+}
+
+
+def create_final_dataset_split(
+    link_mode: str = "copy", clean: bool = False, use_hash: bool = False
+):
     """
     Splits the consolidated 25-video dataset into strategic train, val,
     and test sets with corrected file searching logic.
+
+    Args:
+        link_mode (str): How files are placed in the split: 'copy', 'hardlink',
+            'symlink', or 'manifest' (image list files pointing at the originals).
+        clean (bool): Wipe the output folder and rebuild it from scratch instead
+            of syncing only the files that changed since the last run.
+        use_hash (bool): Detect changed sources by content hash instead of size/mtime.
     """
     # 1. Configuration
     project_root = Path(__file__).resolve().parent.parent.parent
     source_path = project_root / "data" / "consolidate_25_videos"
     output_path = project_root / "data" / "final_dataset"
 
-    CLASS_NAMES = [
-        "Grasper",
-        "Bipolar",
-        "Hook",
-        "Scissors",
-        "Clipper",
-        "Irrigator",
-        "Spec.bag",
-    ]
-
-    SPLIT_MAP = {
-        "train": [
-            "VID01",
-            "VID02",
-            "VID06",
-            "VID07",
-            "VID11",
-            "VID17",
-            "VID23",
-            "VID31",
-            "VID39",
-            "VID68",
-            "VID74",
-            "VID92",
-        ],
-        "val": ["VID04", "VID37", "VID96"],
-        "test": [
-            "VID12",
-            "VID13",
-            "VID25",
-            "VID30",
-            "VID70",
-            "VID73",
-            "VID75",
-            "VID103",
-            "VID110",
-            "VID111",
-        ],
-    }
-
     # 2. Setup Directories
-    print(f"Creating final dataset folder at: {output_path}")
-    if output_path.exists():
+    # The output is synced incrementally against the manifest of the last run;
+    # it is only wiped on request or when the link mode changes.
+    manifest_path = output_path / "split_manifest.json"
+    previous = load_split_manifest(manifest_path)
+    if output_path.exists() and (clean or previous["link_mode"] != link_mode):
+        print(f"Rebuilding final dataset folder at: {output_path}")
         shutil.rmtree(output_path)
-    for split in ["train", "val", "test"]:
-        (output_path / "images" / split).mkdir(parents=True, exist_ok=True)
-        (output_path / "labels" / split).mkdir(parents=True, exist_ok=True)
+        previous = {"link_mode": None, "files": {}}
+    else:
+        print(f"Syncing final dataset folder at: {output_path}")
+    output_path.mkdir(parents=True, exist_ok=True)
     print("Directories created successfully.")
 
-    # 3. Copy files to their new destinations
+    # 3. Decide where every file belongs
     # --- THE FIX: Use a recursive glob pattern '**/*.png' to find all files ---
     print(f"Searching for images in {source_path / 'images'}...")
     source_images = list((source_path / "images").glob("**/*.png"))
@@ -84,9 +112,11 @@ def create_final_dataset_split():
 
     label_lookup = {f.stem: f for f in source_labels}
 
-    print("\nSplitting files into train/val/test sets...")
+    print(f"\nSplitting files into train/val/test sets (link mode: {link_mode})...")
     files_copied = 0
-    for img_path in tqdm(source_images, desc="Copying files"):
+    split_images = {split: [] for split in SPLIT_MAP}
+    desired = {}
+    for img_path in tqdm(source_images, desc="Checking files"):
         # The filename can be either VIDXX_... or just VIDXX. Handle both.
         try:
             video_name = img_path.stem.split("_")[0]
@@ -99,36 +129,92 @@ def create_final_dataset_split():
                 target_split = split
                 break
 
-        if target_split:
-            # Copy image file
-            shutil.copy(img_path, output_path / "images" / target_split / img_path.name)
-
-            # Copy corresponding label file if it exists
-            if img_path.stem in label_lookup:
-                label_path = label_lookup[img_path.stem]
-                shutil.copy(
-                    label_path, output_path / "labels" / target_split / label_path.name
-                )
-
-            files_copied += 1
+        if not target_split:
+            continue
+
+        split_images[target_split].append(img_path)
+        files_copied += 1
+
+        # Record the image and its label; in manifest mode Ultralytics finds the
+        # label by swapping 'images' for 'labels' in the path, so only list it
+        pairs = [(img_path, f"images/{target_split}/{img_path.name}")]
+        if img_path.stem in label_lookup:
+            label_path = label_lookup[img_path.stem]
+            pairs.append((label_path, f"labels/{target_split}/{label_path.name}"))
+        for source, target in pairs:
+            desired[target] = {
+                "source": str(source),
+                "split": target_split,
+                **file_signature(source, use_hash=use_hash),
+            }
+
+    # 4. Sync the split folders with the new assignment
+    if link_mode == "manifest":
+        for split, images in split_images.items():
+            if write_image_list(output_path / f"{split}.txt", sorted(images)):
+                print(f"  - Updated image list for '{split}'")
+
+        missing = sum(
+            1
+            for images in split_images.values()
+            for img_path in images
+            if img_path.stem in label_lookup and not image_to_label_path(img_path).exists()
+        )
+        if missing:
+            print(
+                f"⚠️ WARNING: {missing} labels do not mirror the 'images' folder layout "
+                "and will not be found in manifest mode."
+            )
+    else:
+        stats = sync_split_files(output_path, desired, previous["files"], link_mode)
+        print(
+            f"  - {stats['added']} added, {stats['updated']} updated, "
+            f"{stats['removed']} removed, {stats['unchanged']} unchanged"
+        )
 
-    print(f"\nFile splitting complete. Copied {files_copied} image/label pairs.")
+    save_split_manifest(manifest_path, {"link_mode": link_mode, "files": desired})
+    print(f"\nFile splitting complete. Split contains {files_copied} image/label pairs.")
 
-    # 4. Create the final YAML file
+    # 5. Create the final YAML file
     print("Creating 'final_dataset.yaml' file...")
+    if link_mode == "manifest":
+        splits = {split: f"{split}.txt" for split in ["train", "val", "test"]}
+    else:
+        splits = {split: f"images/{split}" for split in ["train", "val", "test"]}
     yaml_data = {
         "path": str(output_path.resolve()),
-        "train": "images/train",
-        "val": "images/val",
-        "test": "images/test",
+        **splits,
         "names": CLASS_NAMES,
     }
     yaml_filepath = output_path / "final_dataset.yaml"
-    with open(yaml_filepath, "w") as f:
-        yaml.dump(yaml_data, f, sort_keys=False, default_flow_style=False)
+    write_text_if_changed(
+        yaml_filepath, yaml.dump(yaml_data, sort_keys=False, default_flow_style=False)
+    )
 
     print("✅ Final dataset is ready for the model tournament!")
 
 
 if __name__ == "__main__":
-    create_final_dataset_split()
+    parser = argparse.ArgumentParser(
+        description="Split the consolidated dataset into train/val/test sets."
+    )
+    parser.add_argument(
+        "--link-mode",
+        type=str,
+        default="copy",
+        choices=LINK_MODES,
+        help="How split files are created: full copies, hard links, symlinks, or "
+        "image list files ('manifest') that reference the consolidated originals.",
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="Delete the existing final_dataset and rebuild it from scratch.",
+    )
+    parser.add_argument(
+        "--hash",
+        action="store_true",
+        help="Detect changed source files by SHA-1 instead of size and mtime (slower).",
+    )
+    args = parser.parse_args()
+    create_final_dataset_split(link_mode=args.link_mode, clean=args.clean, use_hash=args.hash)
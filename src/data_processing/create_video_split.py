@@ -0,0 +1,250 @@
+# In src/data_processing/create_video_split.py
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import cv2
+import numpy as np
+import yaml
+from tqdm import tqdm
+
+try:
+    import av  # PyAV: reads real keyframe positions without decoding
+except ImportError:
+    av = None
+
+from create_final_split import CLASS_NAMES, SPLIT_MAP
+from label_index import build_label_index
+from split_files import write_image_list, write_text_if_changed
+
+# Must match FRAME_INDEX_VERSION in src/training/video_frame_dataset.py
+FRAME_INDEX_VERSION = 1
+VIDEO_SUFFIXES = [".mp4", ".avi", ".mkv", ".mov"]
+
+
+def parse_frame_stem(stem: str, frame_step: int = 1):
+    """
+    Maps a consolidated frame name to its source video and frame number:
+    'VID01_000123' -> ('VID01', 123 * frame_step). Returns None for names
+    without a trailing frame counter.
+    """
+    video_name, _, counter = stem.rpartition("_")
+    if not video_name or not counter.isdigit():
+        return None
+    return stem.split("_")[0], int(counter) * frame_step
+
+
+def find_video(videos_dir: Path, video_name: str):
+    for suffix in VIDEO_SUFFIXES:
+        candidate = videos_dir / f"{video_name}{suffix}"
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def _scan_keyframes(video_path: Path, fps: float) -> list:
+    """Frame numbers of the keyframes, from packet flags (no frame is decoded)."""
+    keyframes = []
+    with av.open(str(video_path)) as container:
+        stream = container.streams.video[0]
+        start = stream.start_time or 0
+        for packet in container.demux(stream):
+            if packet.is_keyframe and packet.pts is not None:
+                seconds = float((packet.pts - start) * stream.time_base)
+                keyframes.append(int(round(seconds * fps)))
+    return keyframes
+
+
+def probe_video(args):
+    """
+    Worker: reads the size, frame rate, frame count and keyframe positions of
+    one video. Without PyAV, keyframes are assumed every `gop_size` frames;
+    seeking stays exact either way, only the GOP cache is less well aligned.
+    """
+    video_path, gop_size = args
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        return None
+    info = {
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": cap.get(cv2.CAP_PROP_FPS) or 25.0,
+        "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+    }
+    cap.release()
+
+    keyframes = _scan_keyframes(video_path, info["fps"]) if av is not None else []
+    if not keyframes:
+        keyframes = list(range(0, info["frame_count"], gop_size))
+    info["keyframes"] = sorted({0, *(k for k in keyframes if 0 <= k < info["frame_count"])})
+    return info
+
+
+def create_video_dataset_split(videos_dir_str: str, frame_step: int, gop_size: int, workers: int = None):
+    """
+    Builds a split of the consolidated dataset that keeps no image files: a
+    columnar frame index (video, frame number, label rows) that training
+    decodes from the source videos on demand, plus Ultralytics image lists
+    and a YAML with the same train/val/test videos as final_dataset.
+
+    Args:
+        videos_dir_str (str): Folder with the source videos named 'VIDxx.mp4'.
+        frame_step (int): Video frames per consolidated frame counter step
+            (e.g. 25 if frames were exported at 1 fps from 25 fps videos).
+        gop_size (int): Assumed keyframe interval when PyAV is not installed.
+        workers (int): Processes used to probe the videos (default: all cores).
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    source_path = project_root / "data" / "consolidate_25_videos"
+    output_path = project_root / "data" / "final_video_dataset"
+    videos_dir = Path(videos_dir_str) if videos_dir_str else project_root / "data" / "raw" / "videos"
+    workers = workers or os.cpu_count() or 1
+
+    if av is None:
+        print(f"⚠️ WARNING: PyAV is not installed; assuming a keyframe every {gop_size} frames.")
+        print("       Install it with 'pip install av' for exact keyframe positions.")
+
+    # 2. Collect the labelled frames (and unlabelled background frames, if any)
+    label_files = list((source_path / "labels").glob("**/*.txt"))
+    if not label_files:
+        print(f"❌ ERROR: No label files found in {source_path / 'labels'}")
+        return
+    index = build_label_index(label_files, source_path / "label_index.npz")
+    label_frames = {Path(f).stem: i for i, f in enumerate(index.files)}
+    stems = set(label_frames) | {p.stem for p in (source_path / "images").glob("**/*.png")}
+
+    video_of_split = {video: split for split, videos in SPLIT_MAP.items() for video in videos}
+    frames = []
+    unparsed = 0
+    for stem in stems:
+        parsed = parse_frame_stem(stem, frame_step)
+        if parsed is None:
+            unparsed += 1
+        elif parsed[0] in video_of_split:
+            frames.append((parsed[0], parsed[1], stem))
+    if unparsed:
+        print(f"⚠️ WARNING: {unparsed} frame names have no trailing frame number and were skipped.")
+
+    # 3. Probe the source videos
+    video_names = sorted({video for video, _, _ in frames})
+    video_paths = {name: find_video(videos_dir, name) for name in video_names}
+    missing = [name for name, path in video_paths.items() if path is None]
+    if missing:
+        print(f"⚠️ WARNING: No source video in {videos_dir} for: {', '.join(missing)}")
+    video_names = [name for name in video_names if video_paths[name] is not None]
+    if not video_names:
+        print("❌ ERROR: None of the split videos were found.")
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        infos = list(
+            tqdm(
+                pool.map(probe_video, [(video_paths[name], gop_size) for name in video_names]),
+                total=len(video_names),
+                desc="Probing videos",
+            )
+        )
+    videos = {name: info for name, info in zip(video_names, infos) if info is not None}
+
+    # 4. Build the columnar frame index, sorted by video and frame number
+    in_range = sorted(
+        (video, frame, stem)
+        for video, frame, stem in frames
+        if video in videos and frame < videos[video]["frame_count"]
+    )
+    if len(in_range) < len(frames):
+        print(f"⚠️ WARNING: {len(frames) - len(in_range)} frames lie past the end of their video (check --frame-step).")
+    frames = in_range
+    video_ids = {name: i for i, name in enumerate(videos)}
+    # The label index stores the rows of each label file contiguously
+    offsets = np.concatenate([[0], np.cumsum(index.row_counts)])
+    rows = [
+        np.arange(offsets[label_frames[stem]], offsets[label_frames[stem] + 1])
+        if stem in label_frames
+        else np.empty(0, dtype=np.int64)
+        for _, _, stem in frames
+    ]
+    rows_flat = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    keyframes = [np.asarray(videos[name]["keyframes"], dtype=np.int64) for name in videos]
+
+    arrays = {
+        "version": np.asarray(FRAME_INDEX_VERSION),
+        "stems": np.asarray([stem for _, _, stem in frames], dtype=str),
+        "frame_video": np.asarray([video_ids[video] for video, _, _ in frames], dtype=np.int32),
+        "frame_number": np.asarray([frame for _, frame, _ in frames], dtype=np.int64),
+        "row_counts": np.asarray([len(r) for r in rows], dtype=np.int32),
+        "class_id": index.class_id[rows_flat],
+        "boxes": index.boxes[rows_flat],
+        "videos": np.asarray(list(videos), dtype=str),
+        "video_paths": np.asarray([str(video_paths[name].resolve()) for name in videos], dtype=str),
+        "video_shape": np.asarray([[videos[n]["height"], videos[n]["width"]] for n in videos], dtype=np.int32),
+        "video_frame_count": np.asarray([videos[n]["frame_count"] for n in videos], dtype=np.int64),
+        "keyframe_counts": np.asarray([len(k) for k in keyframes], dtype=np.int32),
+        "keyframes": np.concatenate(keyframes),
+    }
+
+    output_path.mkdir(parents=True, exist_ok=True)
+    index_path = output_path / "frame_index.npz"
+    tmp_path = index_path.with_name(index_path.name + ".tmp.npz")
+    np.savez(tmp_path, **arrays)
+    tmp_path.replace(index_path)
+
+    # 5. Image lists (virtual paths: only the stem is used to find the frame) and YAML
+    for split in SPLIT_MAP:
+        split_stems = [stem for video, _, stem in frames if video_of_split[video] == split]
+        write_image_list(
+            output_path / f"{split}.txt", [output_path / "frames" / split / f"{s}.png" for s in split_stems]
+        )
+        print(f"  - {split}: {len(split_stems)} frames")
+
+    yaml_data = {
+        "path": str(output_path.resolve()),
+        **{split: f"{split}.txt" for split in SPLIT_MAP},
+        "names": CLASS_NAMES,
+        "frame_index": index_path.name,
+    }
+    write_text_if_changed(
+        output_path / "final_video_dataset.yaml", yaml.dump(yaml_data, sort_keys=False, default_flow_style=False)
+    )
+
+    # 6. Report the disk footprint against the consolidated PNGs
+    video_bytes = sum(video_paths[name].stat().st_size for name in videos)
+    png_bytes = sum(p.stat().st_size for p in (source_path / "images").glob("**/*.png"))
+    print(f"\n✅ Video split ready: {len(frames)} frames from {len(videos)} videos in {output_path}")
+    print(f"   Source videos: {video_bytes / 1e9:.2f} GB (consolidated PNGs: {png_bytes / 1e9:.2f} GB)")
+    print("   Train from it with the --video-frames flag of the training scripts.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Index the consolidated dataset against its source videos instead of PNG files."
+    )
+    parser.add_argument(
+        "--videos-dir",
+        type=str,
+        default=None,
+        help="Folder with the source videos named VIDxx.mp4 (defaults to data/raw/videos).",
+    )
+    parser.add_argument(
+        "--frame-step",
+        type=int,
+        default=1,
+        help="Video frames per step of the frame counter in the consolidated file names.",
+    )
+    parser.add_argument(
+        "--gop-size",
+        type=int,
+        default=250,
+        help="Assumed keyframe interval when PyAV is not installed.",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Processes used to probe the videos.")
+
+    args = parser.parse_args()
+    create_video_dataset_split(
+        videos_dir_str=args.videos_dir,
+        frame_step=args.frame_step,
+        gop_size=args.gop_size,
+        workers=args.workers,
+    )
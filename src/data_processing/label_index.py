@@ -0,0 +1,186 @@
+# In src/data_processing/label_index.py
+
+from pathlib import Path
+import numpy as np
+from tqdm import tqdm
+
+
+INDEX_VERSION = 1
+
+
+def _video_name(label_file: Path) -> str:
+    """Returns the 'VIDxx' prefix used throughout the consolidated dataset."""
+    return label_file.stem.split("_")[0]
+
+
+def _parse_label_file(label_file: Path):
+    """
+    Parses a single YOLO label file into (class ids, boxes).
+    Malformed lines are skipped, exactly like the original per-line loops.
+    """
+    class_ids = []
+    boxes = []
+    with open(label_file, "r") as f:
+        for line in f:
+            parts = line.split()
+            try:
+                class_id = int(parts[0])
+                box = [float(v) for v in parts[1:5]]
+            except (ValueError, IndexError):
+                continue
+            if len(box) < 4:
+                box += [0.0] * (4 - len(box))
+            class_ids.append(class_id)
+            boxes.append(box)
+    return (
+        np.asarray(class_ids, dtype=np.int16),
+        np.asarray(boxes, dtype=np.float32).reshape(-1, 4),
+    )
+
+
+class LabelIndex:
+    """
+    Columnar, in-memory view of every label row in a set of YOLO label files.
+
+    Attributes:
+        files (np.ndarray): Label file paths (str), one per frame.
+        videos (np.ndarray): Sorted unique video names ('VID01', ...).
+        frame_video (np.ndarray): Video id of every frame.
+        frame_id (np.ndarray): Frame id of every label row.
+        video_id (np.ndarray): Video id of every label row.
+        class_id (np.ndarray): Class id of every label row.
+        boxes (np.ndarray): (N, 4) normalized xywh box of every label row.
+    """
+
+    def __init__(self, arrays: dict):
+        self.files = arrays["files"]
+        self.sizes = arrays["sizes"]
+        self.mtimes = arrays["mtimes"]
+        self.row_counts = arrays["row_counts"]
+        self.videos = arrays["videos"]
+        self.frame_video = arrays["frame_video"]
+        self.class_id = arrays["class_id"]
+        self.boxes = arrays["boxes"]
+        self.frame_id = np.repeat(
+            np.arange(len(self.files), dtype=np.int32), self.row_counts
+        )
+        self.video_id = self.frame_video[self.frame_id]
+
+    @property
+    def num_frames(self) -> int:
+        return len(self.files)
+
+    def _valid_rows(self, num_classes: int) -> np.ndarray:
+        return (self.class_id >= 0) & (self.class_id < num_classes)
+
+    def video_class_counts(self, num_classes: int) -> np.ndarray:
+        """Returns a (videos x classes) instance count matrix."""
+        valid = self._valid_rows(num_classes)
+        flat = self.video_id[valid].astype(np.int64) * num_classes + self.class_id[valid]
+        counts = np.bincount(flat, minlength=len(self.videos) * num_classes)
+        return counts.reshape(len(self.videos), num_classes)
+
+    def frame_class_counts(self, num_classes: int) -> np.ndarray:
+        """Returns a (frames x classes) instance count matrix."""
+        valid = self._valid_rows(num_classes)
+        flat = self.frame_id[valid].astype(np.int64) * num_classes + self.class_id[valid]
+        counts = np.bincount(flat, minlength=self.num_frames * num_classes)
+        return counts.reshape(self.num_frames, num_classes)
+
+
+def load_label_index(index_path: Path) -> dict:
+    """Loads the raw arrays of a saved index, or None if it is missing or stale."""
+    if not index_path.exists():
+        return None
+    try:
+        with np.load(index_path, allow_pickle=False) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                return None
+            return {key: data[key] for key in data.files}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def build_label_index(label_files, index_path: Path) -> LabelIndex:
+    """
+    Builds (or incrementally refreshes) a persistent label index.
+
+    Only label files whose size or mtime changed since the last build are
+    re-parsed; rows of unchanged files are reused from the saved arrays.
+
+    Args:
+        label_files (list[Path]): The YOLO .txt label files to index.
+        index_path (Path): Where the .npz index is stored.
+
+    Returns:
+        LabelIndex: The up-to-date index.
+    """
+    label_files = sorted(Path(f) for f in label_files)
+
+    # 1. Load the previous index and map each file to its stored rows
+    previous = load_label_index(index_path)
+    cached = {}
+    if previous is not None:
+        offsets = np.concatenate([[0], np.cumsum(previous["row_counts"])])
+        for i, name in enumerate(previous["files"]):
+            cached[str(name)] = (
+                int(previous["sizes"][i]),
+                int(previous["mtimes"][i]),
+                offsets[i],
+                offsets[i + 1],
+            )
+
+    # 2. Reuse unchanged files and re-parse only the changed ones
+    sizes = np.empty(len(label_files), dtype=np.int64)
+    mtimes = np.empty(len(label_files), dtype=np.int64)
+    row_counts = np.empty(len(label_files), dtype=np.int32)
+    class_chunks, box_chunks = [], []
+    reparsed = 0
+
+    for i, label_file in enumerate(tqdm(label_files, desc="Indexing label files")):
+        stat = label_file.stat()
+        sizes[i] = stat.st_size
+        mtimes[i] = stat.st_mtime_ns
+
+        entry = cached.get(str(label_file))
+        if entry is not None and entry[0] == sizes[i] and entry[1] == mtimes[i]:
+            start, end = entry[2], entry[3]
+            class_ids = previous["class_id"][start:end]
+            boxes = previous["boxes"][start:end]
+        else:
+            class_ids, boxes = _parse_label_file(label_file)
+            reparsed += 1
+
+        row_counts[i] = len(class_ids)
+        class_chunks.append(class_ids)
+        box_chunks.append(boxes)
+
+    video_names = [_video_name(f) for f in label_files]
+    videos, frame_video = np.unique(np.asarray(video_names, dtype=str), return_inverse=True)
+
+    arrays = {
+        "version": np.asarray(INDEX_VERSION),
+        "files": np.asarray([str(f) for f in label_files], dtype=str),
+        "sizes": sizes,
+        "mtimes": mtimes,
+        "row_counts": row_counts,
+        "videos": videos,
+        "frame_video": frame_video.astype(np.int32),
+        "class_id": (
+            np.concatenate(class_chunks) if class_chunks else np.empty(0, dtype=np.int16)
+        ),
+        "boxes": (
+            np.concatenate(box_chunks) if box_chunks else np.empty((0, 4), dtype=np.float32)
+        ),
+    }
+
+    # 3. Persist the index only when something actually changed
+    if previous is None or reparsed or len(cached) != len(label_files):
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so an interrupted run never corrupts the index
+        tmp_path = index_path.with_name(index_path.name + ".tmp.npz")
+        np.savez(tmp_path, **arrays)
+        tmp_path.replace(index_path)
+
+    print(f"Label index: {len(label_files)} files, {reparsed} re-parsed -> {index_path.name}")
+    return LabelIndex(arrays)
@@ -0,0 +1,125 @@
+# In src/data_processing/near_duplicates.py
+
+import cv2
+import numpy as np
+
+
+# Set bits of every byte value, for Hamming distances between packed hashes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def perceptual_hash(img_path, hash_size: int = 8):
+    """
+    DCT perceptual hash (pHash) of an image: the grayscale image is shrunk to
+    (4 * hash_size)^2, and the sign of its lowest hash_size x hash_size DCT
+    frequencies against their median gives the bits. Small changes in
+    lighting, noise or compression barely move it.
+
+    Returns:
+        np.ndarray: The hash_size^2 bits packed into uint8, or None if the image cannot be read.
+    """
+    im = cv2.imread(str(img_path), cv2.IMREAD_GRAYSCALE)
+    if im is None:
+        return None
+    side = 4 * hash_size
+    small = cv2.resize(im, (side, side), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:hash_size, :hash_size].flatten()
+    # The DC term only holds the mean brightness, so it is left out of the median
+    return np.packbits(low > np.median(low[1:]))
+
+
+def hamming_distances(hashes: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Number of differing bits between every packed hash in `hashes` and `query`."""
+    return _POPCOUNT[np.bitwise_xor(hashes, query)].sum(axis=-1, dtype=np.int32)
+
+
+def cluster_near_duplicates(hashes: np.ndarray, groups: np.ndarray, order: np.ndarray, max_distance: int):
+    """
+    Leader clustering of frames by perceptual hash. Frames are visited in
+    `order` (time order within each video); a frame joins the closest cluster
+    of its group whose first frame (the leader) is at most `max_distance` bits
+    away, otherwise it starts a new cluster. Frames of different groups (other
+    videos, or other label contents) never share a cluster.
+
+    Args:
+        hashes (np.ndarray): (frames x bytes) packed hashes.
+        groups (np.ndarray): Group id of every frame.
+        order (np.ndarray): Visit order of the frames.
+        max_distance (int): Largest Hamming distance to a leader within a cluster.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Cluster id of every frame, the
+            leader frame of every cluster, and every frame's distance to its leader.
+    """
+    num_frames = len(hashes)
+    cluster = np.empty(num_frames, dtype=np.int64)
+    distance = np.zeros(num_frames, dtype=np.int32)
+    leaders = []
+
+    # Leader hashes of each group, in arrays preallocated to the group size
+    group_ids, group_sizes = np.unique(groups, return_counts=True)
+    leader_hashes = {g: np.empty((n, hashes.shape[1]), dtype=hashes.dtype) for g, n in zip(group_ids, group_sizes)}
+    leader_clusters = {g: np.empty(n, dtype=np.int64) for g, n in zip(group_ids, group_sizes)}
+    num_leaders = dict.fromkeys(group_ids.tolist(), 0)
+
+    for frame in order:
+        g = groups[frame].item()
+        n = num_leaders[g]
+        if n:
+            d = hamming_distances(leader_hashes[g][:n], hashes[frame])
+            best = int(np.argmin(d))
+            if d[best] <= max_distance:
+                cluster[frame] = leader_clusters[g][best]
+                distance[frame] = d[best]
+                continue
+        cluster[frame] = len(leaders)
+        leader_hashes[g][n] = hashes[frame]
+        leader_clusters[g][n] = len(leaders)
+        num_leaders[g] = n + 1
+        leaders.append(frame)
+
+    return cluster, np.asarray(leaders, dtype=np.int64), distance
+
+
+def select_representatives(
+    frame_counts: np.ndarray, leaders: np.ndarray, distance: np.ndarray, min_class_ratio: float = 1.0
+) -> np.ndarray:
+    """
+    Keeps one frame per near-duplicate cluster (its leader), then tops up the
+    classes the deduplication thinned out more than the set as a whole: each
+    class keeps at least `min_class_ratio` times the overall share of
+    instances kept. Top-up frames are the cluster members that differ most
+    from their leader, visited rarest class first.
+
+    Args:
+        frame_counts (np.ndarray): (frames x classes) instance counts.
+        leaders (np.ndarray): Leader frame of every cluster.
+        distance (np.ndarray): Hamming distance of every frame to its leader.
+        min_class_ratio (float): 1.0 keeps the class proportions of the full set
+            (or shifts them towards classes dedup removed less of); 0 disables the top-up.
+
+    Returns:
+        np.ndarray: Sorted indices of the kept frames.
+    """
+    frame_counts = np.asarray(frame_counts, dtype=np.int64)
+    selected = np.zeros(len(frame_counts), dtype=bool)
+    selected[leaders] = True
+
+    totals = frame_counts.sum(axis=0)
+    kept_share = frame_counts[selected].sum() / max(totals.sum(), 1)
+    targets = np.ceil(min_class_ratio * kept_share * totals).astype(np.int64)
+    kept = frame_counts[selected].sum(axis=0)
+
+    # Most distinct frames first; the stable sort keeps time order among ties
+    by_novelty = np.argsort(-distance, kind="stable")
+    for class_id in np.argsort(totals, kind="stable"):
+        missing = targets[class_id] - kept[class_id]
+        if missing <= 0:
+            continue
+        candidates = by_novelty[~selected[by_novelty] & (frame_counts[by_novelty, class_id] > 0)]
+        cumulative = np.cumsum(frame_counts[candidates, class_id])
+        take = candidates[: np.searchsorted(cumulative, missing) + 1]
+        selected[take] = True
+        kept += frame_counts[take].sum(axis=0)
+
+    return np.flatnonzero(selected)
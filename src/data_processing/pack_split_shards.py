@@ -0,0 +1,232 @@
+# In src/data_processing/pack_split_shards.py
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import io
+import os
+import shutil
+import tarfile
+import cv2
+import numpy as np
+import yaml
+from tqdm import tqdm
+
+from label_index import _parse_label_file
+from split_files import image_to_label_path, list_split_images, write_text_if_changed
+
+# Must match PACKED_INDEX_VERSION in src/training/packed_dataset.py
+PACKED_INDEX_VERSION = 1
+PACKED_INDEX_NAME = "shards.npz"
+ENCODINGS = ["original", "jpg", "webp"]
+
+
+def _encode_frame(args):
+    """
+    Worker: returns the bytes stored for one image, its suffix and its
+    (height, width). 'original' keeps the file's bytes untouched; 'jpg' and
+    'webp' re-encode it at `quality`.
+    """
+    img_path, encoding, quality = args
+    data = Path(img_path).read_bytes()
+    im = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if im is None:
+        return None
+    if encoding == "jpg":
+        data = cv2.imencode(".jpg", im, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+    elif encoding == "webp":
+        data = cv2.imencode(".webp", im, [cv2.IMWRITE_WEBP_QUALITY, quality])[1].tobytes()
+    suffix = Path(img_path).suffix.lower() if encoding == "original" else f".{encoding}"
+    return data, suffix, im.shape[:2]
+
+
+def _add_member(tar: tarfile.TarFile, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def pack_split(
+    dataset_path: Path, split: str, encoding: str, quality: int, shard_size_mb: int, workers: int
+) -> dict:
+    """
+    Packs the images and labels of one split into a few large tar shards under
+    'packed/<split>/', plus a columnar index ('shards.npz') with every
+    frame's shard, byte offset and size, image shape and label rows, so a
+    loader can read the shards front to back without listing or opening the
+    small files again.
+
+    Each frame is stored as '<stem><suffix>' (image) followed by '<stem>.txt'
+    (its label rows), the layout WebDataset-style tools expect.
+
+    Returns:
+        dict: Frame, shard and byte counts of the packed split.
+    """
+    images = list_split_images(dataset_path, split)
+    if not images:
+        return None
+    packed_dir = dataset_path / "packed" / split
+    if packed_dir.exists():
+        shutil.rmtree(packed_dir)
+    packed_dir.mkdir(parents=True)
+
+    shard_names, frame_shard, stems, suffixes, shapes = [], [], [], [], []
+    row_counts, class_chunks, box_chunks = [], [], []
+    source_bytes, skipped = 0, 0
+    tar, shard_bytes = None, 0
+
+    def encoded_frames(pool):
+        # Encode in chunks so finished frames never pile up in memory
+        for start in range(0, len(images), 1024):
+            chunk = images[start : start + 1024]
+            jobs = [(p, encoding, quality) for p in chunk]
+            yield from zip(chunk, pool.map(_encode_frame, jobs, chunksize=32))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for img_path, result in tqdm(encoded_frames(pool), total=len(images), desc=f"Packing {split}"):
+            if result is None:
+                skipped += 1
+                continue
+            data, suffix, shape = result
+
+            # Start a new shard once the current one is full
+            if tar is None or shard_bytes >= shard_size_mb * 1024 * 1024:
+                if tar is not None:
+                    tar.close()
+                shard_names.append(f"{split}-{len(shard_names):05d}.tar")
+                tar = tarfile.open(packed_dir / shard_names[-1], "w", format=tarfile.USTAR_FORMAT)
+                shard_bytes = 0
+
+            label_path = image_to_label_path(img_path)
+            label_text = label_path.read_bytes() if label_path.exists() else b""
+            class_ids, boxes = _parse_label_file(label_path) if label_text else (
+                np.empty(0, dtype=np.int16),
+                np.empty((0, 4), dtype=np.float32),
+            )
+
+            _add_member(tar, f"{img_path.stem}{suffix}", data)
+            _add_member(tar, f"{img_path.stem}.txt", label_text)
+            shard_bytes += len(data) + len(label_text) + 2048  # data plus headers and padding
+            source_bytes += img_path.stat().st_size + (label_path.stat().st_size if label_text else 0)
+
+            frame_shard.append(len(shard_names) - 1)
+            stems.append(img_path.stem)
+            suffixes.append(suffix)
+            shapes.append(shape)
+            row_counts.append(len(class_ids))
+            class_chunks.append(class_ids)
+            box_chunks.append(boxes)
+    if tar is not None:
+        tar.close()
+
+    # Byte offsets of every image member, read back from the finished shards
+    offsets, sizes = [], []
+    for shard_name in shard_names:
+        with tarfile.open(packed_dir / shard_name, "r") as shard:
+            for member in shard.getmembers():
+                if not member.name.endswith(".txt"):
+                    offsets.append(member.offset_data)
+                    sizes.append(member.size)
+
+    arrays = {
+        "version": np.asarray(PACKED_INDEX_VERSION),
+        "encoding": np.asarray(encoding),
+        "shards": np.asarray(shard_names, dtype=str),
+        "frame_shard": np.asarray(frame_shard, dtype=np.int32),
+        "offsets": np.asarray(offsets, dtype=np.int64),
+        "sizes": np.asarray(sizes, dtype=np.int64),
+        "stems": np.asarray(stems, dtype=str),
+        "suffixes": np.asarray(suffixes, dtype=str),
+        "shapes": np.asarray(shapes, dtype=np.int32).reshape(-1, 2),
+        "row_counts": np.asarray(row_counts, dtype=np.int32),
+        "class_id": np.concatenate(class_chunks) if class_chunks else np.empty(0, dtype=np.int16),
+        "boxes": np.concatenate(box_chunks) if box_chunks else np.empty((0, 4), dtype=np.float32),
+    }
+    np.savez(packed_dir / PACKED_INDEX_NAME, **arrays)
+
+    if skipped:
+        print(f"  ⚠️ {skipped} images could not be decoded and were left out.")
+    packed_bytes = sum((packed_dir / name).stat().st_size for name in shard_names)
+    return {"frames": len(stems), "shards": len(shard_names), "source_bytes": source_bytes, "packed_bytes": packed_bytes}
+
+
+def pack_dataset_splits(
+    dataset_name: str, splits, encoding: str, quality: int, shard_size_mb: int, workers: int = None
+):
+    """
+    Packs splits of a generated dataset into tar shards and writes
+    '<dataset>_packed.yaml', a copy of the dataset YAML whose packed splits
+    point at 'packed/<split>' instead of the loose files. Either YAML can be
+    trained with the --packed data loader; unpacked splits keep loading as usual.
+
+    Args:
+        dataset_name (str): Dataset folder under data/ (e.g. 'final_dataset').
+        splits (list[str]): Splits to pack (usually 'train' and 'val').
+        encoding (str): 'original' (keep the PNG bytes), 'jpg' or 'webp'.
+        quality (int): JPEG/WebP quality (1-100) when re-encoding.
+        shard_size_mb (int): Approximate size of one shard file.
+        workers (int): Encoding processes (default: all cores).
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    dataset_path = project_root / "data" / dataset_name
+    yaml_path = dataset_path / f"{dataset_name}.yaml"
+    workers = workers or os.cpu_count() or 1
+
+    if not yaml_path.exists():
+        print(f"❌ ERROR: Dataset YAML file not found at {yaml_path}")
+        return
+    with open(yaml_path, "r") as f:
+        yaml_data = yaml.safe_load(f)
+
+    # 2. Pack each split
+    for split in splits:
+        print(f"--- Packing '{split}' ({encoding}{'' if encoding == 'original' else f', quality {quality}'}) ---")
+        stats = pack_split(dataset_path, split, encoding, quality, shard_size_mb, workers)
+        if stats is None:
+            print(f"⚠️ WARNING: No images found for split '{split}'. Skipping.")
+            continue
+        yaml_data[split] = f"packed/{split}"
+        print(
+            f"  ✅ {stats['frames']} frames in {stats['shards']} shards: "
+            f"{stats['source_bytes'] / 1e9:.2f} GB of loose files -> {stats['packed_bytes'] / 1e9:.2f} GB"
+        )
+
+    # 3. The packed YAML (the original one keeps pointing at the loose files)
+    packed_yaml_path = dataset_path / f"{dataset_name}_packed.yaml"
+    write_text_if_changed(packed_yaml_path, yaml.dump(yaml_data, sort_keys=False, default_flow_style=False))
+    print(f"\n✅ Packed dataset YAML written to: {packed_yaml_path}")
+    print("   Train from it with the --packed flag of the training scripts.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pack dataset splits into large tar shards for fast sequential reading."
+    )
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        default="final_dataset",
+        help="Dataset folder under data/ (e.g. final_dataset or balanced_dataset).",
+    )
+    parser.add_argument("--splits", type=str, nargs="+", default=["train", "val"], help="Splits to pack.")
+    parser.add_argument(
+        "--encoding",
+        type=str,
+        default="original",
+        choices=ENCODINGS,
+        help="Keep the original image bytes, or re-encode as JPEG/WebP (lossy, much smaller).",
+    )
+    parser.add_argument("--quality", type=int, default=95, help="JPEG/WebP quality when re-encoding.")
+    parser.add_argument("--shard-size-mb", type=int, default=1024, help="Approximate size of one shard.")
+    parser.add_argument("--workers", type=int, default=None, help="Encoding processes (default: all cores).")
+
+    args = parser.parse_args()
+    pack_dataset_splits(
+        dataset_name=args.dataset,
+        splits=args.splits,
+        encoding=args.encoding,
+        quality=args.quality,
+        shard_size_mb=args.shard_size_mb,
+        workers=args.workers,
+    )
@@ -0,0 +1,191 @@
+# In src/data_processing/split_files.py
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from tqdm import tqdm
+
+
+# How files are materialised in a generated split:
+#   copy     - full copies (the original behaviour)
+#   hardlink - hard links to the source files (falls back to copy across filesystems)
+#   symlink  - symbolic links to the source files
+#   manifest - no files at all; '<split>.txt' image lists point at the sources
+LINK_MODES = ["copy", "hardlink", "symlink", "manifest"]
+
+
+def image_to_label_path(img_path: Path) -> Path:
+    """
+    Returns the label path Ultralytics derives for an image: the last
+    '/images/' path component is swapped for '/labels/' and the suffix for '.txt'.
+    """
+    parts = list(Path(img_path).parts)
+    for i in range(len(parts) - 1, -1, -1):
+        if parts[i] == "images":
+            parts[i] = "labels"
+            break
+    return Path(*parts).with_suffix(".txt")
+
+
+def place_file(src: Path, dst: Path, link_mode: str):
+    """
+    Materialises `src` at `dst` according to `link_mode` ('copy', 'hardlink'
+    or 'symlink'). An existing file at `dst` is replaced.
+    """
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+
+    if link_mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            # Hard links cannot cross filesystems; a copy is the safe fallback
+            pass
+    elif link_mode == "symlink":
+        os.symlink(Path(src).resolve(), dst)
+        return
+
+    shutil.copy(src, dst)
+
+
+def write_image_list(list_path: Path, image_paths) -> bool:
+    """
+    Writes an Ultralytics image list file (one absolute image path per line).
+    The file is left untouched when its content would not change, so
+    Ultralytics label caches for that split stay valid. Returns True if written.
+    """
+    text = "".join(f"{Path(img_path).resolve()}\n" for img_path in image_paths)
+    return write_text_if_changed(list_path, text)
+
+
+def place_split_images(split_images, output_path: Path, split: str, link_mode: str):
+    """
+    Puts the images of one split, and their labels, into a generated dataset:
+    as 'images/<split>' and 'labels/<split>' files, or as a '<split>.txt'
+    image list in manifest mode.
+    """
+    if link_mode == "manifest":
+        write_image_list(output_path / f"{split}.txt", split_images)
+        return
+    (output_path / "images" / split).mkdir(parents=True, exist_ok=True)
+    (output_path / "labels" / split).mkdir(parents=True, exist_ok=True)
+    for img_path in tqdm(split_images, desc=f"Placing {split} files"):
+        place_file(img_path, output_path / "images" / split / img_path.name, link_mode)
+        label_path = image_to_label_path(img_path)
+        if label_path.exists():
+            place_file(label_path, output_path / "labels" / split / label_path.name, link_mode)
+
+
+def list_split_images(dataset_path: Path, split: str):
+    """
+    Returns the image paths of one split of a generated dataset, whether it
+    was written as real files ('images/<split>') or as a '<split>.txt' list.
+    """
+    list_path = dataset_path / f"{split}.txt"
+    if list_path.exists():
+        with open(list_path, "r") as f:
+            return [Path(line.strip()) for line in f if line.strip()]
+    return sorted((dataset_path / "images" / split).glob("*.png"))
+
+
+def file_signature(path: Path, use_hash: bool = False) -> dict:
+    """
+    Describes the content of a source file for the split manifest: its size
+    and mtime, plus a SHA-1 digest when `use_hash` is set.
+    """
+    stat = Path(path).stat()
+    signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if use_hash:
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        signature["sha1"] = digest.hexdigest()
+    return signature
+
+
+def same_content(previous: dict, entry: dict) -> bool:
+    """
+    True if two manifest entries describe the same placed file. When both
+    carry a SHA-1, size and digest decide and the mtime is ignored, so a
+    touched but identical source is left alone; otherwise size and mtime do
+    (which also keeps turning the hash on or off from re-placing every file).
+    """
+    if previous is None:
+        return False
+    content_keys = {"size", "mtime_ns", "sha1"}
+    if {k: v for k, v in previous.items() if k not in content_keys} != {
+        k: v for k, v in entry.items() if k not in content_keys
+    }:
+        return False
+    if previous.get("size") != entry.get("size"):
+        return False
+    if "sha1" in previous and "sha1" in entry:
+        return previous["sha1"] == entry["sha1"]
+    return previous.get("mtime_ns") == entry.get("mtime_ns")
+
+
+def load_split_manifest(manifest_path: Path) -> dict:
+    """Loads a split manifest, or returns an empty one if it is missing or unreadable."""
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"link_mode": None, "files": {}}
+
+
+def save_split_manifest(manifest_path: Path, manifest: dict):
+    """Atomically writes a split manifest."""
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    tmp_path.replace(manifest_path)
+
+
+def sync_split_files(output_path: Path, desired: dict, previous: dict, link_mode: str):
+    """
+    Brings the files under `output_path` in line with `desired`, touching only
+    what changed since the `previous` manifest.
+
+    Args:
+        output_path (Path): Root of the generated dataset.
+        desired (dict): Maps target paths (relative to `output_path`) to entries
+            with a 'source' path and its file signature.
+        previous (dict): The 'files' mapping of the previous manifest.
+        link_mode (str): 'copy', 'hardlink' or 'symlink'.
+
+    Returns:
+        dict: Number of 'added', 'updated', 'removed' and 'unchanged' files.
+    """
+    stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+
+    # Files that are no longer part of the split (or moved to another split)
+    for target in previous.keys() - desired.keys():
+        target_path = output_path / target
+        if target_path.exists() or target_path.is_symlink():
+            target_path.unlink()
+        stats["removed"] += 1
+
+    for target, entry in desired.items():
+        target_path = output_path / target
+        if same_content(previous.get(target), entry) and (target_path.exists() or target_path.is_symlink()):
+            stats["unchanged"] += 1
+            continue
+
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        place_file(Path(entry["source"]), target_path, link_mode)
+        stats["updated" if target in previous else "added"] += 1
+
+    return stats
+
+
+def write_text_if_changed(path: Path, text: str) -> bool:
+    """Writes `text` to `path` unless it already holds exactly that; returns True if written."""
+    if path.exists() and path.read_text() == text:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return True
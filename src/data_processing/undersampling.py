@@ -0,0 +1,120 @@
+# In src/data_processing/undersampling.py
+
+import numpy as np
+
+
+def _per_class(value, num_classes: int, default: int) -> np.ndarray:
+    """Expands a scalar / sequence / None limit into one value per class."""
+    if value is None:
+        return np.full(num_classes, default, dtype=np.int64)
+    return np.broadcast_to(np.asarray(value, dtype=np.int64), (num_classes,)).copy()
+
+
+def rarity_order(frame_counts: np.ndarray, seed: int = 0) -> np.ndarray:
+    """
+    Returns the order in which frames are visited: grouped by their rarest
+    class (rarest classes first), randomly shuffled within each group.
+    Frames without any instance come last.
+    """
+    num_frames, num_classes = frame_counts.shape
+    totals = frame_counts.sum(axis=0, dtype=np.int64)
+
+    # Rank 0 is the class with the fewest instances in the whole set
+    class_rank = np.empty(num_classes, dtype=np.int64)
+    class_rank[np.argsort(totals, kind="stable")] = np.arange(num_classes)
+
+    ranks = np.where(frame_counts > 0, class_rank.astype(np.int16), np.int16(num_classes))
+    frame_rank = ranks.min(axis=1).astype(np.int64)
+
+    # A single argsort on a combined (rank, random tie-break) key
+    rng = np.random.default_rng(seed)
+    tie_break = rng.permutation(num_frames)
+    return np.argsort(frame_rank * num_frames + tie_break)
+
+
+def select_balanced_frames(
+    frame_counts: np.ndarray,
+    ceilings,
+    floors=None,
+    seed: int = 0,
+    keep_background: bool = True,
+) -> np.ndarray:
+    """
+    Picks a class-balanced subset of frames from a (frames x classes) count matrix.
+
+    Frames are visited in `rarity_order`. A frame is accepted when adding it
+    keeps every class at or below its ceiling, which is the same greedy rule
+    the original per-file loop used, evaluated in vectorized passes. Floors
+    are satisfied first and override the ceilings: frames containing a class
+    that is still below its floor are always taken.
+
+    Args:
+        frame_counts (np.ndarray): Instances of each class in each frame.
+        ceilings (int | sequence | None): Maximum instances per class (None: no limit).
+        floors (int | sequence): Minimum instances per class (default: none).
+        seed (int): Seed for the random order within a rarity group.
+        keep_background (bool): Keep frames with no instances, as before.
+
+    Returns:
+        np.ndarray: Sorted indices of the selected frames.
+    """
+    frame_counts = np.asarray(frame_counts, dtype=np.int32)
+    num_frames, num_classes = frame_counts.shape
+    available = frame_counts.sum(axis=0, dtype=np.int64)
+    # A ceiling above the instances available never binds; clamping it keeps
+    # sum(capacity) small enough to size the acceptance window below
+    if ceilings is None:
+        ceilings = available
+    else:
+        ceilings = np.minimum(_per_class(ceilings, num_classes, 0), available)
+    floors = _per_class(floors, num_classes, 0)
+
+    order = rarity_order(frame_counts, seed=seed)
+    selected = np.zeros(num_frames, dtype=bool)
+    totals = np.zeros(num_classes, dtype=np.int64)
+
+    # 1. Floors: for each class, rarest first, take the first frames (in visit
+    #    order) containing it until its floor is met
+    for class_id in np.argsort(available, kind="stable"):
+        missing = floors[class_id] - totals[class_id]
+        if missing <= 0:
+            continue
+        candidates = order[~selected[order] & (frame_counts[order, class_id] > 0)]
+        cumulative = np.cumsum(frame_counts[candidates, class_id], dtype=np.int64)
+        take = candidates[: np.searchsorted(cumulative, missing) + 1]
+        selected[take] = True
+        totals += frame_counts[take].sum(axis=0, dtype=np.int64)
+
+    # 2. Ceilings: greedy acceptance in visit order, one vectorized pass per
+    #    rejection. Frames that can no longer fit are dropped up front, so each
+    #    pass accepts a long prefix and only a handful of passes are needed.
+    remaining = order[~selected[order]]
+    # Class-major layout keeps the per-class cumulative sums contiguous
+    counts = np.ascontiguousarray(frame_counts[remaining].T)
+    instance_frames = counts.any(axis=0)
+    if keep_background:
+        selected[remaining[~instance_frames]] = True
+    remaining, counts = remaining[instance_frames], counts[:, instance_frames]
+
+    while remaining.size:
+        # A floor may already have pushed a class past its ceiling; clamping at
+        # zero still rejects frames holding that class but not the others
+        capacity = np.maximum(ceilings - totals, 0)[:, None]
+        fits = np.all(counts <= capacity, axis=0)
+        if not fits.all():
+            remaining, counts = remaining[fits], counts[:, fits]
+            if not remaining.size:
+                break
+
+        # Every frame here holds at least one instance, so no more than
+        # sum(capacity) + 1 frames can be reached before an overflow
+        window = counts[:, : int(capacity.sum()) + 1]
+        overflow = np.any(np.cumsum(window, axis=1, dtype=np.int64) > capacity, axis=0)
+        stop = int(np.argmax(overflow)) if overflow.any() else window.shape[1]
+
+        selected[remaining[:stop]] = True
+        totals += counts[:, :stop].sum(axis=1, dtype=np.int64)
+        # The frame at `stop` overflowed given the accepted prefix, so it is rejected
+        remaining, counts = remaining[stop + 1 :], counts[:, stop + 1 :]
+
+    return np.flatnonzero(selected)
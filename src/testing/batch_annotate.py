@@ -0,0 +1,369 @@
+# In src/testing/batch_annotate.py
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import time
+import cv2
+import pandas as pd
+from tqdm import tqdm
+
+from box_tracker import KeyframeTracker
+from detections import DETECTION_FORMATS, DetectionWriter, detection_paths, load_class_thresholds
+from generate_annotated_video import AnnotatedVideoSink, DetectionFileSink, FrameDetector, _run_sequential, positive_int
+from inference_backends import BACKENDS, load_model
+
+VIDEO_SUFFIXES = {".mp4", ".avi", ".mov", ".mkv"}
+
+# Set in each worker process by _init_worker: the model is loaded once per
+# worker and reused for every video it is given
+_worker = {}
+
+
+def find_videos(inputs) -> list:
+    """Expands directories and glob patterns into a sorted list of video files."""
+    videos = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            videos.update(p for p in path.rglob("*") if p.suffix.lower() in VIDEO_SUFFIXES)
+        else:
+            matches = (Path(p) for p in glob.glob(item, recursive=True))
+            videos.update(p for p in matches if p.suffix.lower() in VIDEO_SUFFIXES)
+    return sorted(videos)
+
+
+def _load_checkpoint(checkpoint_path: Path) -> dict:
+    try:
+        with open(checkpoint_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"segments": []}
+
+
+def _save_checkpoint(checkpoint_path: Path, checkpoint: dict):
+    tmp_path = checkpoint_path.with_name(checkpoint_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    tmp_path.replace(checkpoint_path)
+
+
+def _seek(cap, frame_index: int):
+    """Positions the capture at a frame; falls back to decoding forward if seeking is inexact."""
+    if frame_index == 0:
+        return
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != frame_index:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        for _ in range(frame_index):
+            cap.grab()
+
+
+def _merge_segments(job: dict, parts, metadata: dict, total_frames: int):
+    """Joins the finished segment files of one video into its final output."""
+    if job["output"] == "detections":
+        data_path, meta_path = detection_paths(Path(job["output_path"]), job["detections_format"])
+        boxes = 0
+        with open(data_path, "wb") as out:
+            for part in parts:
+                part_data, part_meta = detection_paths(Path(part), job["detections_format"])
+                out.write(part_data.read_bytes())
+                with open(part_meta, "r") as f:
+                    boxes += json.load(f)["boxes"]
+        with open(meta_path, "w") as f:
+            metadata = dict(metadata, format=job["detections_format"], frames=total_frames, boxes=boxes)
+            json.dump(metadata, f, indent=2)
+        return data_path
+
+    # Video segments are joined with ffmpeg's concat demuxer and stream copy,
+    # so the frames are encoded once, exactly as in a single run
+    output_path = Path(job["output_path"] + ".mp4")
+    list_path = Path(job["work_dir"]) / "segments.txt"
+    with open(list_path, "w") as f:
+        for part in parts:
+            segment = Path(part).with_suffix(".mp4").resolve().as_posix().replace("'", "'\\''")
+            f.write(f"file '{segment}'\n")
+    command = ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", str(list_path)]
+    result = subprocess.run([*command, "-c", "copy", str(output_path)], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not join the segments of {output_path.name}: {result.stderr.strip()}")
+    return output_path
+
+
+def _init_worker(weights_path: str, backend: str, class_thresholds_path: str, threads: int):
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    model = load_model(Path(weights_path), backend)
+    _worker["model"] = model
+    _worker["class_thresholds"] = (
+        load_class_thresholds(Path(class_thresholds_path), model.names) if class_thresholds_path else None
+    )
+
+
+def _annotate_video(job: dict) -> dict:
+    """
+    Worker: annotates one video in segments of `checkpoint_every` frames. Each
+    finished segment is recorded in the video's checkpoint file, so an
+    interrupted run resumes at the first unfinished segment.
+    """
+    model = _worker["model"]
+    video_path = Path(job["video"])
+    work_dir = Path(job["work_dir"])
+    work_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = work_dir / "checkpoint.json"
+    checkpoint = _load_checkpoint(checkpoint_path)
+    if checkpoint.get("settings") != job["settings"]:
+        # Different settings: earlier segments cannot be reused
+        checkpoint = {"settings": job["settings"], "segments": []}
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video file {video_path}")
+    metadata = {
+        "video": str(video_path.resolve()),
+        "fps": int(cap.get(cv2.CAP_PROP_FPS)),
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "names": model.names,
+        "conf": job["conf"],
+    }
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    start_frame = sum(segment["frames"] for segment in checkpoint["segments"])
+    resumed_from = start_frame
+    _seek(cap, start_frame)
+
+    tracker = None
+    if job["keyframe_interval"] > 1:
+        tracker = KeyframeTracker(keyframe_interval=job["keyframe_interval"])
+    detector = FrameDetector(
+        model, job["conf"], tracker=tracker, class_thresholds=_worker["class_thresholds"]
+    )
+    progress = tqdm(
+        total=total_frames, initial=start_frame, desc=video_path.stem, position=job["position"], leave=False
+    )
+
+    # 1. Process the remaining segments
+    while True:
+        part_path = work_dir / f"part_{len(checkpoint['segments']):05d}"
+        if job["output"] == "detections":
+            sink = DetectionFileSink(
+                DetectionWriter(part_path, job["detections_format"], metadata), start_frame=start_frame
+            )
+        else:
+            writer = cv2.VideoWriter(
+                str(part_path.with_suffix(".mp4")),
+                cv2.VideoWriter_fourcc(*"mp4v"),
+                metadata["fps"],
+                (metadata["width"], metadata["height"]),
+            )
+            sink = AnnotatedVideoSink(writer, model.names)
+
+        t0 = time.perf_counter()
+        frames = _run_sequential(
+            detector, cap, sink, progress, job["batch_size"], max_frames=job["checkpoint_every"]
+        )
+        sink.close()
+        if frames == 0:
+            # The video ended exactly on a segment boundary
+            for leftover in work_dir.glob(f"{part_path.name}.*"):
+                leftover.unlink()
+            break
+        seconds = time.perf_counter() - t0
+        checkpoint["segments"].append({"path": str(part_path), "frames": frames, "seconds": seconds})
+        _save_checkpoint(checkpoint_path, checkpoint)
+        start_frame += frames
+        if frames < job["checkpoint_every"]:
+            break
+    progress.close()
+    cap.release()
+
+    # 2. Join the segments into the final output
+    output_path = _merge_segments(job, [s["path"] for s in checkpoint["segments"]], metadata, start_frame)
+    checkpoint["completed"] = True
+    _save_checkpoint(checkpoint_path, checkpoint)
+
+    seconds = sum(segment["seconds"] for segment in checkpoint["segments"])
+    return {
+        "video": video_path.name,
+        "status": "done",
+        "frames": start_frame,
+        "resumed_from_frame": resumed_from,
+        "detector_frames": detector.detector_frames,
+        "seconds": seconds,
+        "fps": start_frame / seconds if seconds > 0 else 0.0,
+        "output": str(output_path),
+    }
+
+
+def batch_annotate(
+    inputs,
+    workers: int,
+    threads_per_worker: int,
+    checkpoint_every: int,
+    confidence_threshold: float,
+    batch_size: int,
+    keyframe_interval: int,
+    output: str,
+    detections_format: str,
+    backend: str,
+    class_thresholds_path: str,
+):
+    """
+    Annotates many videos with a pool of worker processes, each loading the
+    champion once. Progress is checkpointed per video every `checkpoint_every`
+    frames, so re-running the same command after a crash continues where each
+    video stopped; finished videos are skipped.
+
+    Args:
+        inputs (list[str]): Video files, directories or glob patterns.
+        workers (int): Number of worker processes.
+        threads_per_worker (int): Torch threads per worker (default: cores / workers).
+        checkpoint_every (int): Frames per checkpointed segment.
+        confidence_threshold (float): The minimum confidence score for a detection.
+        batch_size (int): Number of frames passed to each predict() call.
+        keyframe_interval (int): Run the detector at most every N frames (1 = every frame).
+        output (str): 'video' (annotated MP4) or 'detections' (detections file).
+        detections_format (str): 'bin' or 'jsonl' for --output detections.
+        backend (str): Inference runtime: 'torch', 'onnx' or 'openvino'.
+        class_thresholds_path (str): Optional per-class confidence config.
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    model_path = project_root / "runs" / "tournament" / "yolov8l_50epochs" / "weights" / "best.pt"
+    output_folder = project_root / "results"
+    work_root = output_folder / "batch_checkpoints"
+    work_root.mkdir(parents=True, exist_ok=True)
+
+    if not model_path.exists():
+        print(f"❌ ERROR: Champion model not found at {model_path}")
+        return
+    if output == "video" and shutil.which("ffmpeg") is None:
+        print("❌ ERROR: ffmpeg is needed to join the video segments without re-encoding.")
+        print("   Install it, or use --output detections.")
+        return
+    videos = find_videos(inputs)
+    if not videos:
+        print(f"❌ ERROR: No videos found in {inputs}")
+        return
+
+    settings = {
+        "conf": confidence_threshold,
+        "class_thresholds": class_thresholds_path,
+        "keyframe_interval": keyframe_interval,
+        "output": output,
+        "detections_format": detections_format,
+        "backend": backend,
+        "checkpoint_every": checkpoint_every,
+    }
+
+    # 2. Skip finished videos and build the jobs
+    jobs, summary = [], []
+    for video in videos:
+        work_dir = work_root / video.stem
+        checkpoint = _load_checkpoint(work_dir / "checkpoint.json")
+        if checkpoint.get("completed") and checkpoint.get("settings") == settings:
+            print(f"  ♻️ {video.name} already done, skipping.")
+            continue
+        suffix = "_detections" if output == "detections" else "_annotated"
+        jobs.append(
+            {
+                "video": str(video),
+                "work_dir": str(work_dir),
+                "output_path": str(output_folder / f"{video.stem}{suffix}"),
+                "settings": settings,
+                "conf": confidence_threshold,
+                "batch_size": batch_size,
+                "keyframe_interval": keyframe_interval,
+                "checkpoint_every": checkpoint_every,
+                "output": output,
+                "detections_format": detections_format,
+                "position": len(jobs) % workers + 1,
+            }
+        )
+
+    # 3. Run the jobs on the pool; a failing video does not stop the others
+    threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    print(f"--- Annotating {len(jobs)} videos with {workers} workers ({threads} threads each) ---")
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(str(model_path), backend, class_thresholds_path, threads),
+    ) as pool:
+        futures = {pool.submit(_annotate_video, job): job for job in jobs}
+        overall = tqdm(total=len(jobs), desc="Videos", position=0)
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                summary.append(future.result())
+            except Exception as e:
+                summary.append({"video": Path(job["video"]).name, "status": f"failed: {e}"})
+                tqdm.write(f"  ❌ WARNING: {Path(job['video']).name} failed: {e}")
+            overall.update(1)
+        overall.close()
+    elapsed = time.perf_counter() - start
+
+    # 4. Throughput summary
+    if not summary:
+        print("\nNothing to do: every video is already annotated.")
+        return
+    df = pd.DataFrame(summary).sort_values("video")
+    summary_path = output_folder / "batch_annotation_summary.csv"
+    df.to_csv(summary_path, index=False)
+    done = df[df["status"] == "done"]
+    print("\n--- Batch Annotation Summary ---")
+    print(df.drop(columns=["output"], errors="ignore").round(2).to_string(index=False))
+    if not done.empty:
+        new_frames = int((done["frames"] - done["resumed_from_frame"]).sum())
+        print(
+            f"\n  {len(done)}/{len(df)} videos done, {new_frames} frames in {elapsed:.1f} s "
+            f"({new_frames / elapsed:.1f} frames/sec overall)"
+        )
+    print(f"✅ Summary saved to: {summary_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Annotate a folder of videos with a process pool, resumable after interruption."
+    )
+    parser.add_argument(
+        "inputs", type=str, nargs="+", help="Video files, directories or glob patterns (quote globs)."
+    )
+    parser.add_argument("--workers", type=positive_int, default=2, help="Number of worker processes.")
+    parser.add_argument("--threads-per-worker", type=positive_int, default=None, help="Torch threads per worker.")
+    parser.add_argument(
+        "--checkpoint-every", type=positive_int, default=5000, help="Frames between checkpoints of a video."
+    )
+    parser.add_argument("--conf", type=float, default=0.5, help="Confidence threshold for detection.")
+    parser.add_argument("--batch-size", type=positive_int, default=1, help="Frames per predict() call.")
+    parser.add_argument("--keyframe-interval", type=positive_int, default=1, help="Run the detector every N frames.")
+    parser.add_argument("--output", type=str, default="video", choices=["video", "detections"])
+    parser.add_argument("--detections-format", type=str, default="bin", choices=DETECTION_FORMATS)
+    parser.add_argument("--backend", type=str, default="torch", choices=BACKENDS, help="Inference runtime.")
+    parser.add_argument(
+        "--class-thresholds", type=str, default=None, help="Per-class confidence config (overrides --conf)."
+    )
+
+    args = parser.parse_args()
+    batch_annotate(
+        inputs=args.inputs,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        checkpoint_every=args.checkpoint_every,
+        confidence_threshold=args.conf,
+        batch_size=args.batch_size,
+        keyframe_interval=args.keyframe_interval,
+        output=args.output,
+        detections_format=args.detections_format,
+        backend=args.backend,
+        class_thresholds_path=args.class_thresholds,
+    )
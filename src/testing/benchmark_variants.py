@@ -0,0 +1,230 @@
+# In src/testing/benchmark_variants.py
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import argparse
+import json
+import threading
+import time
+import cv2
+import numpy as np
+import pandas as pd
+import psutil
+
+from eval_cache import dataset_split_images
+from generate_annotated_video import positive_int
+from inference_backends import BACKENDS, load_model
+
+
+BENCHMARK_CSV = "inference_benchmark.csv"
+
+
+class PeakRSSMonitor:
+    """
+    Samples the resident memory of this process from a background thread
+    while the `with` block runs, so short allocation spikes inside predict()
+    are caught. The maximum is in `peak`.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        self.peak = max(self.peak, self._process.memory_info().rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def _benchmark_variant(job: dict) -> list:
+    """
+    Worker: loads one model and times inference at every (imgsz, batch) setting.
+    Runs in its own process so the peak RSS belongs to this model alone; the
+    peak is measured separately for each setting.
+    """
+    start = time.perf_counter()
+    model = load_model(Path(job["weights"]), job["backend"])
+    load_seconds = time.perf_counter() - start
+
+    frames = [cv2.imread(path) for path in job["images"]]
+    rows = []
+    for imgsz in job["imgsz"]:
+        for batch_size in job["batch_sizes"]:
+            batches = [
+                [frames[(i * batch_size + j) % len(frames)] for j in range(batch_size)]
+                for i in range(job["warmup"] + job["iterations"])
+            ]
+
+            with PeakRSSMonitor() as rss:
+                for batch in batches[: job["warmup"]]:
+                    model.predict(batch, imgsz=imgsz, verbose=False)
+
+                latencies = []
+                for batch in batches[job["warmup"] :]:
+                    t0 = time.perf_counter()
+                    model.predict(batch, imgsz=imgsz, verbose=False)
+                    latencies.append((time.perf_counter() - t0) * 1000.0)
+
+            latencies = np.asarray(latencies)
+            per_frame = latencies / batch_size
+            rows.append(
+                {
+                    "Model": job["model"],
+                    "backend": job["backend"],
+                    "imgsz": imgsz,
+                    "batch": batch_size,
+                    "latency_p50_ms": float(np.percentile(per_frame, 50)),
+                    "latency_p95_ms": float(np.percentile(per_frame, 95)),
+                    "latency_p99_ms": float(np.percentile(per_frame, 99)),
+                    "batch_latency_p50_ms": float(np.percentile(latencies, 50)),
+                    "fps": float(batch_size * len(latencies) / (latencies.sum() / 1000.0)),
+                    "peak_rss_mb": rss.peak / 1e6,
+                    "load_time_s": load_seconds,
+                }
+            )
+            print(
+                f"  - {job['model']} imgsz={imgsz} batch={batch_size}: "
+                f"p50 {rows[-1]['latency_p50_ms']:.1f} ms/frame, {rows[-1]['fps']:.1f} FPS"
+            )
+    return rows
+
+
+def load_benchmark_results(benchmark_dir: Path, imgsz: int = 640, batch: int = 1, backend: str = "torch"):
+    """
+    Returns one latency row per model from a saved benchmark (for joining into
+    the tournament results table), or None if no benchmark has been run.
+    """
+    csv_path = benchmark_dir / BENCHMARK_CSV
+    if not csv_path.exists():
+        return None
+    df = pd.read_csv(csv_path)
+    df = df[(df["imgsz"] == imgsz) & (df["batch"] == batch) & (df["backend"] == backend)]
+    if df.empty:
+        return None
+    return df.set_index("Model")[
+        ["latency_p50_ms", "latency_p95_ms", "latency_p99_ms", "fps", "peak_rss_mb", "load_time_s"]
+    ]
+
+
+def benchmark_all_variants(
+    variants,
+    imgsz_values,
+    batch_sizes,
+    backend: str,
+    warmup: int,
+    iterations: int,
+    num_images: int,
+):
+    """
+    Measures what each tournament variant costs in production: model load
+    time, per-frame latency percentiles, throughput and peak memory, for
+    several image sizes and batch sizes. Results go to
+    runs/benchmarks/inference_benchmark.{csv,json}.
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    tournament_runs_path = project_root / "runs" / "tournament"
+    data_yaml_path = project_root / "data" / "final_dataset" / "final_dataset.yaml"
+    output_dir = project_root / "runs" / "benchmarks"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if not data_yaml_path.exists():
+        print(f"❌ ERROR: Dataset YAML not found at {data_yaml_path}")
+        return
+    # Either an images/val folder or a val.txt image list, as the YAML says
+    images = dataset_split_images(data_yaml_path, "val")
+    if not images:
+        print(f"❌ ERROR: No benchmark images in the val split of {data_yaml_path}")
+        return
+    picks = np.linspace(0, len(images) - 1, min(num_images, len(images))).astype(int)
+    images = [str(images[i]) for i in picks]
+
+    # 2. Benchmark each variant in a fresh process
+    print(f"--- Benchmarking inference ({backend}) on {len(images)} real frames ---")
+    all_rows = []
+    context = multiprocessing.get_context("spawn")
+    for variant in variants:
+        run_name = f"yolov8{variant}_50epochs"
+        weights_path = tournament_runs_path / run_name / "weights" / "best.pt"
+        print(f"\n--- Benchmarking YOLOv8{variant} ---")
+        if not weights_path.exists():
+            print(f"  ❌ WARNING: Model not found at {weights_path}. Skipping.")
+            continue
+
+        job = {
+            "model": f"YOLOv8{variant}",
+            "weights": str(weights_path),
+            "backend": backend,
+            "imgsz": list(imgsz_values),
+            "batch_sizes": list(batch_sizes),
+            "warmup": warmup,
+            "iterations": iterations,
+            "images": images,
+        }
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            all_rows.extend(pool.submit(_benchmark_variant, job).result())
+
+    if not all_rows:
+        print("\n❌ FATAL ERROR: No models were benchmarked. Aborting.")
+        return
+
+    # 3. Save the results, replacing earlier rows for the same settings
+    df = pd.DataFrame(all_rows)
+    csv_path = output_dir / BENCHMARK_CSV
+    if csv_path.exists():
+        keys = ["Model", "backend", "imgsz", "batch"]
+        previous = pd.read_csv(csv_path)
+        merged = previous.merge(df[keys], on=keys, how="left", indicator=True)
+        previous = previous[(merged["_merge"] == "left_only").values]
+        df = pd.concat([previous, df], ignore_index=True)
+    df.to_csv(csv_path, index=False)
+    with open(csv_path.with_suffix(".json"), "w") as f:
+        json.dump(df.to_dict(orient="records"), f, indent=2)
+
+    print("\n--- Benchmark Summary ---")
+    print(df.round(2).to_string(index=False))
+    print(f"\n✅ Benchmark saved to: {csv_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark inference latency/throughput of the tournament variants."
+    )
+    parser.add_argument(
+        "--variants", type=str, nargs="+", default=["n", "s", "m", "l", "x"],
+        choices=["n", "s", "m", "l", "x"], help="Variants to benchmark.",
+    )
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640], help="Image sizes to test.")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8], help="Batch sizes to test.")
+    parser.add_argument("--backend", type=str, default="torch", choices=BACKENDS, help="Inference runtime.")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed warm-up iterations.")
+    parser.add_argument("--iterations", type=int, default=100, help="Timed iterations per setting.")
+    parser.add_argument("--images", type=positive_int, default=32, help="Number of val frames to cycle through.")
+
+    args = parser.parse_args()
+    benchmark_all_variants(
+        variants=args.variants,
+        imgsz_values=args.imgsz,
+        batch_sizes=args.batch,
+        backend=args.backend,
+        warmup=args.warmup,
+        iterations=args.iterations,
+        num_images=args.images,
+    )
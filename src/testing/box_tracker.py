@@ -0,0 +1,145 @@
+# In src/testing/box_tracker.py
+
+import cv2
+import numpy as np
+
+from detections import empty_detections
+
+
+class KeyframeTracker:
+    """
+    Carries detector boxes across the frames between two keyframes with
+    sparse Lucas-Kanade optical flow.
+
+    A new detection is requested when the keyframe interval runs out, when
+    the frame differs too much from the last keyframe (scene change, camera
+    moved in or out of the trocar), or when too few flow points inside the
+    boxes could be tracked reliably.
+
+    Args:
+        keyframe_interval (int): Maximum number of frames between detections.
+        scene_change_threshold (float): Mean absolute grey-level difference
+            (0-255) to the last keyframe that forces a new detection.
+        min_track_confidence (float): Minimum fraction of flow points that
+            must be tracked reliably in every box.
+        flow_scale (float): Frames are downscaled by this factor for tracking.
+        points_per_box (int): Approximate number of flow points sampled per box.
+    """
+
+    def __init__(
+        self,
+        keyframe_interval: int = 5,
+        scene_change_threshold: float = 20.0,
+        min_track_confidence: float = 0.5,
+        flow_scale: float = 0.5,
+        points_per_box: int = 25,
+    ):
+        self.keyframe_interval = keyframe_interval
+        self.scene_change_threshold = scene_change_threshold
+        self.min_track_confidence = min_track_confidence
+        self.flow_scale = flow_scale
+        self.points_per_box = points_per_box
+
+        self.keyframes = 0
+        self.frames = 0
+        self._since_keyframe = 0
+        self._keyframe_thumb = None
+        self._prev_gray = None
+        self._boxes = empty_detections()
+        self._track_confidence = 1.0
+        self._gray_cache = (None, None)
+
+    def _gray(self, frame):
+        # needs_detection() and reset()/propagate() see the same frame; convert it once
+        if self._gray_cache[0] is frame:
+            return self._gray_cache[1]
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.flow_scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.flow_scale, fy=self.flow_scale)
+        self._gray_cache = (frame, gray)
+        return gray
+
+    @staticmethod
+    def _thumbnail(gray):
+        return cv2.resize(gray, (64, 36), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def needs_detection(self, frame) -> bool:
+        """Decides whether the detector must run on this frame."""
+        if self._prev_gray is None or self._since_keyframe >= self.keyframe_interval - 1:
+            return True
+        if self._track_confidence < self.min_track_confidence:
+            return True
+        thumb = self._thumbnail(self._gray(frame))
+        return float(np.mean(np.abs(thumb - self._keyframe_thumb))) > self.scene_change_threshold
+
+    def reset(self, frame, detections: np.ndarray):
+        """Starts a new track segment from fresh detector output on a keyframe."""
+        gray = self._gray(frame)
+        self._prev_gray = gray
+        self._keyframe_thumb = self._thumbnail(gray)
+        self._boxes = detections.copy()
+        self._since_keyframe = 0
+        self._track_confidence = 1.0
+        self.keyframes += 1
+        self.frames += 1
+
+    def _box_points(self, box):
+        """Samples a regular grid of flow points inside a box (in flow coordinates)."""
+        x1, y1, x2, y2 = box[:4] * self.flow_scale
+        side = max(2, int(np.sqrt(self.points_per_box)))
+        # Stay away from the box border, which usually shows background
+        xs = np.linspace(x1 + 0.2 * (x2 - x1), x2 - 0.2 * (x2 - x1), side)
+        ys = np.linspace(y1 + 0.2 * (y2 - y1), y2 - 0.2 * (y2 - y1), side)
+        grid = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 1, 2)
+        return grid.astype(np.float32)
+
+    def propagate(self, frame) -> np.ndarray:
+        """Moves the current boxes onto this frame and returns them."""
+        gray = self._gray(frame)
+        self.frames += 1
+        self._since_keyframe += 1
+
+        if len(self._boxes) == 0:
+            self._prev_gray = gray
+            return empty_detections()
+
+        points = [self._box_points(box) for box in self._boxes]
+        all_points = np.concatenate(points)
+        lk_params = dict(winSize=(21, 21), maxLevel=3)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, all_points, None, **lk_params)
+        # Forward-backward check rejects points that drifted onto other structures
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev_gray, moved, None, **lk_params)
+        fb_error = np.linalg.norm((back - all_points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < 1.0)
+
+        new_boxes = self._boxes.copy()
+        confidences = []
+        start = 0
+        for i, box_points in enumerate(points):
+            end = start + len(box_points)
+            ok = good[start:end]
+            confidences.append(ok.mean())
+            if ok.sum() >= 3:
+                before = box_points.reshape(-1, 2)[ok]
+                after = moved.reshape(-1, 2)[start:end][ok]
+                shift = np.median(after - before, axis=0) / self.flow_scale
+
+                # Scale from the change in spread of the tracked points
+                spread_before = np.median(np.linalg.norm(before - before.mean(axis=0), axis=1))
+                spread_after = np.median(np.linalg.norm(after - after.mean(axis=0), axis=1))
+                scale = spread_after / spread_before if spread_before > 1e-3 else 1.0
+
+                x1, y1, x2, y2 = self._boxes[i, :4]
+                cx, cy = (x1 + x2) / 2 + shift[0], (y1 + y2) / 2 + shift[1]
+                half_w, half_h = (x2 - x1) / 2 * scale, (y2 - y1) / 2 * scale
+                new_boxes[i, :4] = [cx - half_w, cy - half_h, cx + half_w, cy + half_h]
+            start = end
+
+        height, width = frame.shape[:2]
+        new_boxes[:, [0, 2]] = np.clip(new_boxes[:, [0, 2]], 0, width - 1)
+        new_boxes[:, [1, 3]] = np.clip(new_boxes[:, [1, 3]], 0, height - 1)
+
+        self._track_confidence = float(min(confidences))
+        self._boxes = new_boxes
+        self._prev_gray = gray
+        return new_boxes.copy()
@@ -0,0 +1,315 @@
+# In src/testing/detection_metrics.py
+
+import numpy as np
+
+from detections import CLS, CONF
+
+
+# The COCO IoU thresholds used for mAP@50-95
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """Returns the (N, M) IoU matrix between two sets of xyxy boxes."""
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    top_left = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    bottom_right = np.minimum(boxes1[:, None, 2:4], boxes2[None, :, 2:4])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    return inter / (area1[:, None] + area2[None, :] - inter + 1e-9)
+
+
+def match_detections(
+    predictions: np.ndarray, targets: np.ndarray, iou_thresholds=IOU_THRESHOLDS
+) -> np.ndarray:
+    """
+    Matches the predictions of one frame to its targets, the same way the
+    Ultralytics validator does: per IoU threshold, candidate pairs of the same
+    class are taken in order of decreasing IoU, each prediction and each
+    target used at most once.
+
+    Args:
+        predictions (np.ndarray): (N, 6) detection array.
+        targets (np.ndarray): (M, 6) detection array (the conf column is ignored).
+        iou_thresholds (np.ndarray): IoU thresholds to evaluate.
+
+    Returns:
+        np.ndarray: (N, T) boolean true-positive matrix.
+    """
+    iou_thresholds = np.asarray(iou_thresholds)
+    correct = np.zeros((len(predictions), len(iou_thresholds)), dtype=bool)
+    if len(predictions) == 0 or len(targets) == 0:
+        return correct
+
+    iou = box_iou(targets[:, :4], predictions[:, :4])
+    iou = iou * (targets[:, None, CLS] == predictions[None, :, CLS])
+    for t, threshold in enumerate(iou_thresholds):
+        target_idx, pred_idx = np.nonzero(iou >= threshold)
+        if not len(target_idx):
+            continue
+        order = np.argsort(-iou[target_idx, pred_idx], kind="stable")
+        target_idx, pred_idx = target_idx[order], pred_idx[order]
+        _, first = np.unique(pred_idx, return_index=True)
+        target_idx, pred_idx = target_idx[first], pred_idx[first]
+        _, first = np.unique(target_idx, return_index=True)
+        correct[pred_idx[first], t] = True
+    return correct
+
+
+def compute_ap(recall: np.ndarray, precision: np.ndarray) -> float:
+    """Area under a precision-recall curve with 101-point (COCO) interpolation."""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    y = np.interp(x, mrec, mpre)
+    return float(np.sum(np.diff(x) * (y[1:] + y[:-1]) / 2))
+
+
+def precision_recall_by_class(
+    correct: np.ndarray, conf: np.ndarray, pred_cls: np.ndarray, target_cls: np.ndarray,
+    num_classes: int,
+) -> list:
+    """
+    Builds the precision/recall curve of every class by sweeping the
+    confidence threshold down through its predictions.
+
+    Args:
+        correct (np.ndarray): (N, T) true-positive matrix of all predictions.
+        conf (np.ndarray): (N,) prediction confidences.
+        pred_cls (np.ndarray): (N,) predicted class ids.
+        target_cls (np.ndarray): (M,) class ids of all targets.
+        num_classes (int): Number of classes.
+
+    Returns:
+        list[dict]: Per class, its prediction confidences in decreasing order
+            ('conf', (n,)), the precision and recall obtained when keeping
+            predictions down to each of them ('precision', 'recall', (n, T))
+            and its number of targets ('targets').
+    """
+    order = np.argsort(-conf, kind="stable")
+    correct, conf, pred_cls = correct[order], conf[order], pred_cls[order].astype(int)
+    num_targets = np.bincount(target_cls.astype(int), minlength=num_classes)
+
+    curves = []
+    for c in range(num_classes):
+        is_class = pred_cls == c
+        tp = np.cumsum(correct[is_class], axis=0)
+        fp = np.cumsum(~correct[is_class], axis=0)
+        curves.append(
+            {
+                "conf": conf[is_class],
+                "precision": tp / np.maximum(tp + fp, 1),
+                "recall": tp / max(num_targets[c], 1),
+                "targets": int(num_targets[c]),
+            }
+        )
+    return curves
+
+
+def ap_per_class(
+    correct: np.ndarray, conf: np.ndarray, pred_cls: np.ndarray, target_cls: np.ndarray,
+    num_classes: int,
+) -> np.ndarray:
+    """
+    Computes the average precision of every class at every IoU threshold.
+
+    Args:
+        correct (np.ndarray): (N, T) true-positive matrix of all predictions.
+        conf (np.ndarray): (N,) prediction confidences.
+        pred_cls (np.ndarray): (N,) predicted class ids.
+        target_cls (np.ndarray): (M,) class ids of all targets.
+        num_classes (int): Number of classes.
+
+    Returns:
+        np.ndarray: (num_classes, T) AP matrix; classes without targets are NaN.
+    """
+    curves = precision_recall_by_class(correct, conf, pred_cls, target_cls, num_classes)
+    ap = np.full((num_classes, correct.shape[1]), np.nan)
+    for c, curve in enumerate(curves):
+        if curve["targets"] == 0:
+            continue
+        if len(curve["conf"]) == 0:
+            ap[c] = 0.0
+            continue
+        for t in range(correct.shape[1]):
+            ap[c, t] = compute_ap(curve["recall"][:, t], curve["precision"][:, t])
+    return ap
+
+
+def frame_bounds(frame_ids: np.ndarray, num_frames: int) -> np.ndarray:
+    """Row offsets of every frame in an array of rows sorted by frame id."""
+    return np.searchsorted(frame_ids, np.arange(num_frames + 1))
+
+
+def match_by_frame(
+    pred_frame: np.ndarray, predictions: np.ndarray, target_frame: np.ndarray, targets: np.ndarray,
+    num_frames: int, iou_thresholds=IOU_THRESHOLDS,
+) -> np.ndarray:
+    """
+    match_detections() over a whole split stored as flat, frame-sorted
+    columns (see prediction_cache.py).
+
+    Returns:
+        np.ndarray: (N, T) boolean true-positive matrix, aligned with `predictions`.
+    """
+    correct = np.zeros((len(predictions), len(iou_thresholds)), dtype=bool)
+    pred_bounds = frame_bounds(pred_frame, num_frames)
+    target_bounds = frame_bounds(target_frame, num_frames)
+    # Frames with both predictions and targets are the only ones with matches
+    busy = np.nonzero((np.diff(pred_bounds) > 0) & (np.diff(target_bounds) > 0))[0]
+    for f in busy:
+        p0, p1 = pred_bounds[f], pred_bounds[f + 1]
+        t0, t1 = target_bounds[f], target_bounds[f + 1]
+        correct[p0:p1] = match_detections(predictions[p0:p1], targets[t0:t1], iou_thresholds)
+    return correct
+
+
+def confusion_matrix(
+    pred_frame: np.ndarray, predictions: np.ndarray, target_frame: np.ndarray, targets: np.ndarray,
+    num_frames: int, num_classes: int, conf_threshold: float = 0.25, iou_threshold: float = 0.45,
+) -> np.ndarray:
+    """
+    Detection confusion matrix in the Ultralytics layout: rows are predicted
+    classes, columns true classes, and the last row/column is background
+    (missed targets and false alarms). Boxes are paired regardless of class,
+    by decreasing IoU above `iou_threshold`.
+
+    Returns:
+        np.ndarray: (num_classes + 1, num_classes + 1) matrix of box counts.
+    """
+    keep = predictions[:, CONF] >= conf_threshold
+    pred_frame, predictions = pred_frame[keep], predictions[keep]
+    pred_bounds = frame_bounds(pred_frame, num_frames)
+    target_bounds = frame_bounds(target_frame, num_frames)
+    background = num_classes
+
+    matrix = np.zeros((num_classes + 1, num_classes + 1), dtype=np.int64)
+    pred_cls = predictions[:, CLS].astype(int)
+    target_cls = targets[:, CLS].astype(int)
+    pred_matched = np.zeros(len(predictions), dtype=bool)
+    target_matched = np.zeros(len(targets), dtype=bool)
+
+    busy = np.nonzero((np.diff(pred_bounds) > 0) & (np.diff(target_bounds) > 0))[0]
+    for f in busy:
+        p0, p1 = pred_bounds[f], pred_bounds[f + 1]
+        t0, t1 = target_bounds[f], target_bounds[f + 1]
+        iou = box_iou(targets[t0:t1, :4], predictions[p0:p1, :4])
+        target_idx, pred_idx = np.nonzero(iou > iou_threshold)
+        if not len(target_idx):
+            continue
+        order = np.argsort(-iou[target_idx, pred_idx], kind="stable")
+        target_idx, pred_idx = target_idx[order], pred_idx[order]
+        _, first = np.unique(pred_idx, return_index=True)
+        target_idx, pred_idx = target_idx[first], pred_idx[first]
+        _, first = np.unique(target_idx, return_index=True)
+        target_idx, pred_idx = target_idx[first] + t0, pred_idx[first] + p0
+        np.add.at(matrix, (pred_cls[pred_idx], target_cls[target_idx]), 1)
+        pred_matched[pred_idx] = True
+        target_matched[target_idx] = True
+
+    np.add.at(matrix, (background, target_cls[~target_matched]), 1)
+    np.add.at(matrix, (pred_cls[~pred_matched], background), 1)
+    return matrix
+
+
+def evaluate_detections(predictions_per_frame, targets_per_frame, num_classes: int) -> dict:
+    """
+    Computes mAP@50 and mAP@50-95 of per-frame predictions against per-frame
+    targets (both lists of detection arrays, aligned by frame).
+    """
+    correct, conf, pred_cls, target_cls = [], [], [], []
+    for predictions, targets in zip(predictions_per_frame, targets_per_frame):
+        correct.append(match_detections(predictions, targets))
+        conf.append(predictions[:, CONF])
+        pred_cls.append(predictions[:, CLS])
+        target_cls.append(targets[:, CLS])
+
+    ap = ap_per_class(
+        np.concatenate(correct) if correct else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool),
+        np.concatenate(conf) if conf else np.zeros(0),
+        np.concatenate(pred_cls) if pred_cls else np.zeros(0),
+        np.concatenate(target_cls) if target_cls else np.zeros(0),
+        num_classes,
+    )
+    return {
+        "mAP50": float(np.nanmean(ap[:, 0])) if np.isfinite(ap).any() else 0.0,
+        "mAP50-95": float(np.nanmean(ap.mean(axis=1))) if np.isfinite(ap).any() else 0.0,
+        "ap50_per_class": ap[:, 0],
+    }
+
+
+def evaluate_predictions(
+    pred_frame: np.ndarray, predictions: np.ndarray, target_frame: np.ndarray, targets: np.ndarray,
+    num_frames: int, num_classes: int, conf_threshold: float = 0.0, classes=None,
+    iou_thresholds=IOU_THRESHOLDS,
+) -> dict:
+    """
+    Full evaluation of a split from stored predictions, without the model.
+
+    Args:
+        pred_frame (np.ndarray): (N,) frame id of every prediction, sorted.
+        predictions (np.ndarray): (N, 6) detection array of the whole split.
+        target_frame (np.ndarray): (M,) frame id of every target, sorted.
+        targets (np.ndarray): (M, 6) ground-truth array (conf column ignored).
+        num_frames (int): Number of frames in the split.
+        num_classes (int): Number of classes.
+        conf_threshold (float): Predictions below this confidence are dropped first.
+        classes (list[int]): Only evaluate these classes (None = all).
+        iou_thresholds (np.ndarray): IoU thresholds; the first one is used for
+            the PR curves and the 'mAP50' entry.
+
+    Returns:
+        dict: 'mAP50', 'mAP50-95' (mean over `iou_thresholds`), the (C, T) 'ap'
+            matrix, 'ap50_per_class', the per-class 'pr_curves' (precision on a
+            101-point recall grid), 'precision'/'recall'/'f1' at the confidence
+            with the best mean F1 ('best_conf'), and the 'confusion_matrix'.
+    """
+    iou_thresholds = np.asarray(iou_thresholds)
+    keep = predictions[:, CONF] >= conf_threshold
+    keep_targets = np.ones(len(targets), dtype=bool)
+    if classes is not None:
+        keep &= np.isin(predictions[:, CLS], classes)
+        keep_targets &= np.isin(targets[:, CLS], classes)
+    pred_frame, predictions = pred_frame[keep], predictions[keep]
+    target_frame, targets = target_frame[keep_targets], targets[keep_targets]
+
+    correct = match_by_frame(pred_frame, predictions, target_frame, targets, num_frames, iou_thresholds)
+    conf, pred_cls, target_cls = predictions[:, CONF], predictions[:, CLS], targets[:, CLS]
+    ap = ap_per_class(correct, conf, pred_cls, target_cls, num_classes)
+
+    # PR curves on a common recall grid, and P/R/F1 against the confidence
+    recall_grid = np.linspace(0, 1, 101)
+    conf_grid = np.linspace(0, 1, 1000)
+    pr_curves = np.zeros((num_classes, len(recall_grid)))
+    p_conf = np.zeros((num_classes, len(conf_grid)))
+    r_conf = np.zeros((num_classes, len(conf_grid)))
+    curves = precision_recall_by_class(correct, conf, pred_cls, target_cls, num_classes)
+    for c, curve in enumerate(curves):
+        if curve["targets"] == 0 or len(curve["conf"]) == 0:
+            continue
+        precision, recall = curve["precision"][:, 0], curve["recall"][:, 0]
+        envelope = np.flip(np.maximum.accumulate(np.flip(precision)))
+        pr_curves[c] = np.interp(recall_grid, recall, envelope, right=0.0)
+        # np.interp needs increasing x, so flip the decreasing confidences
+        p_conf[c] = np.interp(-conf_grid, -curve["conf"], precision, left=1.0)
+        r_conf[c] = np.interp(-conf_grid, -curve["conf"], recall, left=0.0)
+
+    evaluated = np.isfinite(ap[:, 0])
+    f1 = 2 * p_conf * r_conf / np.maximum(p_conf + r_conf, 1e-16)
+    best = int(f1[evaluated].mean(axis=0).argmax()) if evaluated.any() else 0
+
+    return {
+        "mAP50": float(np.nanmean(ap[:, 0])) if evaluated.any() else 0.0,
+        "mAP50-95": float(np.nanmean(ap.mean(axis=1))) if evaluated.any() else 0.0,
+        "ap": ap,
+        "ap50_per_class": ap[:, 0],
+        "pr_curves": pr_curves,
+        "best_conf": float(conf_grid[best]),
+        "precision": p_conf[:, best],
+        "recall": r_conf[:, best],
+        "f1": f1[:, best],
+        "confusion_matrix": confusion_matrix(
+            pred_frame, predictions, target_frame, targets, num_frames, num_classes
+        ),
+    }
@@ -0,0 +1,208 @@
+# In src/testing/detections.py
+
+import json
+from pathlib import Path
+import cv2
+import numpy as np
+
+
+# Column layout of a per-frame detection array: one row per box
+X1, Y1, X2, Y2, CONF, CLS = range(6)
+
+# One record per box in a detections file (26 bytes, packed)
+DETECTION_DTYPE = np.dtype(
+    [
+        ("frame", "<u4"),
+        ("cls", "<u2"),
+        ("conf", "<f4"),
+        ("x1", "<f4"),
+        ("y1", "<f4"),
+        ("x2", "<f4"),
+        ("y2", "<f4"),
+    ]
+)
+DETECTION_FORMATS = ["bin", "jsonl"]
+
+
+def empty_detections() -> np.ndarray:
+    """Returns a (0, 6) detection array."""
+    return np.zeros((0, 6), dtype=np.float32)
+
+
+def result_to_detections(result) -> np.ndarray:
+    """
+    Converts one Ultralytics prediction result into an (N, 6) float32 array
+    of [x1, y1, x2, y2, conf, class_id] rows in original frame pixels.
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return empty_detections()
+    return np.concatenate(
+        [
+            boxes.xyxy.cpu().numpy(),
+            boxes.conf.cpu().numpy()[:, None],
+            boxes.cls.cpu().numpy()[:, None],
+        ],
+        axis=1,
+    ).astype(np.float32)
+
+
+def draw_detections(frame, detections: np.ndarray, class_names):
+    """Draws the boxes and labels of a detection array onto the frame in place."""
+    for row in detections:
+        x1, y1, x2, y2 = [int(x) for x in row[:4]]
+        conf = float(row[CONF])
+        class_id = int(row[CLS])
+        class_name = class_names[class_id]
+
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color=(0, 255, 0), thickness=2)
+        label = f"{class_name} {conf:.2f}"
+        cv2.putText(
+            frame,
+            label,
+            (x1, y1 - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (0, 255, 0),
+            2,
+        )
+    return frame
+
+
+def load_class_thresholds(config_path: Path, class_names) -> np.ndarray:
+    """
+    Loads a per-class confidence threshold config (see optimize_thresholds.py)
+    into an array indexed by class id. Classes missing from the config get
+    its 'default' threshold.
+
+    Args:
+        config_path (Path): The JSON config.
+        class_names (dict | list): The model's class names, by class id.
+
+    Returns:
+        np.ndarray: (num_classes,) float32 thresholds.
+    """
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    names = class_names.values() if isinstance(class_names, dict) else class_names
+    return np.array(
+        [config["thresholds"].get(name, config["default"]) for name in names], dtype=np.float32
+    )
+
+
+def apply_class_thresholds(detections: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """Keeps the boxes whose confidence reaches the threshold of their class."""
+    return detections[detections[:, CONF] >= thresholds[detections[:, CLS].astype(int)]]
+
+
+def detections_to_records(frame_index: int, detections: np.ndarray) -> np.ndarray:
+    """Converts one frame's (N, 6) detection array into DETECTION_DTYPE records."""
+    records = np.empty(len(detections), dtype=DETECTION_DTYPE)
+    records["frame"] = frame_index
+    records["cls"] = detections[:, CLS]
+    records["conf"] = detections[:, CONF]
+    records["x1"], records["y1"] = detections[:, X1], detections[:, Y1]
+    records["x2"], records["y2"] = detections[:, X2], detections[:, Y2]
+    return records
+
+
+def records_to_detections(records: np.ndarray) -> np.ndarray:
+    """Converts DETECTION_DTYPE records back into an (N, 6) detection array."""
+    return np.stack(
+        [records["x1"], records["y1"], records["x2"], records["y2"], records["conf"], records["cls"]],
+        axis=1,
+    ).astype(np.float32)
+
+
+def detection_paths(output_path: Path, fmt: str):
+    """
+    Returns the (data, metadata) file paths of a detections file. The
+    suffixes are appended, so dots in the name (e.g. 'case.01') are kept.
+    """
+    output_path = Path(output_path)
+    suffix = ".jsonl" if fmt == "jsonl" else ".bin"
+    return output_path.with_name(output_path.name + suffix), output_path.with_name(output_path.name + ".json")
+
+
+class DetectionWriter:
+    """
+    Streams per-frame detections to disk while a video is processed.
+
+    The 'bin' format appends raw DETECTION_DTYPE records to a header-less
+    '.bin' file, readable with np.fromfile / np.memmap (not np.load); 'jsonl' writes one JSON object
+    per box. Both get a '.json' sidecar with the video metadata and class
+    names, written on close().
+
+    Args:
+        output_path (Path): Output path without suffix.
+        fmt (str): 'bin' or 'jsonl'.
+        metadata (dict): Video metadata stored in the sidecar.
+    """
+
+    def __init__(self, output_path: Path, fmt: str, metadata: dict):
+        self.fmt = fmt
+        self.data_path, self.meta_path = detection_paths(output_path, fmt)
+        self.metadata = dict(metadata, format=fmt, dtype=DETECTION_DTYPE.descr)
+        self.frames = 0
+        self.boxes = 0
+        self._file = open(self.data_path, "w" if fmt == "jsonl" else "wb")
+
+    def write(self, frame_index: int, detections: np.ndarray):
+        if self.fmt == "jsonl":
+            for row in detections:
+                record = {
+                    "frame": frame_index,
+                    "cls": int(row[CLS]),
+                    "conf": round(float(row[CONF]), 4),
+                    "xyxy": [round(float(v), 1) for v in row[:4]],
+                }
+                self._file.write(json.dumps(record) + "\n")
+        else:
+            self._file.write(detections_to_records(frame_index, detections).tobytes())
+        self.frames = max(self.frames, frame_index + 1)
+        self.boxes += len(detections)
+
+    def close(self):
+        self._file.close()
+        with open(self.meta_path, "w") as f:
+            json.dump(dict(self.metadata, frames=self.frames, boxes=self.boxes), f, indent=2)
+
+
+def load_detections(output_path: Path):
+    """
+    Loads a detections file written by DetectionWriter.
+
+    Args:
+        output_path (Path): Path of the '.json' sidecar or of the data file, or
+            the output path they were written to.
+
+    Returns:
+        tuple[np.ndarray, dict]: DETECTION_DTYPE records sorted by frame, and the metadata.
+    """
+    output_path = Path(output_path)
+    if output_path.suffix in (".json", ".jsonl", ".bin"):
+        output_path = output_path.with_suffix("")
+    _, meta_path = detection_paths(output_path, "jsonl")
+    with open(meta_path, "r") as f:
+        metadata = json.load(f)
+
+    data_path, _ = detection_paths(output_path, metadata["format"])
+    if metadata["format"] == "jsonl":
+        rows = []
+        with open(data_path, "r") as f:
+            for line in f:
+                record = json.loads(line)
+                rows.append((record["frame"], record["cls"], record["conf"], *record["xyxy"]))
+        records = np.array(rows, dtype=DETECTION_DTYPE)
+    elif data_path.stat().st_size:
+        records = np.memmap(data_path, dtype=DETECTION_DTYPE, mode="r")
+    else:
+        records = np.empty(0, dtype=DETECTION_DTYPE)
+    return records, metadata
+
+
+def iter_frame_detections(records: np.ndarray, num_frames: int):
+    """Yields the (N, 6) detection array of every frame from 0 to num_frames - 1."""
+    bounds = np.searchsorted(records["frame"], np.arange(num_frames + 1))
+    for frame_index in range(num_frames):
+        yield records_to_detections(records[bounds[frame_index] : bounds[frame_index + 1]])
@@ -0,0 +1,138 @@
+# In src/testing/eval_cache.py
+
+from pathlib import Path
+import hashlib
+import json
+import ultralytics
+import yaml
+from ultralytics.data.utils import img2label_paths
+
+# Bump when the layout of the cached scores changes
+EVAL_CACHE_VERSION = 1
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp"}
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def image_to_label_path(img_path: Path) -> Path:
+    """Returns the label file Ultralytics reads for an image during val()."""
+    return Path(img2label_paths([str(img_path)])[0])
+
+
+def split_images(dataset_root: Path, entry: str):
+    """Resolves a YAML split entry (image folder or image list file) to image paths."""
+    split_path = Path(entry) if Path(entry).is_absolute() else dataset_root / entry
+    if split_path.suffix == ".txt":
+        with open(split_path, "r") as f:
+            return [Path(line.strip()) for line in f if line.strip()]
+    return sorted(p for p in split_path.glob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def dataset_split_images(data_yaml_path: Path, split: str):
+    """Image paths of one split of a dataset YAML, as Ultralytics would load them."""
+    data_yaml_path = Path(data_yaml_path)
+    with open(data_yaml_path, "r") as f:
+        data = yaml.safe_load(f)
+    return split_images(Path(data.get("path") or data_yaml_path.parent), data[split])
+
+
+def split_fingerprint(data_yaml_path: Path, split: str = "test") -> str:
+    """
+    Hashes everything about a dataset split that can change its evaluation:
+    the class names, which images are in it and the content of their labels.
+
+    The split_manifest.json written by create_final_split.py already records a
+    signature of every source file, so it is used when present; otherwise the
+    images are listed from the YAML and the label files are hashed directly.
+    """
+    data_yaml_path = Path(data_yaml_path)
+    with open(data_yaml_path, "r") as f:
+        data = yaml.safe_load(f)
+    dataset_root = Path(data.get("path") or data_yaml_path.parent)
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps(data.get("names"), sort_keys=True).encode())
+
+    manifest_path = data_yaml_path.parent / "split_manifest.json"
+    manifest = {}
+    if manifest_path.exists():
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f).get("files", {})
+    entries = {target: info for target, info in manifest.items() if info.get("split") == split}
+
+    if entries:
+        for target in sorted(entries):
+            info = entries[target]
+            content = info.get("sha1") or f"{info['size']}:{info['mtime_ns']}"
+            digest.update(f"{target}\0{content}\n".encode())
+        return digest.hexdigest()
+
+    for img_path in split_images(dataset_root, data[split]):
+        label_path = image_to_label_path(img_path)
+        digest.update(f"{img_path.name}\0".encode())
+        if label_path.exists():
+            digest.update(label_path.read_bytes())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+class EvalCache:
+    """
+    Persistent store of test-split scores, one JSON file per evaluation key.
+
+    The key combines the SHA-256 of the PyTorch weights, the fingerprint of
+    the evaluated split and the val() arguments, so an entry is reused only
+    when neither the model nor the test data nor the settings changed.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self._split_fingerprints = {}
+
+    def key_for(self, weights_path: Path, data_yaml_path: Path, **val_args) -> dict:
+        """Builds the (inspectable) key of one evaluation."""
+        split = val_args.get("split", "test")
+        fingerprint_key = (str(data_yaml_path), split)
+        if fingerprint_key not in self._split_fingerprints:
+            self._split_fingerprints[fingerprint_key] = split_fingerprint(data_yaml_path, split)
+
+        return {
+            "version": EVAL_CACHE_VERSION,
+            "weights_sha256": file_sha256(weights_path),
+            "split_fingerprint": self._split_fingerprints[fingerprint_key],
+            "ultralytics": ultralytics.__version__,
+            "val_args": dict(sorted(val_args.items())),
+        }
+
+    def _entry_path(self, key: dict) -> Path:
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+        return self.cache_dir / f"{digest[:32]}.json"
+
+    def get(self, key: dict):
+        """Returns the cached scores for a key, or None on a miss."""
+        try:
+            with open(self._entry_path(key), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("key") != key:
+            return None
+        return entry["scores"]
+
+    def put(self, key: dict, scores: dict, **info):
+        """Atomically stores the scores for a key (plus free-form info for humans)."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry_path = self._entry_path(key)
+        tmp_path = entry_path.with_name(entry_path.name + ".tmp")
+        entry = {"key": key, "info": info, "scores": {k: float(v) for k, v in scores.items()}}
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f, indent=2)
+        tmp_path.replace(entry_path)
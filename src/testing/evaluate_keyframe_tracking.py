@@ -0,0 +1,139 @@
+# In src/testing/evaluate_keyframe_tracking.py
+
+from ultralytics import YOLO
+from pathlib import Path
+import argparse
+import json
+import cv2
+from tqdm import tqdm
+
+from box_tracker import KeyframeTracker
+from detection_metrics import evaluate_detections
+from generate_annotated_video import FrameDetector
+
+
+def _run_detector(video_path: Path, detector: FrameDetector, max_frames: int, desc: str):
+    """Runs a FrameDetector over the first `max_frames` frames of a video."""
+    cap = cv2.VideoCapture(str(video_path))
+    detections = []
+    progress = tqdm(total=max_frames, desc=desc)
+    while len(detections) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        detections.extend(detector.detect([frame]))
+        progress.update(1)
+    progress.close()
+    cap.release()
+    return detections
+
+
+def evaluate_keyframe_tracking(
+    video_path_str: str,
+    confidence_threshold: float,
+    keyframe_intervals,
+    max_frames: int,
+):
+    """
+    Measures the speed/accuracy trade-off of keyframe detection with optical
+    flow propagation on a held-out video. The detector-on-every-frame output
+    is used as the reference, so the reported mAP is the accuracy lost by
+    skipping the detector, not the accuracy against human labels.
+
+    Args:
+        video_path_str (str): Path to a held-out (test split) video.
+        confidence_threshold (float): The minimum confidence score for a detection.
+        keyframe_intervals (list[int]): Keyframe intervals to compare.
+        max_frames (int): Number of frames to evaluate from the start of the video.
+    """
+    # 1. Configuration and Path Setup
+    project_root = Path(__file__).resolve().parent.parent.parent
+    model_path = project_root / "runs" / "tournament" / "yolov8l_50epochs" / "weights" / "best.pt"
+    video_path = Path(video_path_str)
+
+    if not model_path.exists():
+        print(f"❌ ERROR: Champion model not found at {model_path}")
+        return
+    if not video_path.exists():
+        print(f"❌ ERROR: Input video not found at {video_path}")
+        return
+
+    model = YOLO(model_path)
+    num_classes = len(model.names)
+
+    # 2. Reference: the detector on every frame
+    reference_detector = FrameDetector(model, confidence_threshold)
+    reference = _run_detector(video_path, reference_detector, max_frames, "Detector on every frame")
+    reference_fps = reference_detector.frames / reference_detector.seconds
+
+    # 3. Keyframe detection with tracking at each interval
+    report = []
+    for interval in keyframe_intervals:
+        tracker = KeyframeTracker(keyframe_interval=interval)
+        detector = FrameDetector(model, confidence_threshold, tracker=tracker)
+        predictions = _run_detector(video_path, detector, max_frames, f"Keyframe interval {interval}")
+
+        metrics = evaluate_detections(predictions, reference[: len(predictions)], num_classes)
+        fps = detector.frames / detector.seconds
+        report.append(
+            {
+                "keyframe_interval": interval,
+                "frames": detector.frames,
+                "detector_frames": detector.detector_frames,
+                "fps": fps,
+                "speedup": fps / reference_fps,
+                "mAP50_vs_dense": metrics["mAP50"],
+                "mAP50-95_vs_dense": metrics["mAP50-95"],
+            }
+        )
+
+    # 4. Print and save the report
+    print("\n--- Keyframe Tracking Report ---")
+    print(f"Reference (detector on every frame): {reference_fps:.2f} frames/sec")
+    for row in report:
+        print(
+            f"  - Interval {row['keyframe_interval']:>2}: {row['fps']:7.2f} frames/sec "
+            f"({row['speedup']:.2f}x), detector on {row['detector_frames']}/{row['frames']} frames, "
+            f"mAP50 vs dense {row['mAP50_vs_dense']:.3f}"
+        )
+
+    output_folder = project_root / "results"
+    output_folder.mkdir(exist_ok=True)
+    report_path = output_folder / f"{video_path.stem}_keyframe_tracking.json"
+    with open(report_path, "w") as f:
+        json.dump({"reference_fps": reference_fps, "runs": report}, f, indent=2)
+    print(f"\n✅ Report saved to: {report_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare keyframe detection + tracking against detection on every frame."
+    )
+    parser.add_argument("--video", type=str, required=True, help="Path to a held-out video file.")
+    parser.add_argument(
+        "--conf",
+        type=float,
+        default=0.5,
+        help="Confidence threshold for detection (e.g., 0.5 for 50%).",
+    )
+    parser.add_argument(
+        "--intervals",
+        type=int,
+        nargs="+",
+        default=[3, 5, 10],
+        help="Keyframe intervals to evaluate.",
+    )
+    parser.add_argument(
+        "--max-frames",
+        type=int,
+        default=3000,
+        help="Number of frames to evaluate from the start of the video.",
+    )
+
+    args = parser.parse_args()
+    evaluate_keyframe_tracking(
+        video_path_str=args.video,
+        confidence_threshold=args.conf,
+        keyframe_intervals=args.intervals,
+        max_frames=args.max_frames,
+    )
@@ -0,0 +1,181 @@
+# In src/testing/export_champion.py
+
+from ultralytics import YOLO
+from pathlib import Path
+import argparse
+import sys
+import numpy as np
+
+from detection_metrics import box_iou
+from detections import CLS, CONF, result_to_detections
+from eval_cache import dataset_split_images
+from inference_backends import BACKENDS, export_weights, write_export_stamp
+
+
+def compare_detections(reference: np.ndarray, candidate: np.ndarray, iou_threshold: float = 0.9):
+    """
+    Pairs the boxes of two detection arrays for the same image.
+
+    Returns:
+        tuple[int, int, list[float]]: Number of reference boxes, how many of them
+            have a same-class candidate box above `iou_threshold`, and the
+            confidence differences of the matched pairs.
+    """
+    if len(reference) == 0 or len(candidate) == 0:
+        return len(reference), 0, []
+    iou = box_iou(reference[:, :4], candidate[:, :4])
+    iou = iou * (reference[:, None, CLS] == candidate[None, :, CLS])
+    best = iou.argmax(axis=1)
+    matched = iou[np.arange(len(reference)), best] >= iou_threshold
+    conf_diffs = np.abs(reference[matched, CONF] - candidate[best[matched], CONF]).tolist()
+    return len(reference), int(matched.sum()), conf_diffs
+
+
+def check_parity(torch_model, exported_model, images, conf: float, imgsz: int):
+    """
+    Runs both models on the same images and measures how closely the exported
+    model reproduces the PyTorch boxes and scores.
+    """
+    total, matched, conf_diffs = 0, 0, []
+    extra = 0
+    for img_path in images:
+        reference = result_to_detections(
+            torch_model.predict(str(img_path), conf=conf, imgsz=imgsz, verbose=False)[0]
+        )
+        candidate = result_to_detections(
+            exported_model.predict(str(img_path), conf=conf, imgsz=imgsz, verbose=False)[0]
+        )
+        n, m, diffs = compare_detections(reference, candidate)
+        total += n
+        matched += m
+        conf_diffs += diffs
+        extra += max(0, len(candidate) - m)
+
+    return {
+        "reference_boxes": total,
+        "match_rate": matched / total if total else 1.0,
+        "extra_boxes": extra,
+        "max_conf_diff": max(conf_diffs) if conf_diffs else 0.0,
+        "mean_conf_diff": float(np.mean(conf_diffs)) if conf_diffs else 0.0,
+    }
+
+
+def export_champion(
+    weights_path_str: str,
+    backends,
+    imgsz: int,
+    parity_images: int,
+    min_match_rate: float,
+    max_conf_diff: float,
+) -> bool:
+    """
+    Exports the champion (or any tournament variant) to the requested CPU
+    runtimes and verifies each export against the PyTorch outputs on a
+    sample of validation images.
+
+    Returns:
+        bool: True if every export passed the parity check.
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    weights_path = Path(weights_path_str) if weights_path_str else (
+        project_root / "runs" / "tournament" / "yolov8l_50epochs" / "weights" / "best.pt"
+    )
+    data_yaml_path = project_root / "data" / "final_dataset" / "final_dataset.yaml"
+
+    if not weights_path.exists():
+        print(f"❌ ERROR: Model not found at {weights_path}")
+        return False
+    if not data_yaml_path.exists():
+        print(f"❌ ERROR: Dataset YAML not found at {data_yaml_path}")
+        return False
+
+    # Either an images/val folder or a val.txt image list, as the YAML says
+    images = dataset_split_images(data_yaml_path, "val")
+    if not images:
+        print(f"❌ ERROR: No validation images in {data_yaml_path}; parity cannot be checked.")
+        return False
+    if len(images) > parity_images:
+        # Spread the sample over the whole split instead of one video
+        images = [images[i] for i in np.linspace(0, len(images) - 1, parity_images).astype(int)]
+
+    torch_model = YOLO(weights_path)
+    all_passed = True
+
+    for backend in backends:
+        if backend == "torch":
+            continue
+
+        # 2. Export
+        print(f"\n--- Exporting {weights_path.name} to {backend} ---")
+        # Unstamped until parity passes, so load_model() does not trust it yet
+        exported_path = export_weights(weights_path, backend, imgsz=imgsz, stamp=False)
+        print(f"  ✅ Exported to {exported_path}")
+
+        # 3. Parity check against the PyTorch model
+        exported_model = YOLO(str(exported_path), task="detect")
+        parity = check_parity(torch_model, exported_model, images, conf=0.25, imgsz=imgsz)
+        passed = parity["match_rate"] >= min_match_rate and parity["max_conf_diff"] <= max_conf_diff
+        all_passed &= passed
+
+        print(f"  Parity on {len(images)} images ({parity['reference_boxes']} reference boxes):")
+        print(f"    - Boxes reproduced : {parity['match_rate'] * 100:.2f}%")
+        print(f"    - Extra boxes      : {parity['extra_boxes']}")
+        print(f"    - Conf diff        : max {parity['max_conf_diff']:.4f}, mean {parity['mean_conf_diff']:.4f}")
+        print(f"  {'✅ PASSED' if passed else '❌ FAILED'} parity check for {backend}")
+        if passed:
+            write_export_stamp(exported_path, weights_path)
+        else:
+            print(f"  ⚠️ {exported_path} left unstamped; load_model() will re-export it.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export the champion model to ONNX/OpenVINO and check parity with PyTorch."
+    )
+    parser.add_argument(
+        "--weights",
+        type=str,
+        default=None,
+        help="Path to best.pt (defaults to runs/tournament/yolov8l_50epochs/weights/best.pt).",
+    )
+    parser.add_argument(
+        "--backends",
+        type=str,
+        nargs="+",
+        default=["onnx"],
+        choices=BACKENDS,
+        help="Runtimes to export for.",
+    )
+    parser.add_argument("--imgsz", type=int, default=640, help="Inference image size.")
+    parser.add_argument(
+        "--parity-images",
+        type=int,
+        default=50,
+        help="Number of validation images used for the parity check.",
+    )
+    parser.add_argument(
+        "--min-match-rate",
+        type=float,
+        default=0.98,
+        help="Minimum fraction of PyTorch boxes the export must reproduce.",
+    )
+    parser.add_argument(
+        "--max-conf-diff",
+        type=float,
+        default=0.02,
+        help="Maximum allowed absolute confidence difference for a matched box.",
+    )
+
+    args = parser.parse_args()
+    ok = export_champion(
+        weights_path_str=args.weights,
+        backends=args.backends,
+        imgsz=args.imgsz,
+        parity_images=args.parity_images,
+        min_match_rate=args.min_match_rate,
+        max_conf_diff=args.max_conf_diff,
+    )
+    sys.exit(0 if ok else 1)
@@ -1,13 +1,266 @@
 # In src/testing/generate_annotated_video.py
 
-from ultralytics import YOLO
 from pathlib import Path
 import cv2
 import argparse
+import queue
+import threading
+import time
 from tqdm import tqdm
 
+from box_tracker import KeyframeTracker
+from inference_backends import BACKENDS, load_model
+from detections import (
+    DETECTION_FORMATS,
+    DetectionWriter,
+    apply_class_thresholds,
+    draw_detections,
+    load_class_thresholds,
+    result_to_detections,
+)
 
-def process_and_save_video(video_path_str: str, confidence_threshold: float):
+
+# Marks the end of the frame stream between pipeline stages
+_END_OF_STREAM = object()
+
+
+class FrameDetector:
+    """
+    Turns batches of frames into per-frame detection arrays and measures the
+    time spent doing so.
+
+    Without a tracker every frame goes through one batched predict() call.
+    With a KeyframeTracker the detector only runs on keyframes and boxes are
+    propagated by optical flow on the frames in between.
+
+    `class_thresholds` (one confidence per class id) replaces the single
+    `confidence_threshold`: the model keeps everything above the lowest one
+    and each box is then held to its own class's threshold.
+    """
+
+    def __init__(
+        self,
+        model,
+        confidence_threshold: float,
+        tracker: KeyframeTracker = None,
+        class_thresholds=None,
+    ):
+        self.model = model
+        self.confidence_threshold = confidence_threshold
+        self.class_thresholds = class_thresholds
+        if class_thresholds is not None:
+            self.confidence_threshold = float(class_thresholds.min())
+        self.tracker = tracker
+        self.frames = 0
+        self.detector_frames = 0
+        self.seconds = 0.0
+
+    def _predict(self, frames):
+        results = self.model.predict(frames, conf=self.confidence_threshold, verbose=False)
+        self.detector_frames += len(frames)
+        detections = [result_to_detections(result) for result in results]
+        if self.class_thresholds is not None:
+            detections = [apply_class_thresholds(dets, self.class_thresholds) for dets in detections]
+        return detections
+
+    def detect(self, frames):
+        """Returns one (N, 6) detection array per frame, in order."""
+        start = time.perf_counter()
+        if self.tracker is None:
+            detections = self._predict(frames)
+        else:
+            detections = []
+            for frame in frames:
+                if self.tracker.needs_detection(frame):
+                    frame_detections = self._predict([frame])[0]
+                    self.tracker.reset(frame, frame_detections)
+                else:
+                    frame_detections = self.tracker.propagate(frame)
+                detections.append(frame_detections)
+        self.seconds += time.perf_counter() - start
+        self.frames += len(frames)
+        return detections
+
+
+class AnnotatedVideoSink:
+    """Draws the detections onto each frame and re-encodes the video."""
+
+    def __init__(self, writer, class_names):
+        self.writer = writer
+        self.class_names = class_names
+
+    def write(self, frame, detections):
+        self.writer.write(draw_detections(frame, detections, self.class_names))
+
+    def close(self):
+        self.writer.release()
+
+
+class DetectionFileSink:
+    """Streams only the detections to a file; frames are not drawn or encoded."""
+
+    def __init__(self, writer: DetectionWriter, start_frame: int = 0):
+        self.writer = writer
+        self.frame_index = start_frame
+
+    def write(self, frame, detections):
+        self.writer.write(self.frame_index, detections)
+        self.frame_index += 1
+
+    def close(self):
+        self.writer.close()
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def _put(q: queue.Queue, item, stop_event: threading.Event) -> bool:
+    """Puts an item on a bounded queue, giving up if the pipeline is stopping."""
+    while not stop_event.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop_event: threading.Event):
+    """Gets an item from a queue, returning end-of-stream if the pipeline is stopping."""
+    while not stop_event.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END_OF_STREAM
+
+
+def _decode_stage(cap, frames_out: queue.Queue, stop_event, errors: list):
+    """Stage 1: reads frames from the video."""
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret or not _put(frames_out, frame, stop_event):
+                break
+    except Exception as e:
+        errors.append(e)
+        stop_event.set()
+    finally:
+        _put(frames_out, _END_OF_STREAM, stop_event)
+
+
+def _encode_stage(sink, results_in: queue.Queue, progress, stop_event, errors: list):
+    """Stage 3: hands the frames and their detections to the sink, in arrival order."""
+    try:
+        while True:
+            item = _get(results_in, stop_event)
+            if item is _END_OF_STREAM:
+                break
+            frame, detections = item
+            sink.write(frame, detections)
+            progress.update(1)
+    except Exception as e:
+        errors.append(e)
+        stop_event.set()
+
+
+def _run_pipelined(detector, cap, sink, progress, queue_size, batch_size):
+    """
+    Runs decode, inference and annotate+encode as three concurrent stages
+    connected by bounded queues. Each stage is a single thread consuming a
+    FIFO queue, so frames are written in their original order. OpenCV I/O
+    and PyTorch inference release the GIL, so the stages genuinely overlap.
+    """
+    frames_q = queue.Queue(maxsize=queue_size)
+    results_q = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    errors = []
+
+    decoder = threading.Thread(
+        target=_decode_stage, args=(cap, frames_q, stop_event, errors), daemon=True
+    )
+    encoder = threading.Thread(
+        target=_encode_stage,
+        args=(sink, results_q, progress, stop_event, errors),
+        daemon=True,
+    )
+    decoder.start()
+    encoder.start()
+
+    # Stage 2: batched inference on the main thread
+    try:
+        batch = []
+        finished = False
+        while not finished:
+            frame = _get(frames_q, stop_event)
+            if frame is _END_OF_STREAM:
+                finished = True
+            else:
+                batch.append(frame)
+            if batch and (finished or len(batch) == batch_size):
+                for item in zip(batch, detector.detect(batch)):
+                    if not _put(results_q, item, stop_event):
+                        finished = True
+                        break
+                batch = []
+    except BaseException:
+        stop_event.set()
+        raise
+    finally:
+        _put(results_q, _END_OF_STREAM, stop_event)
+        decoder.join()
+        encoder.join()
+
+    if errors:
+        raise errors[0]
+
+
+def _run_sequential(detector, cap, sink, progress, batch_size, max_frames: int = None) -> int:
+    """
+    Reads, detects and writes frames one batch at a time until the video ends
+    or `max_frames` frames were processed. Returns the number of frames.
+    """
+    processed = 0
+    finished = False
+    while not finished:
+        batch = []
+        while len(batch) < batch_size and (max_frames is None or processed + len(batch) < max_frames):
+            ret, frame = cap.read()
+            if not ret:
+                finished = True
+                break
+            batch.append(frame)
+        if not batch:
+            break
+
+        # Run prediction on the whole batch
+        batch_detections = detector.detect(batch)
+
+        # Draw boxes and labels (or store the detections) in frame order
+        for frame, detections in zip(batch, batch_detections):
+            sink.write(frame, detections)
+        progress.update(len(batch))
+        processed += len(batch)
+    return processed
+
+
+def process_and_save_video(
+    video_path_str: str,
+    confidence_threshold: float,
+    pipeline: bool = False,
+    queue_size: int = 32,
+    batch_size: int = 1,
+    keyframe_interval: int = 1,
+    output: str = "video",
+    detections_format: str = "bin",
+    backend: str = "torch",
+    class_thresholds_path: str = None,
+):
     """
     Loads the champion model, processes a video frame-by-frame, and saves
     the annotated result to a new file without displaying a live window.
@@ -15,6 +268,21 @@ def process_and_save_video(video_path_str: str, confidence_threshold: float):
     Args:
         video_path_str (str): The path to the video file to process.
         confidence_threshold (float): The minimum confidence score for a detection.
+        pipeline (bool): Overlap decoding, inference and encoding in separate threads.
+        queue_size (int): Maximum number of frames buffered between pipeline stages.
+        batch_size (int): Number of frames passed to each predict() call.
+        keyframe_interval (int): Run the detector at most every N frames and
+            propagate its boxes with optical flow in between (1 = every frame).
+        output (str): 'video' writes an annotated MP4; 'detections' only streams
+            the per-frame detections to a file that render_detections.py can draw later.
+        detections_format (str): 'bin' (packed binary records) or 'jsonl'.
+        backend (str): Inference runtime: 'torch', 'onnx' or 'openvino'. Exported
+            models are created next to best.pt on first use.
+        class_thresholds_path (str): Optional per-class confidence config written by
+            optimize_thresholds.py; it replaces `confidence_threshold`.
+
+    Returns:
+        dict: Throughput statistics of the run, or None if it could not start.
     """
     # 1. Configuration and Path Setup
     project_root = Path(__file__).resolve().parent.parent.parent
@@ -31,6 +299,7 @@ def process_and_save_video(video_path_str: str, confidence_threshold: float):
     output_folder = project_root / "results"
     output_folder.mkdir(exist_ok=True)
     output_video_path = output_folder / f"{input_video_path.stem}_annotated.mp4"
+    output_detections_path = output_folder / f"{input_video_path.stem}_detections"
 
     # --- Safety Checks ---
     if not model_path.exists():
@@ -41,10 +310,14 @@ def process_and_save_video(video_path_str: str, confidence_threshold: float):
         return
 
     # 2. Load the Champion Model
-    print(f"✅ Loading champion model: {model_path.name}")
-    model = YOLO(model_path)
+    print(f"✅ Loading champion model: {model_path.name} (backend: {backend})")
+    model = load_model(model_path, backend)
+    class_thresholds = None
+    if class_thresholds_path:
+        class_thresholds = load_class_thresholds(Path(class_thresholds_path), model.names)
+        print(f"✅ Using per-class confidence thresholds from {class_thresholds_path}")
 
-    # 3. Setup Video Capture and Writer
+    # 3. Setup Video Capture and Output
     cap = cv2.VideoCapture(str(input_video_path))
     if not cap.isOpened():
         print(f"❌ ERROR: Could not open video file.")
@@ -54,52 +327,75 @@ def process_and_save_video(video_path_str: str, confidence_threshold: float):
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = int(cap.get(cv2.CAP_PROP_FPS))
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    out = cv2.VideoWriter(
-        str(output_video_path), fourcc, fps, (frame_width, frame_height)
-    )
+    if output == "detections":
+        metadata = {
+            "video": str(input_video_path.resolve()),
+            "fps": fps,
+            "width": frame_width,
+            "height": frame_height,
+            "names": model.names,
+            "conf": confidence_threshold,
+        }
+        if class_thresholds is not None:
+            metadata["class_conf"] = class_thresholds.round(4).tolist()
+        sink = DetectionFileSink(
+            DetectionWriter(output_detections_path, detections_format, metadata)
+        )
+    else:
+        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        out = cv2.VideoWriter(
+            str(output_video_path), fourcc, fps, (frame_width, frame_height)
+        )
+        sink = AnnotatedVideoSink(out, model.names)
 
     print(f"✅ Processing video: {input_video_path.name} ({total_frames} frames)")
 
-    # 4. Process Video Frame-by-Frame with a Progress Bar
-    for _ in tqdm(range(total_frames), desc="Annotating video"):
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Run prediction
-        results = model.predict(frame, conf=confidence_threshold, verbose=False)
-        result = results[0]
-
-        # Draw boxes and labels on the frame
-        for box in result.boxes:
-            coords = [int(x) for x in box.xyxy[0]]
-            x1, y1, x2, y2 = coords
-            conf = float(box.conf[0])
-            class_id = int(box.cls[0])
-            class_name = model.names[class_id]
-
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color=(0, 255, 0), thickness=2)
-            label = f"{class_name} {conf:.2f}"
-            cv2.putText(
-                frame,
-                label,
-                (x1, y1 - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 255, 0),
-                2,
-            )
-
-        # Write the annotated frame to the output video
-        out.write(frame)
+    # 4. Process Video in Batches of Frames with a Progress Bar
+    progress = tqdm(total=total_frames, desc="Annotating video")
+    tracker = KeyframeTracker(keyframe_interval=keyframe_interval) if keyframe_interval > 1 else None
+    detector = FrameDetector(
+        model, confidence_threshold, tracker=tracker, class_thresholds=class_thresholds
+    )
+    start_time = time.perf_counter()
+    if pipeline:
+        _run_pipelined(detector, cap, sink, progress, queue_size, batch_size)
+    else:
+        _run_sequential(detector, cap, sink, progress, batch_size)
+    progress.close()
+    elapsed = time.perf_counter() - start_time
 
     # 5. Cleanup
     cap.release()
-    out.release()
+    sink.close()
+
+    stats = {
+        "video": input_video_path.name,
+        "frames": detector.frames,
+        "detector_frames": detector.detector_frames,
+        "batch_size": batch_size,
+        "pipeline": pipeline,
+        "keyframe_interval": keyframe_interval,
+        "seconds": elapsed,
+        "fps": detector.frames / elapsed if elapsed > 0 else 0.0,
+        "inference_fps": detector.frames / detector.seconds if detector.seconds > 0 else 0.0,
+    }
 
     print("\n--- Processing Complete ---")
-    print(f"✅ Annotated video saved to: {output_video_path}")
+    if output == "detections":
+        print(f"✅ Detections saved to: {sink.writer.data_path}")
+    else:
+        print(f"✅ Annotated video saved to: {output_video_path}")
+    print(
+        f"   Throughput: {stats['fps']:.2f} frames/sec end-to-end, "
+        f"{stats['inference_fps']:.2f} frames/sec in inference "
+        f"({stats['frames']} frames, batch size {batch_size})"
+    )
+    if tracker is not None:
+        print(
+            f"   Detector ran on {detector.detector_frames} of {detector.frames} frames; "
+            "the rest were propagated by optical flow."
+        )
+    return stats
 
 
 if __name__ == "__main__":
@@ -119,5 +415,69 @@ if __name__ == "__main__":
         help="Confidence threshold for detection (e.g., 0.5 for 50%).",
     )
 
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Run decoding, inference and encoding as overlapping pipeline stages.",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=32,
+        help="Frames buffered between pipeline stages (only used with --pipeline).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=positive_int,
+        default=1,
+        help="Number of frames sent to the model in one predict() call.",
+    )
+    parser.add_argument(
+        "--keyframe-interval",
+        type=int,
+        default=1,
+        help="Run the detector at most every N frames and track boxes in between "
+        "(1 = detector on every frame).",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="video",
+        choices=["video", "detections"],
+        help="'video' writes an annotated MP4; 'detections' only streams the detections "
+        "to a file (render it later with render_detections.py).",
+    )
+    parser.add_argument(
+        "--detections-format",
+        type=str,
+        default="bin",
+        choices=DETECTION_FORMATS,
+        help="File format for --output detections: packed binary records or JSON lines.",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default="torch",
+        choices=BACKENDS,
+        help="Inference runtime for the champion model.",
+    )
+    parser.add_argument(
+        "--class-thresholds",
+        type=str,
+        default=None,
+        help="Per-class confidence config from optimize_thresholds.py (overrides --conf).",
+    )
+
     args = parser.parse_args()
-    process_and_save_video(video_path_str=args.video, confidence_threshold=args.conf)
+    process_and_save_video(
+        video_path_str=args.video,
+        confidence_threshold=args.conf,
+        pipeline=args.pipeline,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+        keyframe_interval=args.keyframe_interval,
+        output=args.output,
+        detections_format=args.detections_format,
+        backend=args.backend,
+        class_thresholds_path=args.class_thresholds,
+    )
@@ -3,11 +3,21 @@
 import matplotlib.pyplot as plt
 import numpy as np
 from pathlib import Path
+import argparse
 
-def create_comparison_plot():
+from prediction_cache import evaluate_prediction_cache, load_prediction_cache
+
+def create_comparison_plot(champion_cache: str = None, balanced_cache: str = None):
     """
     Generates a grouped bar chart to compare the per-class AP@50 scores
     of the final Champion Model vs. the experimental Balanced Data Model.
+
+    Args:
+        champion_cache (str): Optional prediction cache of the champion model
+            (see prediction_cache.py). When given, the champion scores are
+            computed from it instead of the official numbers below.
+        balanced_cache (str): Optional prediction cache of the balanced model,
+            used the same way for the balanced scores.
     """
     # 1. The Final, Official Test Data
     class_names = ['Grasper', 'Bipolar', 'Hook', 'Scissors', 'Clipper', 'Irrigator', 'Spec.bag']
@@ -18,6 +28,20 @@ def create_comparison_plot():
     # Scores from the model trained on the balanced dataset (the experiment)
     balanced_scores = [0.702, 0.693, 0.822, 0.510, 0.745, 0.151, 0.601]
 
+    # Recompute a model's scores from its cached predictions, without the model;
+    # a model without a cache keeps its official numbers
+    def cached_scores(cache_path, official_scores, label):
+        if not cache_path:
+            print(f"Using the official per-class AP@50 for the {label} model")
+            return official_scores
+        cache = load_prediction_cache(Path(cache_path))
+        print(f"Computed per-class AP@50 for the {label} model from {cache_path}")
+        return np.nan_to_num(evaluate_prediction_cache(cache)['ap50_per_class']).round(3).tolist()
+
+    if champion_cache or balanced_cache:
+        champion_scores = cached_scores(champion_cache, champion_scores, 'champion')
+        balanced_scores = cached_scores(balanced_cache, balanced_scores, 'balanced')
+
     # 2. Setup the Plot
     x = np.arange(len(class_names))
     width = 0.35
@@ -57,4 +81,8 @@ def create_comparison_plot():
     plt.show()
 
 if __name__ == '__main__':
-    create_comparison_plot()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Plot per-class AP@50 of the champion vs. the balanced model.")
+    parser.add_argument('--champion-cache', type=str, default=None, help="Prediction cache (.npz) of the champion model.")
+    parser.add_argument('--balanced-cache', type=str, default=None, help="Prediction cache (.npz) of the balanced model.")
+    args = parser.parse_args()
+    create_comparison_plot(champion_cache=args.champion_cache, balanced_cache=args.balanced_cache)
\ No newline at end of file
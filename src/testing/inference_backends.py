@@ -0,0 +1,109 @@
+# In src/testing/inference_backends.py
+
+from ultralytics import YOLO
+from pathlib import Path
+import json
+
+from eval_cache import file_sha256
+
+
+# Runtimes the champion can be served with. 'onnx' runs through ONNX Runtime
+# and 'openvino' through an OpenVINO IR folder; both are loaded by Ultralytics'
+# AutoBackend, so predict()/val() return exactly the same Results objects.
+BACKENDS = ["torch", "onnx", "openvino"]
+
+
+def exported_weights_path(weights_path: Path, backend: str) -> Path:
+    """Returns where the exported model for a backend lives next to 'best.pt'."""
+    weights_path = Path(weights_path)
+    if backend == "onnx":
+        return weights_path.with_suffix(".onnx")
+    if backend == "openvino":
+        return weights_path.parent / f"{weights_path.stem}_openvino_model"
+    return weights_path
+
+
+def export_stamp_path(model_path: Path) -> Path:
+    """The JSON file next to an export that records which weights it was made from."""
+    model_path = Path(model_path)
+    return model_path.parent / f"{model_path.name}.source.json"
+
+
+def weights_stamp(weights_path: Path, sha256: str = None) -> dict:
+    """Size, mtime and SHA-256 of the weights an export is made from."""
+    stat = Path(weights_path).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256 or file_sha256(weights_path)}
+
+
+def export_is_current(weights_path: Path, backend: str) -> bool:
+    """
+    True if the export for `backend` exists and was made from the current
+    weights. Size and mtime are compared first; if they changed, the SHA-256
+    decides (and a match refreshes the stamp, e.g. after a copy).
+    """
+    model_path = exported_weights_path(weights_path, backend)
+    stamp_path = export_stamp_path(model_path)
+    if not model_path.exists() or not stamp_path.exists():
+        return False
+    with open(stamp_path, "r") as f:
+        stamp = json.load(f)
+    stat = Path(weights_path).stat()
+    if stamp.get("size") == stat.st_size and stamp.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    sha256 = file_sha256(weights_path)
+    if stamp.get("sha256") != sha256:
+        return False
+    with open(stamp_path, "w") as f:
+        json.dump(weights_stamp(weights_path, sha256), f, indent=2)
+    return True
+
+
+def write_export_stamp(exported_path: Path, weights_path: Path):
+    """Records that the export at `exported_path` was made from `weights_path`."""
+    with open(export_stamp_path(exported_path), "w") as f:
+        json.dump(weights_stamp(weights_path), f, indent=2)
+
+
+def export_weights(weights_path: Path, backend: str, imgsz: int = 640, stamp: bool = True, **export_args) -> Path:
+    """
+    Exports PyTorch weights for a backend with Ultralytics and returns the
+    exported path. A dynamic batch axis is kept so batched predict() works.
+    With `stamp=False` the caller writes the stamp itself (write_export_stamp),
+    e.g. once the export has been verified.
+    """
+    weights_path = Path(weights_path)
+    if backend == "torch":
+        return weights_path
+
+    # A stamp left by an earlier export must not vouch for this one
+    export_stamp_path(exported_weights_path(weights_path, backend)).unlink(missing_ok=True)
+    model = YOLO(weights_path)
+    export_args = {"imgsz": imgsz, "dynamic": True, **export_args}
+    exported = Path(model.export(format=backend, **export_args))
+    if stamp:
+        write_export_stamp(exported, weights_path)
+    return exported
+
+
+def load_model(weights_path: Path, backend: str = "torch", export_if_missing: bool = True):
+    """
+    Loads a YOLO model for the requested backend, exporting it from the
+    PyTorch weights first if no exported model exists yet, or if the existing
+    one was made from other weights (e.g. before 'best.pt' was retrained).
+
+    Args:
+        weights_path (Path): Path to the PyTorch 'best.pt' weights.
+        backend (str): One of BACKENDS.
+        export_if_missing (bool): Export on the fly when the exported model is missing or stale.
+
+    Returns:
+        YOLO: The loaded model, or None if the exported model is missing or stale.
+    """
+    model_path = exported_weights_path(weights_path, backend)
+    if backend != "torch" and not export_is_current(weights_path, backend):
+        if not export_if_missing:
+            return None
+        reason = "is out of date" if model_path.exists() else "is missing"
+        print(f"  - The {backend} export {reason}, exporting {Path(weights_path).name}...")
+        model_path = export_weights(weights_path, backend)
+    return YOLO(str(model_path), task="detect")
@@ -0,0 +1,154 @@
+# In src/testing/inference_client.py
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import http.client
+import json
+import socket
+import threading
+import time
+import cv2
+import numpy as np
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that talks to a Unix domain socket instead of TCP."""
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class InferenceClient:
+    """
+    Minimal client for inference_server.py. Keeps one connection per thread,
+    so a single client can be shared by many request threads.
+    """
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 8765, unix_socket: str = None, timeout: float = 30.0
+    ):
+        self.host, self.port, self.unix_socket, self.timeout = host, port, unix_socket, timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        if getattr(self._local, "connection", None) is None:
+            if self.unix_socket:
+                self._local.connection = _UnixHTTPConnection(self.unix_socket, self.timeout)
+            else:
+                self._local.connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout
+                )
+        return self._local.connection
+
+    def _request(self, method: str, path: str, body: bytes = None) -> dict:
+        connection = self._connection()
+        headers = {"Content-Type": "application/octet-stream"} if body is not None else {}
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = json.loads(response.read())
+        except (OSError, http.client.HTTPException):
+            # Drop a broken keep-alive connection so the next call reconnects
+            connection.close()
+            self._local.connection = None
+            raise
+        if response.status != 200:
+            raise RuntimeError(f"{method} {path} failed ({response.status}): {payload.get('error')}")
+        return payload
+
+    def detect(self, frame: np.ndarray, encoding: str = ".jpg") -> list:
+        """Sends one BGR frame and returns its detections (cls, name, conf, xyxy)."""
+        ok, encoded = cv2.imencode(encoding, frame)
+        if not ok:
+            raise ValueError("could not encode frame")
+        return self._request("POST", "/detect", encoded.tobytes())["detections"]
+
+    def metrics(self) -> dict:
+        return self._request("GET", "/metrics")
+
+    def health(self) -> dict:
+        return self._request("GET", "/health")
+
+
+def load_test_frames(source: Path, max_frames: int):
+    """Reads up to `max_frames` frames from a video or a folder of images."""
+    if source.is_dir():
+        images = sorted(p for p in source.iterdir() if p.suffix.lower() in {".png", ".jpg", ".jpeg"})
+        return [cv2.imread(str(p)) for p in images[:max_frames]]
+    cap = cv2.VideoCapture(str(source))
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def run_load_test(
+    source_str: str, requests: int, concurrency: int, host: str, port: int, unix_socket: str
+):
+    """
+    Sends frames to a running inference server from several threads at once
+    and reports client-side latency next to the server's batching metrics.
+    """
+    source = Path(source_str)
+    if not source.exists():
+        print(f"❌ ERROR: Source not found at {source}")
+        return
+    frames = load_test_frames(source, max_frames=min(requests, 256))
+    if not frames:
+        print(f"❌ ERROR: No frames could be read from {source}")
+        return
+
+    client = InferenceClient(host, port, unix_socket)
+    print(f"✅ Server is up: {client.health()}")
+
+    def one_request(i):
+        t0 = time.perf_counter()
+        detections = client.detect(frames[i % len(frames)])
+        return (time.perf_counter() - t0) * 1000.0, len(detections)
+
+    print(f"--- Sending {requests} frames with {concurrency} concurrent clients ---")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, _ in results])
+    print(f"  Throughput : {requests / elapsed:.1f} frames/sec")
+    print(
+        f"  Latency    : p50 {np.percentile(latencies, 50):.1f} ms, "
+        f"p95 {np.percentile(latencies, 95):.1f} ms, p99 {np.percentile(latencies, 99):.1f} ms"
+    )
+    print(f"  Boxes      : {sum(n for _, n in results)}")
+    print("\n--- Server metrics ---")
+    print(json.dumps(client.metrics(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test a running inference_server.py from localhost.")
+    parser.add_argument("--source", type=str, required=True, help="A video file or a folder of images.")
+    parser.add_argument("--requests", type=int, default=200, help="Total number of frames to send.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent client threads.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Server host.")
+    parser.add_argument("--port", type=int, default=8765, help="Server TCP port.")
+    parser.add_argument("--unix-socket", type=str, default=None, help="Server Unix socket path.")
+
+    args = parser.parse_args()
+    run_load_test(
+        source_str=args.source,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        host=args.host,
+        port=args.port,
+        unix_socket=args.unix_socket,
+    )
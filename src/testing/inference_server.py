@@ -0,0 +1,359 @@
+# In src/testing/inference_server.py
+
+from collections import Counter, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+import cv2
+import numpy as np
+
+from detections import CLS, CONF, load_class_thresholds
+from generate_annotated_video import FrameDetector
+from inference_backends import BACKENDS, load_model
+
+
+class DynamicBatcher:
+    """
+    Collects frames submitted concurrently by many requests into batches for
+    one model.
+
+    A single worker thread takes the first waiting frame, then keeps adding
+    frames until the batch is full or `max_wait_ms` has passed since that
+    first frame, and runs `predict_fn` on the whole batch. Each submit()
+    gets a Future resolved with its own frame's detections.
+
+    Args:
+        predict_fn (callable): Maps a list of frames to a list of (N, 6) detection arrays.
+        max_batch_size (int): Largest batch sent to the model.
+        max_wait_ms (float): Longest a frame waits for others to join its batch.
+        latency_window (int): Number of recent requests kept for the latency percentiles.
+    """
+
+    def __init__(
+        self, predict_fn, max_batch_size: int = 8, max_wait_ms: float = 10.0, latency_window: int = 10000
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._requests = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self._batch_sizes = Counter()
+        self._completed = 0
+        self._failed = 0
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, frame) -> Future:
+        """Queues one frame; the Future resolves to its (N, 6) detection array."""
+        future = Future()
+        self._requests.put((frame, future, time.perf_counter()))
+        return future
+
+    def _next_batch(self):
+        try:
+            batch = [self._requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Take whatever is already waiting, then wait out the deadline
+                if remaining > 0:
+                    batch.append(self._requests.get(timeout=remaining))
+                else:
+                    batch.append(self._requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            # Requests cancelled after a timeout are dropped; the rest are
+            # marked running so a late cancel() can no longer succeed
+            batch = [request for request in batch if request[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            frames, futures, submitted = zip(*batch)
+            try:
+                results = self.predict_fn(list(frames))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                with self._lock:
+                    self._failed += len(batch)
+                continue
+
+            done = time.perf_counter()
+            for future, result in zip(futures, results):
+                future.set_result(result)
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._completed += len(batch)
+                self._latencies.extend((done - t) * 1000.0 for t in submitted)
+
+    def metrics(self) -> dict:
+        """Queue depth, batch size histogram and request latency percentiles."""
+        with self._lock:
+            latencies = np.array(self._latencies)
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            completed, failed = self._completed, self._failed
+        percentiles = (
+            {f"p{p}": float(np.percentile(latencies, p)) for p in (50, 95, 99)} if len(latencies) else {}
+        )
+        return {
+            "queue_depth": self._requests.qsize(),
+            "requests_completed": completed,
+            "requests_failed": failed,
+            "batches": sum(batch_sizes.values()),
+            "batch_size_histogram": {str(size): count for size, count in batch_sizes.items()},
+            "mean_batch_size": completed / max(sum(batch_sizes.values()), 1),
+            "latency_ms": percentiles,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+    def close(self):
+        self._stopped.set()
+        self._worker.join()
+
+
+def detections_to_json(detections: np.ndarray, class_names) -> list:
+    """Same per-box fields as the 'jsonl' detections format, plus the class name."""
+    return [
+        {
+            "cls": int(row[CLS]),
+            "name": class_names[int(row[CLS])],
+            "conf": round(float(row[CONF]), 4),
+            "xyxy": [round(float(v), 1) for v in row[:4]],
+        }
+        for row in detections
+    ]
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /detect   body: one encoded image (JPEG/PNG) -> {"detections": [...]}
+    GET  /metrics  batching and latency statistics
+    GET  /health   liveness check
+    """
+
+    # Keep-alive, so a client streaming frames reuses one connection
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send_json(200, self.server.batcher.metrics())
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok", "model": self.server.model_name})
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/detect":
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = 0
+        if length <= 0:
+            self._send_json(400, {"error": "request body must be an encoded image"})
+            return
+        try:
+            frame = cv2.imdecode(np.frombuffer(self.rfile.read(length), dtype=np.uint8), cv2.IMREAD_COLOR)
+        except cv2.error:
+            frame = None
+        if frame is None:
+            self._send_json(400, {"error": "body is not a decodable image"})
+            return
+        future = self.server.batcher.submit(frame)
+        try:
+            detections = future.result(timeout=self.server.request_timeout)
+        except FutureTimeoutError:
+            # Nobody waits for it any more, so the batcher skips it if it is still queued
+            future.cancel()
+            message = f"no detections within {self.server.request_timeout:g} s; the server is overloaded"
+            self._send_json(504, {"error": message})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {"detections": detections_to_json(detections, self.server.class_names)})
+
+    def log_message(self, format, *args):
+        # One line per request would flood the console at video frame rates
+        pass
+
+
+class LocalInferenceServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer on localhost TCP or, with `unix_socket`, on a Unix domain socket."""
+
+    daemon_threads = True
+    # Many clients connect at once; the socketserver default backlog of 5 makes
+    # Unix socket connects fail with EAGAIN instead of waiting
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        batcher: DynamicBatcher,
+        class_names,
+        model_name: str,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        unix_socket: str = None,
+        request_timeout: float = 30.0,
+    ):
+        self.batcher = batcher
+        self.class_names = class_names
+        self.model_name = model_name
+        self.request_timeout = request_timeout
+        self.unix_socket = unix_socket
+        if unix_socket:
+            self.address_family = socket.AF_UNIX
+            if os.path.exists(unix_socket):
+                os.unlink(unix_socket)
+            super().__init__(unix_socket, InferenceRequestHandler)
+        else:
+            super().__init__((host, port), InferenceRequestHandler)
+
+    def server_bind(self):
+        if self.unix_socket:
+            # HTTPServer.server_bind expects a (host, port) address
+            socketserver.TCPServer.server_bind(self)
+            self.server_name, self.server_port = "localhost", 0
+        else:
+            super().server_bind()
+
+    def get_request(self):
+        request, client_address = super().get_request()
+        # BaseHTTPRequestHandler formats client_address[0]; AF_UNIX gives ''
+        return request, client_address or ("unix", 0)
+
+
+def serve_champion(
+    weights_path_str: str,
+    backend: str,
+    confidence_threshold: float,
+    class_thresholds_path: str,
+    max_batch_size: int,
+    max_wait_ms: float,
+    host: str,
+    port: int,
+    unix_socket: str,
+):
+    """
+    Loads the champion once and serves detections over HTTP on localhost (or
+    a Unix socket), batching concurrent requests dynamically.
+
+    Args:
+        weights_path_str (str): Path to best.pt (defaults to the YOLOv8l champion).
+        backend (str): Inference runtime: 'torch', 'onnx' or 'openvino'.
+        confidence_threshold (float): The minimum confidence score for a detection.
+        class_thresholds_path (str): Optional per-class confidence config
+            (optimize_thresholds.py); it replaces `confidence_threshold`.
+        max_batch_size (int): Largest batch sent to the model.
+        max_wait_ms (float): Longest a request waits for others to join its batch.
+        host (str): Interface to bind (keep it on localhost).
+        port (int): TCP port.
+        unix_socket (str): Serve on this Unix socket path instead of TCP.
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    weights_path = Path(weights_path_str) if weights_path_str else (
+        project_root / "runs" / "tournament" / "yolov8l_50epochs" / "weights" / "best.pt"
+    )
+    if not weights_path.exists():
+        print(f"❌ ERROR: Champion model not found at {weights_path}")
+        return
+
+    # 2. Load the model once
+    print(f"✅ Loading champion model: {weights_path.name} (backend: {backend})")
+    model = load_model(weights_path, backend)
+    class_thresholds = None
+    if class_thresholds_path:
+        class_thresholds = load_class_thresholds(Path(class_thresholds_path), model.names)
+        print(f"✅ Using per-class confidence thresholds from {class_thresholds_path}")
+    detector = FrameDetector(model, confidence_threshold, class_thresholds=class_thresholds)
+
+    # 3. Serve
+    batcher = DynamicBatcher(detector.detect, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    server = LocalInferenceServer(
+        batcher, model.names, weights_path.parent.parent.name, host=host, port=port, unix_socket=unix_socket
+    )
+    address = f"unix:{unix_socket}" if unix_socket else f"http://{host}:{port}"
+    print(f"✅ Serving detections on {address} (batch <= {max_batch_size}, wait <= {max_wait_ms} ms)")
+    print("   POST /detect with an encoded image; GET /metrics for statistics. Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
+        batcher.close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve the champion model over localhost with dynamic request batching."
+    )
+    parser.add_argument(
+        "--weights",
+        type=str,
+        default=None,
+        help="Path to best.pt (defaults to runs/tournament/yolov8l_50epochs/weights/best.pt).",
+    )
+    parser.add_argument("--backend", type=str, default="torch", choices=BACKENDS, help="Inference runtime.")
+    parser.add_argument("--conf", type=float, default=0.5, help="Confidence threshold for detection.")
+    parser.add_argument(
+        "--class-thresholds",
+        type=str,
+        default=None,
+        help="Per-class confidence config from optimize_thresholds.py (overrides --conf).",
+    )
+    parser.add_argument("--max-batch-size", type=int, default=8, help="Largest batch sent to the model.")
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=10.0,
+        help="Longest a request waits for others to join its batch.",
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind (localhost only).")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port.")
+    parser.add_argument("--unix-socket", type=str, default=None, help="Serve on a Unix socket instead of TCP.")
+
+    args = parser.parse_args()
+    serve_champion(
+        weights_path_str=args.weights,
+        backend=args.backend,
+        confidence_threshold=args.conf,
+        class_thresholds_path=args.class_thresholds,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        host=args.host,
+        port=args.port,
+        unix_socket=args.unix_socket,
+    )
@@ -0,0 +1,192 @@
+# In src/testing/optimize_thresholds.py
+
+from pathlib import Path
+import argparse
+import json
+import numpy as np
+
+from detection_metrics import match_by_frame, precision_recall_by_class
+from detections import CLS, CONF
+from inference_backends import BACKENDS
+from prediction_cache import build_prediction_cache, load_prediction_cache
+
+
+def sweep_class_thresholds(cache: dict, iou_threshold: float = 0.5) -> list:
+    """
+    Precision, recall and F1 of every class at every candidate confidence
+    threshold (the confidences of its own cached predictions), computed in one
+    pass over the matched predictions.
+
+    Returns:
+        list[dict]: Per class, 'conf' (decreasing), 'precision', 'recall' and
+            'f1' arrays (one entry per threshold) and the number of 'targets'.
+    """
+    correct = match_by_frame(
+        cache["pred_frame"],
+        cache["predictions"],
+        cache["target_frame"],
+        cache["targets"],
+        num_frames=len(cache["images"]),
+        iou_thresholds=[iou_threshold],
+    )
+    predictions, targets = cache["predictions"], cache["targets"]
+    curves = precision_recall_by_class(
+        correct, predictions[:, CONF], predictions[:, CLS], targets[:, CLS], len(cache["names"])
+    )
+    for curve in curves:
+        curve["precision"], curve["recall"] = curve["precision"][:, 0], curve["recall"][:, 0]
+        curve["f1"] = 2 * curve["precision"] * curve["recall"] / np.maximum(
+            curve["precision"] + curve["recall"], 1e-16
+        )
+    return curves
+
+
+def choose_threshold(
+    curve: dict, objective: str = "f1", target_precision: float = None, min_threshold: float = 0.01
+):
+    """
+    Picks one class's threshold from its sweep.
+
+    With objective 'f1' the threshold with the best F1 is used. With
+    'precision' it is the lowest threshold (most recall) whose precision still
+    reaches `target_precision`; if no threshold gets there, the best-F1 one is
+    used and the result is marked as not meeting the target.
+
+    Returns:
+        dict: 'threshold', 'precision', 'recall', 'f1' and 'met_target', or
+            None if the class has no targets or no predictions.
+    """
+    valid = curve["conf"] >= min_threshold
+    if curve["targets"] == 0 or not valid.any():
+        return None
+
+    f1 = np.where(valid, curve["f1"], -1.0)
+    index = int(f1.argmax())
+    met_target = True
+    if objective == "precision":
+        reaching = np.nonzero(valid & (curve["precision"] >= target_precision))[0]
+        if len(reaching):
+            index = int(reaching[-1])
+        else:
+            met_target = False
+
+    return {
+        "threshold": float(curve["conf"][index]),
+        "precision": float(curve["precision"][index]),
+        "recall": float(curve["recall"][index]),
+        "f1": float(curve["f1"][index]),
+        "met_target": met_target,
+    }
+
+
+def optimize_thresholds(
+    weights_path_str: str,
+    split: str,
+    objective: str,
+    target_precision: float,
+    iou_threshold: float,
+    default_threshold: float,
+    backend: str,
+    output_path_str: str,
+):
+    """
+    Tunes one confidence threshold per class on cached validation predictions
+    and writes them to a config that generate_annotated_video.py
+    (--class-thresholds) and any serving code can load with
+    detections.load_class_thresholds().
+
+    Args:
+        weights_path_str (str): Path to best.pt (defaults to the YOLOv8l champion).
+        split (str): Split the thresholds are tuned on (keep 'test' for reporting).
+        objective (str): 'f1' or 'precision'.
+        target_precision (float): Precision every class must reach with 'precision'.
+        iou_threshold (float): IoU for a prediction to count as a true positive.
+        default_threshold (float): Threshold for classes that cannot be tuned.
+        backend (str): Inference runtime used to build the prediction cache.
+        output_path_str (str): Config path (defaults to <weights>_class_thresholds.json).
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    weights_path = Path(weights_path_str) if weights_path_str else (
+        project_root / "runs" / "tournament" / "yolov8l_50epochs" / "weights" / "best.pt"
+    )
+    data_yaml_path = project_root / "data" / "final_dataset" / "final_dataset.yaml"
+    output_path = Path(output_path_str) if output_path_str else (
+        weights_path.with_name(f"{weights_path.stem}_class_thresholds.json")
+    )
+    if not weights_path.exists():
+        print(f"❌ ERROR: Model not found at {weights_path}")
+        return
+
+    # 2. Inference runs once; every sweep after that only reads the cache
+    cache_path = build_prediction_cache(weights_path, data_yaml_path, split=split, backend=backend)
+    cache = load_prediction_cache(cache_path)
+
+    # 3. Sweep and choose per class
+    print(f"\n--- Per-class thresholds ({objective}, {split} split, IoU {iou_threshold:.2f}) ---")
+    thresholds, report = {}, {}
+    for name, curve in zip(cache["names"], sweep_class_thresholds(cache, iou_threshold)):
+        choice = choose_threshold(curve, objective, target_precision)
+        if choice is None:
+            print(f"  ⚠️ {name:<14} no val targets/predictions, using default {default_threshold:.3f}")
+            continue
+        thresholds[name] = round(choice["threshold"], 4)
+        report[name] = choice
+        flag = "" if choice["met_target"] else f"  ⚠️ below target precision {target_precision:.2f}"
+        print(
+            f"  {name:<14} conf >= {choice['threshold']:.3f}  P {choice['precision']:.3f}  "
+            f"R {choice['recall']:.3f}  F1 {choice['f1']:.3f}{flag}"
+        )
+
+    # 4. Write the config
+    config = {
+        "weights": str(weights_path),
+        "split": split,
+        "objective": objective,
+        "target_precision": target_precision,
+        "iou": iou_threshold,
+        "default": default_threshold,
+        "thresholds": thresholds,
+        "report": report,
+    }
+    with open(output_path, "w") as f:
+        json.dump(config, f, indent=2)
+    print(f"\n✅ Per-class thresholds saved to: {output_path}")
+    print(f"   Use them with: generate_annotated_video.py --class-thresholds {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Tune a confidence threshold per class on cached validation predictions."
+    )
+    parser.add_argument(
+        "--weights",
+        type=str,
+        default=None,
+        help="Path to best.pt (defaults to runs/tournament/yolov8l_50epochs/weights/best.pt).",
+    )
+    parser.add_argument("--split", type=str, default="val", choices=["train", "val", "test"])
+    parser.add_argument(
+        "--objective",
+        type=str,
+        default="f1",
+        choices=["f1", "precision"],
+        help="Maximise F1, or reach --target-precision with as much recall as possible.",
+    )
+    parser.add_argument("--target-precision", type=float, default=0.9, help="Precision target for 'precision'.")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU for a true positive.")
+    parser.add_argument("--default-conf", type=float, default=0.5, help="Threshold for untunable classes.")
+    parser.add_argument("--backend", type=str, default="torch", choices=BACKENDS, help="Inference runtime.")
+    parser.add_argument("--output", type=str, default=None, help="Where to write the config.")
+
+    args = parser.parse_args()
+    optimize_thresholds(
+        weights_path_str=args.weights,
+        split=args.split,
+        objective=args.objective,
+        target_precision=args.target_precision,
+        iou_threshold=args.iou,
+        default_threshold=args.default_conf,
+        backend=args.backend,
+        output_path_str=args.output,
+    )
@@ -0,0 +1,313 @@
+# In src/testing/prediction_cache.py
+
+from pathlib import Path
+import argparse
+import json
+import numpy as np
+import matplotlib.pyplot as plt
+import ultralytics
+import yaml
+from tqdm import tqdm
+
+from detection_metrics import IOU_THRESHOLDS, evaluate_predictions
+from detections import result_to_detections
+from eval_cache import file_sha256, image_to_label_path, split_fingerprint, split_images
+from inference_backends import BACKENDS, load_model
+
+# Bump when the layout of the cache file changes
+PREDICTION_CACHE_VERSION = 1
+
+# The thresholds model.val() uses, so nothing a metric needs is cut away:
+# near-zero confidence floor, standard NMS IoU and box limit. predict() still
+# differs from val() in two ways: it letterboxes each image on its own instead
+# of per rectangular batch, and its NMS keeps one class per box where val()
+# runs multi-label NMS. Scores from a cache are therefore close to, but not
+# identical with, the val() numbers.
+PREDICT_ARGS = {"conf": 0.001, "iou": 0.7, "max_det": 300}
+
+
+def read_yolo_labels(label_path: Path, width: int, height: int) -> np.ndarray:
+    """Reads a YOLO label file into an (M, 6) array in pixels (conf column = 1)."""
+    if not label_path.exists() or label_path.stat().st_size == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+    rows = np.loadtxt(label_path, dtype=np.float32, ndmin=2)[:, :5]
+    cls, xc, yc, w, h = rows.T
+    targets = np.stack(
+        [
+            (xc - w / 2) * width,
+            (yc - h / 2) * height,
+            (xc + w / 2) * width,
+            (yc + h / 2) * height,
+            np.ones_like(cls),
+            cls,
+        ],
+        axis=1,
+    )
+    return targets.astype(np.float32)
+
+
+def default_cache_path(weights_path: Path, split: str, backend: str = "torch") -> Path:
+    """Cache file next to the weights, e.g. weights/best_predictions_test.npz."""
+    weights_path = Path(weights_path)
+    suffix = "" if backend == "torch" else f"_{backend}"
+    return weights_path.with_name(f"{weights_path.stem}_predictions_{split}{suffix}.npz")
+
+
+def _cache_key(weights_path: Path, data_yaml_path: Path, split: str, backend: str, imgsz: int) -> dict:
+    return {
+        "version": PREDICTION_CACHE_VERSION,
+        "weights_sha256": file_sha256(weights_path),
+        "split_fingerprint": split_fingerprint(data_yaml_path, split),
+        "ultralytics": ultralytics.__version__,
+        "predict_args": dict(PREDICT_ARGS, backend=backend, imgsz=imgsz),
+    }
+
+
+def load_prediction_cache(cache_path: Path) -> dict:
+    """
+    Loads a prediction cache as a dict of columns: 'images', 'image_shapes',
+    'pred_frame' + 'predictions' (N, 6), 'target_frame' + 'targets' (M, 6),
+    'names' and the 'key' it was built with.
+    """
+    with np.load(cache_path, allow_pickle=False) as data:
+        cache = {name: data[name] for name in data.files}
+    cache["key"] = json.loads(str(cache["key"]))
+    cache["names"] = [str(name) for name in cache["names"]]
+    return cache
+
+
+def build_prediction_cache(
+    weights_path: Path,
+    data_yaml_path: Path,
+    split: str = "test",
+    backend: str = "torch",
+    imgsz: int = 640,
+    batch: int = 8,
+    cache_path: Path = None,
+    refresh: bool = False,
+) -> Path:
+    """
+    Runs the model once over a dataset split and stores every raw prediction
+    (down to the 0.001 confidence floor model.val() uses) next to the ground
+    truth in one columnar .npz file. Nothing is re-run if a cache built from
+    the same weights, split content and settings already exists.
+
+    Args:
+        weights_path (Path): PyTorch 'best.pt' weights.
+        data_yaml_path (Path): Dataset YAML.
+        split (str): 'train', 'val' or 'test'.
+        backend (str): One of BACKENDS.
+        imgsz (int): Inference image size.
+        batch (int): Images per predict() call.
+        cache_path (Path): Output file (defaults to default_cache_path()).
+        refresh (bool): Rebuild even if the cache is up to date.
+
+    Returns:
+        Path: The cache file.
+    """
+    weights_path, data_yaml_path = Path(weights_path), Path(data_yaml_path)
+    cache_path = Path(cache_path) if cache_path else default_cache_path(weights_path, split, backend)
+    key = _cache_key(weights_path, data_yaml_path, split, backend, imgsz)
+
+    if cache_path.exists() and not refresh:
+        try:
+            if load_prediction_cache(cache_path)["key"] == key:
+                print(f"  ♻️ Prediction cache is up to date: {cache_path}")
+                return cache_path
+        except (OSError, ValueError, KeyError):
+            pass
+
+    with open(data_yaml_path, "r") as f:
+        data = yaml.safe_load(f)
+    dataset_root = Path(data.get("path") or data_yaml_path.parent)
+    images = split_images(dataset_root, data[split])
+    names = data["names"]
+    names = [names[i] for i in sorted(names)] if isinstance(names, dict) else list(names)
+
+    model = load_model(weights_path, backend)
+    pred_frame, predictions, target_frame, targets, shapes = [], [], [], [], []
+    for start in tqdm(range(0, len(images), batch), desc=f"Predicting {split} split"):
+        chunk = [str(p) for p in images[start : start + batch]]
+        results = model.predict(chunk, imgsz=imgsz, verbose=False, **PREDICT_ARGS)
+        for offset, result in enumerate(results):
+            frame = start + offset
+            height, width = result.orig_shape
+            dets = result_to_detections(result)
+            labels = read_yolo_labels(image_to_label_path(chunk[offset]), width, height)
+            pred_frame.append(np.full(len(dets), frame, dtype=np.uint32))
+            predictions.append(dets)
+            target_frame.append(np.full(len(labels), frame, dtype=np.uint32))
+            targets.append(labels)
+            shapes.append((height, width))
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.stem + ".tmp.npz")
+    np.savez_compressed(
+        tmp_path,
+        images=np.array([str(p) for p in images]),
+        image_shapes=np.array(shapes, dtype=np.int32).reshape(-1, 2),
+        pred_frame=np.concatenate(pred_frame) if pred_frame else np.zeros(0, dtype=np.uint32),
+        predictions=np.concatenate(predictions) if predictions else np.zeros((0, 6), dtype=np.float32),
+        target_frame=np.concatenate(target_frame) if target_frame else np.zeros(0, dtype=np.uint32),
+        targets=np.concatenate(targets) if targets else np.zeros((0, 6), dtype=np.float32),
+        names=np.array(names),
+        key=np.array(json.dumps(key)),
+    )
+    tmp_path.replace(cache_path)
+    print(f"  ✅ Cached {sum(len(p) for p in predictions)} predictions for {len(images)} images: {cache_path}")
+    return cache_path
+
+
+def evaluate_prediction_cache(cache: dict, **kwargs) -> dict:
+    """Runs evaluate_predictions() on a loaded cache (kwargs: conf_threshold, classes, iou_thresholds)."""
+    return evaluate_predictions(
+        cache["pred_frame"],
+        cache["predictions"],
+        cache["target_frame"],
+        cache["targets"],
+        num_frames=len(cache["images"]),
+        num_classes=len(cache["names"]),
+        **kwargs,
+    )
+
+
+def scores_from_prediction_cache(cache: dict) -> dict:
+    """
+    The cached counterpart of run_tournament_finale.evaluate_on_test_split():
+    overall mAP@50, mAP@50-95 and the per-class mAP@50-95 keyed by class name.
+    """
+    metrics = evaluate_prediction_cache(cache)
+    scores = {"mAP50": metrics["mAP50"], "mAP50-95": metrics["mAP50-95"]}
+    per_class = np.nan_to_num(metrics["ap"].mean(axis=1), nan=metrics["mAP50-95"])
+    for name, ap in zip(cache["names"], per_class):
+        scores[name] = float(ap)
+    return scores
+
+
+def _plot_pr_curves(metrics: dict, names, output_path: Path):
+    recall_grid = np.linspace(0, 1, metrics["pr_curves"].shape[1])
+    plt.figure(figsize=(10, 7))
+    for c, name in enumerate(names):
+        if np.isfinite(metrics["ap50_per_class"][c]):
+            plt.plot(recall_grid, metrics["pr_curves"][c], label=f"{name} {metrics['ap50_per_class'][c]:.3f}")
+    plt.title(f"Precision-Recall (mAP@50 {metrics['mAP50']:.3f})")
+    plt.xlabel("Recall")
+    plt.ylabel("Precision")
+    plt.xlim(0, 1)
+    plt.ylim(0, 1.05)
+    plt.grid(linestyle="--", alpha=0.6)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(output_path)
+
+
+def _plot_confusion_matrix(matrix: np.ndarray, names, output_path: Path):
+    labels = list(names) + ["background"]
+    # Normalise each true-class column so the diagonal reads as recall
+    normalised = matrix / np.maximum(matrix.sum(axis=0, keepdims=True), 1)
+    fig, ax = plt.subplots(figsize=(10, 8))
+    image = ax.imshow(normalised, cmap="Blues", vmin=0, vmax=1)
+    ax.set_xticks(range(len(labels)))
+    ax.set_xticklabels(labels, rotation=45, ha="right")
+    ax.set_yticks(range(len(labels)))
+    ax.set_yticklabels(labels)
+    ax.set_xlabel("True")
+    ax.set_ylabel("Predicted")
+    for (i, j), count in np.ndenumerate(matrix):
+        if count:
+            ax.text(j, i, str(count), ha="center", va="center", fontsize=8)
+    fig.colorbar(image)
+    fig.tight_layout()
+    fig.savefig(output_path)
+
+
+def evaluate_from_cache(
+    weights_path_str: str,
+    split: str,
+    backend: str,
+    imgsz: int,
+    conf_threshold: float,
+    classes,
+    iou_threshold: float,
+    refresh: bool,
+):
+    """
+    Builds (or reuses) the prediction cache of a model and reports its metrics,
+    PR curves and confusion matrix for the requested settings.
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    weights_path = Path(weights_path_str) if weights_path_str else (
+        project_root / "runs" / "tournament" / "yolov8l_50epochs" / "weights" / "best.pt"
+    )
+    data_yaml_path = project_root / "data" / "final_dataset" / "final_dataset.yaml"
+    if not weights_path.exists():
+        print(f"❌ ERROR: Model not found at {weights_path}")
+        return
+
+    # 2. Run inference once (or reuse the cache)
+    cache_path = build_prediction_cache(
+        weights_path, data_yaml_path, split=split, backend=backend, imgsz=imgsz, refresh=refresh
+    )
+    cache = load_prediction_cache(cache_path)
+    names = cache["names"]
+
+    # 3. Evaluate from the cache
+    iou_thresholds = IOU_THRESHOLDS if iou_threshold is None else [iou_threshold]
+    metrics = evaluate_prediction_cache(
+        cache, conf_threshold=conf_threshold, classes=classes, iou_thresholds=iou_thresholds
+    )
+
+    print(f"\n--- Metrics from cached predictions ({split} split, {len(cache['images'])} images) ---")
+    print(f"  mAP@{iou_thresholds[0]:.2f}: {metrics['mAP50']:.4f}")
+    if len(iou_thresholds) > 1:
+        print(f"  mAP@50-95: {metrics['mAP50-95']:.4f}")
+    print(f"  Best mean-F1 confidence: {metrics['best_conf']:.3f}")
+    print(f"  {'Class':<14} {'AP':>7} {'P':>7} {'R':>7} {'F1':>7}")
+    for c, name in enumerate(names):
+        if np.isfinite(metrics["ap50_per_class"][c]):
+            print(
+                f"  {name:<14} {metrics['ap50_per_class'][c]:>7.3f} {metrics['precision'][c]:>7.3f} "
+                f"{metrics['recall'][c]:>7.3f} {metrics['f1'][c]:>7.3f}"
+            )
+
+    # 4. Save the plots
+    output_folder = project_root / "results"
+    output_folder.mkdir(exist_ok=True)
+    stem = f"{weights_path.parent.parent.name}_{split}"
+    _plot_pr_curves(metrics, names, output_folder / f"{stem}_pr_curves.png")
+    _plot_confusion_matrix(metrics["confusion_matrix"], names, output_folder / f"{stem}_confusion_matrix.png")
+    print(f"\n✅ PR curves and confusion matrix saved to: {output_folder}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Cache raw predictions for a split once, then compute metrics from the cache."
+    )
+    parser.add_argument(
+        "--weights",
+        type=str,
+        default=None,
+        help="Path to best.pt (defaults to runs/tournament/yolov8l_50epochs/weights/best.pt).",
+    )
+    parser.add_argument("--split", type=str, default="test", choices=["train", "val", "test"])
+    parser.add_argument("--backend", type=str, default="torch", choices=BACKENDS, help="Inference runtime.")
+    parser.add_argument("--imgsz", type=int, default=640, help="Inference image size.")
+    parser.add_argument("--conf", type=float, default=0.0, help="Drop cached predictions below this confidence.")
+    parser.add_argument("--classes", type=int, nargs="+", default=None, help="Only evaluate these class ids.")
+    parser.add_argument(
+        "--iou", type=float, default=None, help="Evaluate at this single IoU instead of 0.50:0.95."
+    )
+    parser.add_argument("--refresh", action="store_true", help="Re-run inference even if the cache is current.")
+
+    args = parser.parse_args()
+    evaluate_from_cache(
+        weights_path_str=args.weights,
+        split=args.split,
+        backend=args.backend,
+        imgsz=args.imgsz,
+        conf_threshold=args.conf,
+        classes=args.classes,
+        iou_threshold=args.iou,
+        refresh=args.refresh,
+    )
@@ -0,0 +1,259 @@
+# In src/testing/quantize_champion.py
+
+from ultralytics import YOLO
+from pathlib import Path
+import argparse
+import json
+import shutil
+import sys
+import time
+import cv2
+import numpy as np
+
+from eval_cache import dataset_split_images
+from generate_annotated_video import positive_int
+from inference_backends import export_weights
+from run_tournament_finale import evaluate_on_test_split
+
+
+def letterbox_for_onnx(img_path: Path, imgsz: int) -> np.ndarray:
+    """
+    Prepares an image exactly like the Ultralytics predictor does for an
+    exported model: letterbox to a square canvas padded with grey (114),
+    BGR -> RGB, HWC -> NCHW, scaled to [0, 1].
+    """
+    img = cv2.imread(str(img_path))
+    h, w = img.shape[:2]
+    r = imgsz / max(h, w)
+    new_w, new_h = round(w * r), round(h * r)
+    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top : top + new_h, left : left + new_w] = resized
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor)
+
+
+def _calibration_reader(images, input_name: str, imgsz: int):
+    """Builds an ONNX Runtime calibration reader over a list of images."""
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class ValImageCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self._images = iter(images)
+
+        def get_next(self):
+            img_path = next(self._images, None)
+            if img_path is None:
+                return None
+            return {input_name: letterbox_for_onnx(img_path, imgsz)}
+
+    return ValImageCalibrationReader()
+
+
+def quantize_onnx_int8(fp32_path: Path, int8_path: Path, calibration_images, imgsz: int, exclude_prefixes=()):
+    """
+    Statically quantizes an ONNX model to INT8 (QDQ format, per-channel
+    weights) with activation ranges calibrated on the given images.
+    """
+    import onnx
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    prepared_path = int8_path.with_name(int8_path.stem + "_prepared.onnx")
+    quant_pre_process(str(fp32_path), str(prepared_path))
+
+    model = onnx.load(str(prepared_path))
+    input_name = model.graph.input[0].name
+    excluded = [node.name for node in model.graph.node if node.name.startswith(tuple(exclude_prefixes))]
+
+    quantize_static(
+        str(prepared_path),
+        str(int8_path),
+        _calibration_reader(calibration_images, input_name, imgsz),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        nodes_to_exclude=excluded,
+    )
+    prepared_path.unlink()
+    return len(excluded)
+
+
+def measure_latency(model, images, imgsz: int, warmup: int = 5) -> float:
+    """Mean single-image predict() latency in milliseconds."""
+    if not images:
+        raise ValueError("measure_latency() needs at least one image")
+    for img_path in images[:warmup]:
+        model.predict(str(img_path), imgsz=imgsz, verbose=False)
+    start = time.perf_counter()
+    for img_path in images:
+        model.predict(str(img_path), imgsz=imgsz, verbose=False)
+    return (time.perf_counter() - start) / len(images) * 1000.0
+
+
+def _size_mb(path: Path) -> float:
+    return path.stat().st_size / 1e6
+
+
+def quantize_champion(
+    weights_path_str: str,
+    calibration_images: int,
+    tolerance: float,
+    imgsz: int,
+    quantize_head: bool,
+    latency_images: int,
+) -> bool:
+    """
+    Produces an INT8 version of a tournament model and publishes it only if
+    its test-split mAP@50 stays within `tolerance` of the FP32 model.
+
+    Args:
+        weights_path_str (str): Path to best.pt (defaults to the YOLOv8l champion).
+        calibration_images (int): Number of val images used for calibration.
+        tolerance (float): Maximum allowed absolute mAP@50 drop (e.g. 0.01).
+        imgsz (int): Inference image size.
+        quantize_head (bool): Also quantize the detection head (less accurate).
+        latency_images (int): Number of images used for the latency comparison.
+
+    Returns:
+        bool: True if the INT8 model passed the accuracy gate and was published.
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    weights_path = Path(weights_path_str) if weights_path_str else (
+        project_root / "runs" / "tournament" / "yolov8l_50epochs" / "weights" / "best.pt"
+    )
+    data_yaml_path = project_root / "data" / "final_dataset" / "final_dataset.yaml"
+    staging_path = weights_path.parent / "int8_staging"
+    published_path = weights_path.with_name(f"{weights_path.stem}_int8.onnx")
+    run_name = weights_path.parent.parent.name
+
+    if not weights_path.exists():
+        print(f"❌ ERROR: Model not found at {weights_path}")
+        return False
+
+    if not data_yaml_path.exists():
+        print(f"❌ ERROR: Dataset YAML not found at {data_yaml_path}")
+        return False
+
+    # Either an images/val folder or a val.txt image list, as the YAML says
+    val_images = dataset_split_images(data_yaml_path, "val")
+    if not val_images:
+        print(f"❌ ERROR: No calibration images in the val split of {data_yaml_path}")
+        return False
+    # Spread the calibration sample over the whole split instead of one video
+    rng = np.random.default_rng(0)
+    picks = rng.choice(len(val_images), min(calibration_images, len(val_images)), replace=False)
+    sample = [val_images[i] for i in sorted(picks)]
+
+    # 2. Export to ONNX and quantize
+    print(f"--- Quantizing {run_name} to INT8 ({len(sample)} calibration images) ---")
+    fp32_path = export_weights(weights_path, "onnx", imgsz=imgsz)
+    staging_path.mkdir(exist_ok=True)
+    int8_path = staging_path / f"{weights_path.stem}_int8.onnx"
+
+    torch_model = YOLO(weights_path)
+    # The detection head (last module) mixes box regression and class scores;
+    # keeping it in FP32 avoids most of the INT8 accuracy loss
+    head_prefix = f"/model.{len(torch_model.model.model) - 1}/"
+    excluded = quantize_onnx_int8(
+        fp32_path, int8_path, sample, imgsz, exclude_prefixes=() if quantize_head else (head_prefix,)
+    )
+    print(f"  ✅ INT8 model written to {int8_path} ({excluded} head nodes kept in FP32)")
+
+    # 3. Evaluate both models through the tournament finale metric path
+    testing_project = project_root / "runs" / "quantization_testing"
+    print("\n--- Evaluating FP32 reference on the test split ---")
+    fp32_scores = evaluate_on_test_split(torch_model, data_yaml_path, testing_project, f"test_{run_name}_fp32")
+    print("\n--- Evaluating INT8 model on the test split ---")
+    int8_model = YOLO(str(int8_path), task="detect")
+    int8_scores = evaluate_on_test_split(int8_model, data_yaml_path, testing_project, f"test_{run_name}_int8", batch=1)
+
+    # 4. Latency and size
+    latency_sample = val_images[: latency_images]
+    fp32_latency = measure_latency(torch_model, latency_sample, imgsz)
+    int8_latency = measure_latency(int8_model, latency_sample, imgsz)
+
+    drop = fp32_scores["mAP50"] - int8_scores["mAP50"]
+    passed = drop <= tolerance
+    report = {
+        "weights": str(weights_path),
+        "calibration_images": len(sample),
+        "tolerance": tolerance,
+        "fp32": {"mAP50": fp32_scores["mAP50"], "mAP50-95": fp32_scores["mAP50-95"],
+                 "latency_ms": fp32_latency, "size_mb": _size_mb(weights_path)},
+        "int8": {"mAP50": int8_scores["mAP50"], "mAP50-95": int8_scores["mAP50-95"],
+                 "latency_ms": int8_latency, "size_mb": _size_mb(int8_path)},
+        "mAP50_drop": drop,
+        "passed": passed,
+    }
+    with open(staging_path / "quantization_report.json", "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n--- Quantization Report ---")
+    print(f"  {'':<6} {'mAP50':>8} {'mAP50-95':>9} {'Latency (ms)':>13} {'Size (MB)':>10}")
+    for key in ["fp32", "int8"]:
+        row = report[key]
+        print(f"  {key.upper():<6} {row['mAP50']:>8.4f} {row['mAP50-95']:>9.4f} {row['latency_ms']:>13.1f} {row['size_mb']:>10.1f}")
+    print(f"  mAP50 drop: {drop * 100:.2f} points (tolerance {tolerance * 100:.2f})")
+    print(f"  Speed-up: {fp32_latency / int8_latency:.2f}x, size: {report['int8']['size_mb'] / report['fp32']['size_mb'] * 100:.0f}% of FP32")
+
+    # 5. Accuracy gate
+    if not passed:
+        print(f"\n❌ REFUSED: INT8 model loses more than the allowed mAP@50. Not published.")
+        print(f"   The rejected artifact is kept for inspection in {staging_path}")
+        return False
+
+    shutil.copy(int8_path, published_path)
+    shutil.copy(staging_path / "quantization_report.json", published_path.with_suffix(".json"))
+    print(f"\n✅ INT8 model published to: {published_path}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Statically quantize a tournament model to INT8 behind an accuracy gate."
+    )
+    parser.add_argument(
+        "--weights",
+        type=str,
+        default=None,
+        help="Path to best.pt (defaults to runs/tournament/yolov8l_50epochs/weights/best.pt).",
+    )
+    parser.add_argument(
+        "--calibration-images",
+        type=positive_int,
+        default=300,
+        help="Number of final_dataset val images used to calibrate activation ranges.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.01,
+        help="Maximum allowed mAP@50 drop on the test split (0.01 = 1 point).",
+    )
+    parser.add_argument("--imgsz", type=int, default=640, help="Inference image size.")
+    parser.add_argument(
+        "--quantize-head",
+        action="store_true",
+        help="Also quantize the detection head (faster, usually less accurate).",
+    )
+    parser.add_argument(
+        "--latency-images",
+        type=positive_int,
+        default=100,
+        help="Number of images used for the latency comparison.",
+    )
+
+    args = parser.parse_args()
+    ok = quantize_champion(
+        weights_path_str=args.weights,
+        calibration_images=args.calibration_images,
+        tolerance=args.tolerance,
+        imgsz=args.imgsz,
+        quantize_head=args.quantize_head,
+        latency_images=args.latency_images,
+    )
+    sys.exit(0 if ok else 1)
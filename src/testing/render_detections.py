@@ -0,0 +1,82 @@
+# In src/testing/render_detections.py
+
+from pathlib import Path
+import argparse
+import cv2
+from tqdm import tqdm
+
+from detections import draw_detections, iter_frame_detections, load_detections
+
+
+def render_detections_video(detections_path_str: str, video_path_str: str = None):
+    """
+    Draws a stored detections file onto its source video, without running
+    the model again.
+
+    Args:
+        detections_path_str (str): Path to a detections file (or its '.json' sidecar)
+            written by 'generate_annotated_video.py --output detections'.
+        video_path_str (str): The source video; defaults to the one recorded in the file.
+    """
+    # 1. Load the detections and their metadata
+    records, metadata = load_detections(Path(detections_path_str))
+    class_names = {int(k): v for k, v in metadata["names"].items()}
+    input_video_path = Path(video_path_str or metadata["video"])
+
+    project_root = Path(__file__).resolve().parent.parent.parent
+    output_folder = project_root / "results"
+    output_folder.mkdir(exist_ok=True)
+    output_video_path = output_folder / f"{input_video_path.stem}_annotated.mp4"
+
+    if not input_video_path.exists():
+        print(f"❌ ERROR: Input video not found at {input_video_path}")
+        return
+
+    # 2. Setup Video Capture and Writer
+    cap = cv2.VideoCapture(str(input_video_path))
+    if not cap.isOpened():
+        print(f"❌ ERROR: Could not open video file.")
+        return
+
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    out = cv2.VideoWriter(
+        str(output_video_path), fourcc, fps, (frame_width, frame_height)
+    )
+
+    # 3. Draw the stored detections frame by frame
+    num_frames = metadata["frames"]
+    print(f"✅ Rendering {metadata['boxes']} detections onto {input_video_path.name} ({num_frames} frames)")
+    for detections in tqdm(iter_frame_detections(records, num_frames), total=num_frames, desc="Rendering video"):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        out.write(draw_detections(frame, detections, class_names))
+
+    # 4. Cleanup
+    cap.release()
+    out.release()
+    print(f"✅ Annotated video saved to: {output_video_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Render an annotated video from a stored detections file."
+    )
+    parser.add_argument(
+        "--detections",
+        type=str,
+        required=True,
+        help="Path to the detections file (e.g., 'results/VID01_detections.json').",
+    )
+    parser.add_argument(
+        "--video",
+        type=str,
+        default=None,
+        help="Path to the source video (defaults to the path stored in the detections file).",
+    )
+
+    args = parser.parse_args()
+    render_detections_video(detections_path_str=args.detections, video_path_str=args.video)
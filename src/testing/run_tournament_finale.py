@@ -1,12 +1,30 @@
 # In src/testing/run_tournament_finale.py
 
-from ultralytics import YOLO
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import os
 import pandas as pd
 import matplotlib.pyplot as plt
+import argparse
 import json
 import time
 
+from benchmark_variants import load_benchmark_results
+from eval_cache import EvalCache
+from inference_backends import BACKENDS, load_model
+from prediction_cache import build_prediction_cache, load_prediction_cache, scores_from_prediction_cache
+
+# Benchmark columns joined into the results table (see benchmark_variants.py)
+BENCHMARK_COLUMNS = {
+    'latency_p50_ms': 'Latency p50 (ms)',
+    'latency_p95_ms': 'Latency p95 (ms)',
+    'latency_p99_ms': 'Latency p99 (ms)',
+    'fps': 'FPS',
+    'peak_rss_mb': 'Peak RSS (MB)',
+    'load_time_s': 'Load Time (s)',
+}
+
 def get_training_time(run_folder: Path) -> float:
     """Parses the results.csv to get the total training time in hours."""
     try:
@@ -20,22 +38,172 @@ def get_training_time(run_folder: Path) -> float:
     except Exception:
         return -1.0
 
-def run_and_compare_all_variants():
+def pareto_front(df: pd.DataFrame, accuracy_col: str = 'mAP50', latency_col: str = 'Latency p50 (ms)') -> pd.Series:
+    """
+    Marks the models on the accuracy/latency Pareto front: those for which no
+    other model is both at least as accurate and at least as fast (and
+    strictly better in one of the two).
+    """
+    accuracy = df[accuracy_col].to_numpy()
+    latency = df[latency_col].to_numpy()
+    at_least_as_good = (accuracy[None, :] >= accuracy[:, None]) & (latency[None, :] <= latency[:, None])
+    strictly_better = (accuracy[None, :] > accuracy[:, None]) | (latency[None, :] < latency[:, None])
+    dominated = (at_least_as_good & strictly_better).any(axis=1)
+    return pd.Series(~dominated, index=df.index)
+
+def recommend_champion(df: pd.DataFrame, latency_budget_ms: float = None, accuracy_tolerance: float = 0.0):
+    """
+    Picks the champion from the Pareto front: the most accurate model whose
+    p50 latency fits the budget. With `accuracy_tolerance`, the fastest front
+    model within that many mAP@50 points of it is preferred instead.
+
+    Returns:
+        tuple[str, str]: The champion and a one-line reason.
+    """
+    latency_col = 'Latency p50 (ms)'
+    if latency_col not in df.columns or df[latency_col].isna().all():
+        return df['mAP50'].idxmax(), "highest mAP@50 on the test set (no latency data available)"
+
+    measured = df.dropna(subset=[latency_col])
+    front = measured[pareto_front(measured)]
+    fits = front if latency_budget_ms is None else front[front[latency_col] <= latency_budget_ms]
+    if fits.empty:
+        fastest = front[latency_col].idxmin()
+        return fastest, f"no model meets the {latency_budget_ms:.1f} ms budget; this is the fastest one"
+
+    best = fits['mAP50'].idxmax()
+    close_enough = fits[fits['mAP50'] >= fits.loc[best, 'mAP50'] - accuracy_tolerance]
+    champion = close_enough[latency_col].idxmin()
+
+    budget_text = "" if latency_budget_ms is None else f" within the {latency_budget_ms:.1f} ms budget"
+    if champion == best:
+        reason = f"highest mAP@50 on the Pareto front{budget_text}"
+    else:
+        reason = (f"fastest Pareto model{budget_text} within {accuracy_tolerance * 100:.1f} "
+                  f"mAP@50 points of {best}")
+    return champion, reason
+
+def plot_pareto_front(df: pd.DataFrame, output_path: Path, latency_budget_ms: float = None, champion: str = None):
+    """Plots mAP@50 against p50 latency, highlighting the Pareto front and the budget."""
+    latency_col = 'Latency p50 (ms)'
+    measured = df.dropna(subset=[latency_col])
+    front = measured[pareto_front(measured)].sort_values(latency_col)
+
+    plt.figure(figsize=(10, 6))
+    plt.scatter(measured[latency_col], measured['mAP50'], color='grey', label='Variants')
+    plt.plot(front[latency_col], front['mAP50'], 'o-', color='royalblue', label='Pareto front')
+    for name, row in measured.iterrows():
+        plt.annotate(name, (row[latency_col], row['mAP50']), textcoords='offset points', xytext=(5, 5))
+    if champion in measured.index:
+        plt.scatter([measured.loc[champion, latency_col]], [measured.loc[champion, 'mAP50']],
+                    s=200, facecolors='none', edgecolors='darkorange', linewidths=2, label='Champion')
+    if latency_budget_ms is not None:
+        plt.axvline(latency_budget_ms, color='red', linestyle='--', label=f'Budget ({latency_budget_ms:.1f} ms)')
+    plt.title('Accuracy vs. Latency of YOLOv8 Variants')
+    plt.xlabel('p50 Latency per Frame (ms)')
+    plt.ylabel('mAP@50 Score')
+    plt.grid(linestyle='--', alpha=0.6)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(output_path)
+
+def evaluate_on_test_split(model, data_yaml_path: Path, project_dir: Path, name: str, batch: int = 8) -> dict:
+    """
+    Runs the official test-split evaluation for one model and returns its
+    overall and per-class scores. Every tool that reports test accuracy goes
+    through this function so the numbers stay comparable.
+    """
+    metrics = model.val(
+        data=str(data_yaml_path),
+        split='test',
+        project=str(project_dir),
+        name=name,
+        batch=batch,
+        exist_ok=True,
+        save_json=True # Important for getting precise AP values
+    )
+
+    scores = {
+        'mAP50': metrics.box.map50,
+        'mAP50-95': metrics.box.map,
+    }
+    for i, ap in enumerate(metrics.box.maps):
+        class_name = model.names[i]
+        scores[class_name] = ap.item()
+    return scores
+
+def _evaluate_variant(job: dict) -> dict:
+    """
+    Loads one tournament model and evaluates it on the test split. Used both
+    in-process and as a worker; `job['threads']` caps the torch threads so
+    parallel workers share the CPU instead of oversubscribing it.
+    """
+    if job.get('threads'):
+        import torch
+        torch.set_num_threads(job['threads'])
+
+    if job['metrics_source'] == 'predictions':
+        cache_path = build_prediction_cache(
+            Path(job['model_path']), Path(job['data_yaml_path']), split='test',
+            backend=job['backend'], batch=job['batch']
+        )
+        return scores_from_prediction_cache(load_prediction_cache(cache_path))
+
+    model = load_model(Path(job['model_path']), job['backend'])
+    scores = evaluate_on_test_split(
+        model, Path(job['data_yaml_path']), Path(job['project_dir']), job['name'], batch=job['batch']
+    )
+    return {k: float(v) for k, v in scores.items()}
+
+def run_and_compare_all_variants(
+    backend: str = 'torch',
+    benchmark_imgsz: int = 640,
+    benchmark_batch: int = 1,
+    latency_budget_ms: float = None,
+    accuracy_tolerance: float = 0.0,
+    use_cache: bool = True,
+    workers: int = 1,
+    threads_per_worker: int = None,
+    metrics_source: str = 'val',
+):
     """
     Tests all 5 trained YOLOv8 tournament models, saves their results,
     generates comparison plots, and recommends a champion.
+
+    Args:
+        backend (str): Inference runtime used for evaluation: 'torch', 'onnx'
+            or 'openvino'. Exported models are created next to best.pt on first use.
+        benchmark_imgsz (int): Image size of the benchmark rows joined into the table.
+        benchmark_batch (int): Batch size of the benchmark rows joined into the table.
+        latency_budget_ms (float): Maximum p50 latency per frame for the champion
+            (e.g. 33.3 for 30 fps). None means no budget.
+        accuracy_tolerance (float): Prefer a faster Pareto model if it is within this
+            many mAP@50 points (as a fraction, e.g. 0.01) of the most accurate one.
+        use_cache (bool): Reuse cached test scores for models whose weights, test
+            split and val settings are unchanged. False forces a fresh evaluation.
+        workers (int): Number of models evaluated in parallel, each in its own process.
+        threads_per_worker (int): Torch threads per worker. Defaults to an even
+            split of the CPU cores between the workers.
+        metrics_source (str): 'val' runs model.val(); 'predictions' computes the
+            metrics from each model's cached raw test predictions (prediction_cache.py),
+            running inference only for models that have no up-to-date cache.
     """
     # 1. Configuration
     project_root = Path(__file__).resolve().parent.parent.parent
     data_yaml_path = project_root / 'data' / 'final_dataset' / 'final_dataset.yaml'
     tournament_runs_path = project_root / 'runs' / 'tournament'
+    testing_project = project_root / 'runs' / 'tournament_testing'
+    eval_cache = EvalCache(testing_project / 'eval_cache')
+    eval_batch = 8
     
     variants_to_test = ['n', 's', 'm', 'l', 'x']
     results_data = []
 
     print("--- Starting Tournament Finale: Testing All Models ---")
 
-    # 2. Loop through each model variant, test it, and collect results
+    # 2. Find each model variant and reuse its cached scores where possible
+    scores_by_variant = {}
+    pending = []
     for variant in variants_to_test:
         run_name = f'yolov8{variant}_50epochs'
         model_path = tournament_runs_path / run_name / 'weights' / 'best.pt'
@@ -45,43 +213,99 @@ def run_and_compare_all_variants():
             print(f"  ❌ WARNING: Model not found at {model_path}. Skipping.")
             continue
             
-        model = YOLO(model_path)
-        
-        metrics = model.val(
-            data=str(data_yaml_path),
-            split='test',
-            project=str(project_root / 'runs' / 'tournament_testing'),
-            name=f'test_{run_name}',
-            batch=8,
-            exist_ok=True,
-            save_json=True # Important for getting precise AP values
-        )
+        # Only evaluate when the weights, the test split or the settings changed
+        val_args = {'split': 'test', 'batch': eval_batch, 'backend': backend}
+        if metrics_source != 'val':
+            val_args['source'] = metrics_source
+        cache_key = eval_cache.key_for(model_path, data_yaml_path, **val_args)
+        scores = eval_cache.get(cache_key) if use_cache else None
+        if scores is not None:
+            print("  ♻️ Using cached test scores (weights and test split unchanged).")
+            scores_by_variant[variant] = scores
+            continue
+
+        test_name = f'test_{run_name}' if backend == 'torch' else f'test_{run_name}_{backend}'
+        pending.append({
+            'variant': variant,
+            'model_path': str(model_path),
+            'backend': backend,
+            'data_yaml_path': str(data_yaml_path),
+            'project_dir': str(testing_project),
+            'name': test_name,
+            'batch': eval_batch,
+            'cache_key': cache_key,
+            'metrics_source': metrics_source,
+        })
+        print("  - Queued for evaluation.")
 
-        # Collect the results
+    # 3. Evaluate the remaining variants, one worker process each if requested.
+    # A failing variant is reported and left out instead of aborting the finale.
+    if pending and workers > 1:
+        threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        print(f"\n--- Evaluating {len(pending)} models in {workers} processes ({threads} threads each) ---")
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {pool.submit(_evaluate_variant, {**job, 'threads': threads}): job for job in pending}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    scores_by_variant[job['variant']] = future.result()
+                except Exception as e:
+                    print(f"  ❌ WARNING: Evaluation of YOLOv8{job['variant']} failed: {e}")
+    else:
+        for job in pending:
+            print(f"\n--- Evaluating YOLOv8{job['variant']} ---")
+            try:
+                scores_by_variant[job['variant']] = _evaluate_variant(job)
+            except Exception as e:
+                print(f"  ❌ WARNING: Evaluation of YOLOv8{job['variant']} failed: {e}")
+
+    # 4. Collect the results in tournament order
+    for job in pending:
+        if job['variant'] in scores_by_variant:
+            eval_cache.put(
+                job['cache_key'], scores_by_variant[job['variant']],
+                model=f"YOLOv8{job['variant']}", weights=job['model_path']
+            )
+
+    for variant in variants_to_test:
+        if variant not in scores_by_variant:
+            continue
+        scores = scores_by_variant[variant]
+        run_name = f'yolov8{variant}_50epochs'
         training_time = get_training_time(tournament_runs_path / run_name)
-        per_class_maps = metrics.box.maps
+        class_scores = {k: v for k, v in scores.items() if k not in ['mAP50', 'mAP50-95']}
         
         result_entry = {
             'Model': f'YOLOv8{variant}',
-            'mAP50': metrics.box.map50,
-            'mAP50-95': metrics.box.map,
-            'Train Time (hrs)': training_time
+            'mAP50': scores['mAP50'],
+            'mAP50-95': scores['mAP50-95'],
+            'Train Time (hrs)': training_time,
+            **class_scores
         }
-        for i, ap in enumerate(per_class_maps):
-            class_name = model.names[i]
-            result_entry[class_name] = ap.item()
         
         results_data.append(result_entry)
-        print(f"  ✅ Testing complete for YOLOv8{variant}. mAP50: {metrics.box.map50:.4f}")
+        print(f"  ✅ Testing complete for YOLOv8{variant}. mAP50: {scores['mAP50']:.4f}")
 
     if not results_data:
         print("\n❌ FATAL ERROR: No models were successfully tested. Aborting.")
         return
 
-    # 3. Create a pandas DataFrame for easy analysis and plotting
+    # 5. Create a pandas DataFrame for easy analysis and plotting
     df = pd.DataFrame(results_data).set_index('Model')
+    class_names = [name for name in df.columns if name not in ['mAP50', 'mAP50-95', 'Train Time (hrs)']]
+
+    # Join the measured inference cost, if benchmark_variants.py has been run
+    benchmark = load_benchmark_results(
+        project_root / 'runs' / 'benchmarks', imgsz=benchmark_imgsz, batch=benchmark_batch, backend=backend
+    )
+    if benchmark is not None:
+        df = df.join(benchmark.rename(columns=BENCHMARK_COLUMNS))
+        print(f"\nJoined inference benchmark (imgsz={benchmark_imgsz}, batch={benchmark_batch}).")
+    else:
+        print("\nNo inference benchmark found; run benchmark_variants.py to add latency columns.")
     
-    # --- 4. Generate and Save Plots ---
+    # --- 6. Generate and Save Plots ---
     print("\n--- Generating Comparison Plots ---")
     
     # Plot 1: Overall mAP50 Comparison
@@ -96,7 +320,6 @@ def run_and_compare_all_variants():
     print(f"  - Saved overall performance plot to {plot1_path}")
 
     # Plot 2: Per-Class mAP50 Comparison
-    class_names = [name for name in df.columns if name not in ['mAP50', 'mAP50-95', 'Train Time (hrs)']]
     df[class_names].T.plot(kind='bar', figsize=(15, 8), width=0.8)
     plt.title('Per-Class mAP@50 Performance')
     plt.ylabel('mAP@50 Score')
@@ -108,16 +331,82 @@ def run_and_compare_all_variants():
     plt.savefig(plot2_path)
     print(f"  - Saved per-class performance plot to {plot2_path}")
     
-    # --- 5. Recommend a Champion ---
+    # --- 7. Recommend a Champion ---
     print("\n--- Tournament Results Summary ---")
     print(df.round(3)) # Print the full results table
     
-    # Simple logic for recommendation: highest mAP50
-    champion = df['mAP50'].idxmax()
+    # Recommendation: best accuracy/latency trade-off on the Pareto front
+    champion, reason = recommend_champion(df, latency_budget_ms, accuracy_tolerance)
+
+    # Plot 3: Accuracy/latency Pareto front
+    if benchmark is not None:
+        plot3_path = tournament_runs_path / 'tournament_pareto_front.png'
+        plot_pareto_front(df, plot3_path, latency_budget_ms, champion)
+        print(f"  - Saved Pareto front plot to {plot3_path}")
+        measured = df.dropna(subset=['Latency p50 (ms)'])
+        print(f"  - Pareto front: {', '.join(measured.index[pareto_front(measured)])}")
+
     print("\n--- Champion Recommendation ---")
     print(f"🏆 The champion model is: {champion}")
-    print("   This model achieved the highest mAP@50 score on the test set.")
+    print(f"   Reason: {reason}.")
     print("   Consider this model for your intensive optimization experiments.")
 
 if __name__ == '__main__':
-    run_and_compare_all_variants()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Test all tournament variants and recommend a champion.")
+    parser.add_argument(
+        '--backend',
+        type=str,
+        default='torch',
+        choices=BACKENDS,
+        help="Inference runtime used for evaluation."
+    )
+    parser.add_argument('--benchmark-imgsz', type=int, default=640, help="Benchmark image size to join.")
+    parser.add_argument('--benchmark-batch', type=int, default=1, help="Benchmark batch size to join.")
+    parser.add_argument(
+        '--latency-budget-ms',
+        type=float,
+        default=None,
+        help="Maximum p50 latency per frame for the champion (e.g. 33.3 for 30 fps)."
+    )
+    parser.add_argument(
+        '--accuracy-tolerance',
+        type=float,
+        default=0.0,
+        help="Prefer a faster model within this mAP@50 margin of the best one (e.g. 0.01)."
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help="Re-evaluate every model even if cached test scores are still valid."
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help="Number of models to evaluate in parallel worker processes."
+    )
+    parser.add_argument(
+        '--threads-per-worker',
+        type=int,
+        default=None,
+        help="Torch threads per worker (default: CPU cores divided by --workers)."
+    )
+    parser.add_argument(
+        '--metrics-source',
+        type=str,
+        default='val',
+        choices=['val', 'predictions'],
+        help="Compute test metrics with model.val() or from cached raw predictions."
+    )
+    args = parser.parse_args()
+    run_and_compare_all_variants(
+        backend=args.backend,
+        benchmark_imgsz=args.benchmark_imgsz,
+        benchmark_batch=args.benchmark_batch,
+        latency_budget_ms=args.latency_budget_ms,
+        accuracy_tolerance=args.accuracy_tolerance,
+        use_cache=not args.no_cache,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        metrics_source=args.metrics_source,
+    )
\ No newline at end of file
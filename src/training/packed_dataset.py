@@ -0,0 +1,335 @@
+# In src/training/packed_dataset.py
+
+from collections import OrderedDict
+from pathlib import Path
+import math
+import os
+import threading
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+
+from ultralytics.data import YOLODataset
+from ultralytics.data.build import InfiniteDataLoader, seed_worker
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils.torch_utils import torch_distributed_zero_first
+
+from sharded_dataset import buffer_loaded_image, build_custom_yolo_dataset, de_parallel, resize_to_imgsz
+
+# Must match PACKED_INDEX_VERSION in src/data_processing/pack_split_shards.py
+PACKED_INDEX_VERSION = 1
+PACKED_INDEX_NAME = "shards.npz"
+
+
+def is_packed_split(img_path) -> bool:
+    """True if a YAML split entry points at a folder written by pack_split_shards.py."""
+    return isinstance(img_path, (str, Path)) and (Path(img_path) / PACKED_INDEX_NAME).exists()
+
+
+class PackedIndex:
+    """Read-only view of the 'shards.npz' index of one packed split."""
+
+    def __init__(self, packed_dir: Path):
+        self.packed_dir = Path(packed_dir)
+        with np.load(self.packed_dir / PACKED_INDEX_NAME, allow_pickle=False) as data:
+            if int(data["version"]) != PACKED_INDEX_VERSION:
+                raise ValueError(
+                    f"{self.packed_dir} has version {int(data['version'])}, expected {PACKED_INDEX_VERSION}; "
+                    "repack it with pack_split_shards.py"
+                )
+            arrays = {key: data[key] for key in data.files}
+
+        self.shards = [str(name) for name in arrays["shards"]]
+        self.frame_shard = arrays["frame_shard"]
+        self.offsets = arrays["offsets"]
+        self.sizes = arrays["sizes"]
+        self.stems = [str(stem) for stem in arrays["stems"]]
+        self.suffixes = [str(suffix) for suffix in arrays["suffixes"]]
+        self.shapes = arrays["shapes"]
+        self.class_id = arrays["class_id"]
+        self.boxes = arrays["boxes"]
+        self.row_offsets = np.concatenate([[0], np.cumsum(arrays["row_counts"])])
+        self._frame_of_stem = {stem: i for i, stem in enumerate(self.stems)}
+
+    def __len__(self) -> int:
+        return len(self.stems)
+
+    def lookup(self, im_file: str) -> int:
+        return self._frame_of_stem[Path(im_file).stem]
+
+    def labels(self, frame_id: int):
+        """(class ids, normalized xywh boxes) of one frame."""
+        start, end = self.row_offsets[frame_id], self.row_offsets[frame_id + 1]
+        return self.class_id[start:end], self.boxes[start:end]
+
+
+class ShardBlockReader:
+    """
+    Serves image bytes out of the tar shards with large sequential reads. Each
+    shard is read in `block_size`-aligned blocks and the most recently used
+    `max_blocks` blocks stay in memory, so every block is read once as long as
+    the cache spans the frames a stream may still ask for (one shuffle buffer,
+    see ShardStreamSampler). File handles and blocks are per process, and reads
+    are serialised within one (the RAM cache loads images from a thread pool).
+    """
+
+    def __init__(self, packed_dir: Path, shards, block_size: int = 64 * 1024 * 1024, max_blocks: int = 2):
+        self.packed_dir = Path(packed_dir)
+        self.shards = shards
+        self.block_size = block_size
+        self.max_blocks = max(max_blocks, 2)
+        self._files = {}
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Open files are not sent to worker processes; each worker opens its own
+        state = {**self.__dict__, "_files": {}, "_blocks": OrderedDict()}
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def read(self, shard: int, offset: int, size: int) -> bytes:
+        with self._lock:
+            first, last = offset // self.block_size, (offset + size - 1) // self.block_size
+            data = b"".join(self._block(shard, k) for k in range(first, last + 1))
+            start = offset - first * self.block_size
+            return data[start : start + size]
+
+    def _block(self, shard: int, k: int) -> bytes:
+        block = self._blocks.get((shard, k))
+        if block is not None:
+            self._blocks.move_to_end((shard, k))
+            return block
+
+        f = self._files.get(shard)
+        if f is None:
+            f = self._files[shard] = open(self.packed_dir / self.shards[shard], "rb")
+        f.seek(k * self.block_size)
+        block = self._blocks[(shard, k)] = f.read(self.block_size)
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+
+class PackedYOLODataset(YOLODataset):
+    """
+    YOLODataset over a packed split: image paths and labels come from the
+    shard index, pixels are decoded from the shard bytes. Augmentation and
+    letterboxing are unchanged.
+    """
+
+    def __init__(self, *args, block_size_mb: int = 64, stream_frames: int = 0, **kwargs):
+        if kwargs.get("cache") == "disk":
+            raise ValueError("cache='disk' writes .npy files next to the images; use cache='ram' or no cache")
+        self.block_size = block_size_mb * 1024 * 1024
+        self.stream_frames = stream_frames
+        super().__init__(*args, **kwargs)
+
+    def get_img_files(self, img_path):
+        self.packed_index = PackedIndex(img_path)
+        # Enough blocks to hold `stream_frames` consecutive frames of the shard
+        # with the largest frames, plus the partial blocks at the run's ends
+        packed_dir = self.packed_index.packed_dir
+        shard_bytes = np.array([(packed_dir / name).stat().st_size for name in self.packed_index.shards])
+        shard_frames = np.bincount(self.packed_index.frame_shard, minlength=len(shard_bytes))
+        frame_bytes = float(np.max(shard_bytes / np.maximum(shard_frames, 1)))
+        max_blocks = math.ceil(self.stream_frames * frame_bytes / self.block_size) + 3
+        self.reader = ShardBlockReader(
+            self.packed_index.packed_dir, self.packed_index.shards, self.block_size, max_blocks=max_blocks
+        )
+        im_files = [
+            str(self.packed_index.packed_dir / f"{stem}{suffix}")
+            for stem, suffix in zip(self.packed_index.stems, self.packed_index.suffixes)
+        ]
+        if self.fraction < 1:
+            im_files = im_files[: round(len(im_files) * self.fraction)]
+        return im_files
+
+    def get_labels(self):
+        labels = []
+        for im_file in self.im_files:
+            frame_id = self.packed_index.lookup(im_file)
+            class_ids, boxes = self.packed_index.labels(frame_id)
+            h, w = self.packed_index.shapes[frame_id]
+            labels.append(
+                {
+                    "im_file": im_file,
+                    "shape": (int(h), int(w)),
+                    "cls": class_ids.astype(np.float32).reshape(-1, 1),
+                    "bboxes": boxes.astype(np.float32).reshape(-1, 4),
+                    "segments": [],
+                    "keypoints": None,
+                    "normalized": True,
+                    "bbox_format": "xywh",
+                }
+            )
+        return labels
+
+    def set_rectangle(self):
+        super().set_rectangle()
+        # argsort is not stable, so frames with equal aspect ratios (all of
+        # them, for one camera) end up in random order; putting ties back in
+        # shard order keeps the batch shapes and makes val reads sequential
+        frame_ids = np.array([self.packed_index.lookup(f) for f in self.im_files])
+        h, w = self.packed_index.shapes[frame_ids].T
+        order = np.lexsort((frame_ids, h / w))
+        self.im_files = [self.im_files[k] for k in order]
+        self.labels = [self.labels[k] for k in order]
+
+    def stream_positions(self):
+        """Shard and byte offset of every frame, for ShardStreamSampler."""
+        frame_ids = np.array([self.packed_index.lookup(f) for f in self.im_files])
+        return self.packed_index.frame_shard[frame_ids], self.packed_index.offsets[frame_ids]
+
+    def load_image(self, i, rect_mode=True):
+        im = self.ims[i]
+        if im is not None:  # already in the RAM cache or the mosaic buffer
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+
+        frame_id = self.packed_index.lookup(self.im_files[i])
+        data = self.reader.read(
+            int(self.packed_index.frame_shard[frame_id]),
+            int(self.packed_index.offsets[frame_id]),
+            int(self.packed_index.sizes[frame_id]),
+        )
+        im = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if im is None:
+            raise FileNotFoundError(f"Could not decode {self.im_files[i]} from its shard")
+        h0, w0 = im.shape[:2]
+        return buffer_loaded_image(self, i, resize_to_imgsz(im, self.imgsz, rect_mode), (h0, w0))
+
+
+class ShardStreamSampler(Sampler):
+    """
+    Orders one epoch the way a streaming loader with shuffle buffers reads a
+    packed split. The shuffled shards are laid end to end and cut into one
+    contiguous run per dataloader worker. Each worker's stream reads its run
+    front to back through a shuffle buffer of `buffer_size` frames (filled,
+    shuffled and drained in turn), so ShardBlockReader holds every block it
+    needs for one buffer and reads it once.
+
+    The DataLoader deals batch k of a pass to worker k % num_workers, and
+    InfiniteDataLoader keeps counting across passes. Every stream is therefore
+    topped up to the same number of whole batches, with frames from its own
+    last buffer, so a pass is a whole number of rounds and each worker only
+    ever reads its own run. An epoch is up to batch_size * num_workers frames
+    longer than the split.
+
+    Args:
+        shard_of (np.ndarray): Shard of every dataset index (or any unit that is
+            cheapest to read front to back, such as a video GOP).
+        offset_of (np.ndarray): Position of every dataset index in its shard.
+        batch_size (int): Batch size of the DataLoader.
+        num_workers (int): Worker processes of the DataLoader.
+        buffer_size (int): Frames in each shuffle buffer.
+        seed (int): Base seed; every epoch uses the next one.
+    """
+
+    def __init__(
+        self, shard_of, offset_of, batch_size: int, num_workers: int, buffer_size: int = 1000, seed: int = 0
+    ):
+        self.shard_of = np.asarray(shard_of)
+        self.offset_of = np.asarray(offset_of)
+        self.batch_size = batch_size
+        self.num_streams = max(num_workers, 1)
+        self.buffer_size = max(buffer_size, 1)
+        self.seed = seed
+        self.epoch = 0
+        # Indices of every shard, in read order
+        by_position = np.lexsort((self.offset_of, self.shard_of))
+        starts = np.flatnonzero(np.diff(self.shard_of[by_position])) + 1
+        self._runs = np.split(by_position, starts)
+
+    def _rounds(self) -> int:
+        return -(-len(self.shard_of) // (self.batch_size * self.num_streams))
+
+    def __len__(self) -> int:
+        return self._rounds() * self.batch_size * self.num_streams
+
+    def _buffered(self, stream, rng):
+        for start in range(0, len(stream), self.buffer_size):
+            yield from rng.permutation(stream[start : start + self.buffer_size])
+
+    def __iter__(self):
+        rng = np.random.default_rng(self.seed + self.epoch)
+        self.epoch += 1
+
+        order = np.concatenate([self._runs[k] for k in rng.permutation(len(self._runs))])
+
+        per_stream = self._rounds() * self.batch_size
+        bounds = np.linspace(0, len(order), self.num_streams + 1).round().astype(int)
+        batches = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            stream = np.fromiter(self._buffered(order[start:end], rng), dtype=np.int64, count=end - start)
+            tail = stream[-self.buffer_size :] if len(stream) else order
+            stream = np.concatenate([stream, rng.choice(tail, per_stream - len(stream))])
+            batches.append(stream.reshape(-1, self.batch_size))
+
+        for round_batches in zip(*batches):
+            for batch in round_batches:
+                yield from batch.tolist()
+
+
+def stream_dataloader(dataset, batch_size: int, args, shuffle_buffer: int):
+    """
+    The training InfiniteDataLoader of Ultralytics, ordered by a
+    ShardStreamSampler over `dataset.stream_positions()`.
+    """
+    batch = min(batch_size, len(dataset))
+    workers = min(os.cpu_count() // max(torch.cuda.device_count(), 1), args.workers)
+    sampler = ShardStreamSampler(*dataset.stream_positions(), batch, workers, buffer_size=shuffle_buffer, seed=args.seed)
+    generator = torch.Generator()
+    generator.manual_seed(args.seed)
+    return InfiniteDataLoader(
+        dataset=dataset,
+        batch_size=batch,
+        shuffle=False,
+        num_workers=workers,
+        sampler=sampler,
+        pin_memory=torch.cuda.device_count() > 0,
+        collate_fn=getattr(dataset, "collate_fn", None),
+        worker_init_fn=seed_worker,
+        generator=generator,
+    )
+
+
+def packed_trainer(shuffle_buffer: int = 1000, block_size_mb: int = 64):
+    """
+    Returns a DetectionTrainer class that trains from a dataset YAML whose
+    splits may point at packed shard folders ('packed/<split>') or at the
+    loose files. Packed training splits are read through ShardStreamSampler.
+    Pass it to model.train(trainer=...).
+    """
+
+    class PackedDetectionTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode="train", batch=None):
+            if not is_packed_split(img_path):
+                return super().build_dataset(img_path, mode, batch)
+            gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+            return build_custom_yolo_dataset(
+                PackedYOLODataset,
+                self.args,
+                img_path,
+                batch,
+                self.data,
+                mode=mode,
+                rect=mode == "val",
+                stride=gs,
+                block_size_mb=block_size_mb,
+                stream_frames=shuffle_buffer if mode == "train" else 0,
+            )
+
+        def get_dataloader(self, dataset_path, batch_size=16, rank=0, mode="train"):
+            # Validation, rect training and multi-GPU training keep Ultralytics' samplers
+            if mode != "train" or self.args.rect or rank != -1 or not is_packed_split(dataset_path):
+                return super().get_dataloader(dataset_path, batch_size, rank, mode)
+            with torch_distributed_zero_first(rank):
+                dataset = self.build_dataset(dataset_path, mode, batch_size)
+            return stream_dataloader(dataset, batch_size, self.args, shuffle_buffer)
+
+    return PackedDetectionTrainer
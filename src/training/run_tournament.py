@@ -5,24 +5,75 @@ from pathlib import Path
 import argparse
 import torch
 
-def run_training_for_model(model_variant: str): 
+from packed_dataset import packed_trainer
+from sharded_dataset import default_shard_index, sharded_trainer
+from video_frame_dataset import default_frame_index, video_trainer
+
+# Settings every tournament run shares, so the variants are compared fairly
+TOURNAMENT_EPOCHS = 50
+TOURNAMENT_TRAIN_ARGS = {'batch': 8, 'imgsz': 640}
+TOURNAMENT_VARIANTS = ['n', 's', 'm', 'l', 'x']
+
+def tournament_run_name(model_variant: str) -> str:
+    """Run folder name under runs/tournament; run_tournament_finale.py looks for the same names."""
+    return f'yolov8{model_variant}_{TOURNAMENT_EPOCHS}epochs'
+
+def resolve_data_source(project_root: Path, use_shards: bool = False, use_video_frames: bool = False, use_packed: bool = False):
+    """
+    Picks the dataset YAML and the trainer class for one of the data loaders.
+
+    Returns:
+        tuple[Path, type]: The dataset YAML and the DetectionTrainer class to pass
+            to model.train (None keeps the stock PNG dataloader), or None if a
+            required file is missing.
+    """
+    data_yaml_path = project_root / 'data' / 'final_dataset' / 'final_dataset.yaml'
+    if use_video_frames:
+        data_yaml_path = project_root / 'data' / 'final_video_dataset' / 'final_video_dataset.yaml'
+    elif use_packed:
+        data_yaml_path = project_root / 'data' / 'final_dataset' / 'final_dataset_packed.yaml'
+
+    if not data_yaml_path.exists():
+        print(f"❌ ERROR: Dataset YAML file not found at {data_yaml_path}")
+        return None
+
+    trainer = None
+    if use_shards:
+        shard_index_path = default_shard_index(data_yaml_path, imgsz=TOURNAMENT_TRAIN_ARGS['imgsz'])
+        if not shard_index_path.exists():
+            print(f"❌ ERROR: Shard index not found at {shard_index_path}")
+            print("       Please run 'build_image_shards.py --dataset final_dataset' first.")
+            return None
+        trainer = sharded_trainer(shard_index_path)
+    elif use_video_frames:
+        trainer = video_trainer(default_frame_index(data_yaml_path))
+    elif use_packed:
+        trainer = packed_trainer()
+    return data_yaml_path, trainer
+
+def run_training_for_model(model_variant: str, use_shards: bool = False, use_video_frames: bool = False, use_packed: bool = False): 
     """
     Trains a specific YOLOv8 model variant on our final_dataset.
 
     Args:
         model_variant (str): The YOLOv8 variant to train (e.g., 'n', 's', 'm', 'l', 'x').
+        use_shards (bool): Read pre-decoded frames from build_image_shards.py output.
+        use_video_frames (bool): Train on the create_video_split.py split, decoding
+            frames from the source videos instead of reading PNGs.
+        use_packed (bool): Train from the pack_split_shards.py YAML, reading packed
+            splits sequentially from their tar shards.
     """
     # 1. Configuration
     project_root = Path(__file__).resolve().parent.parent.parent
-    data_yaml_path = project_root / 'data' / 'final_dataset' / 'final_dataset.yaml'
     
     # Check for GPU
     device = 'cuda' if torch.cuda.is_available() else 'cpu'
     print(f"\n--- Starting Tournament Round for YOLOv8{model_variant} on {device} ---")
     
-    if not data_yaml_path.exists():
-        print(f"❌ ERROR: Dataset YAML file not found at {data_yaml_path}")
+    data_source = resolve_data_source(project_root, use_shards, use_video_frames, use_packed)
+    if data_source is None:
         return
+    data_yaml_path, trainer = data_source
 
     # 2. Initialize the specified YOLOv8 model
     # The model name is constructed like 'yolov8n.pt', 'yolov8s.pt', etc.
@@ -34,12 +85,12 @@ def run_training_for_model(model_variant: str):
     # We use consistent settings for a fair comparison.
     model.train(
         data=str(data_yaml_path),
-        epochs=50,                  
-        batch=8,                    
-        imgsz=640,
+        epochs=TOURNAMENT_EPOCHS,
+        **TOURNAMENT_TRAIN_ARGS,
         project=str(project_root / 'runs' / 'tournament'),
-        name=f'yolov8{model_variant}_50epochs', 
+        name=tournament_run_name(model_variant), 
         exist_ok=True,              # Allows re-running the same experiment
+        trainer=trainer,            # None keeps the stock PNG dataloader
     )
     
     print(f"\n✅ Tournament round for YOLOv8{model_variant} complete!")
@@ -51,9 +102,26 @@ if __name__ == '__main__':
         '--variant', 
         type=str, 
         required=True, 
-        choices=['n', 's', 'm', 'l', 'x'],
+        choices=TOURNAMENT_VARIANTS,
         help="The YOLOv8 model variant to train (n, s, m, l, or x)."
     )
+    # Each replaces the PNG dataloader, so only one can be used at a time
+    data_source = parser.add_mutually_exclusive_group()
+    data_source.add_argument(
+        '--shards',
+        action='store_true',
+        help="Read frames from the memory-mapped shards built by build_image_shards.py."
+    )
+    data_source.add_argument(
+        '--video-frames',
+        action='store_true',
+        help="Decode frames from the source videos (split built by create_video_split.py)."
+    )
+    data_source.add_argument(
+        '--packed',
+        action='store_true',
+        help="Read packed splits from the tar shards built by pack_split_shards.py."
+    )
     
     args = parser.parse_args()
     
@@ -62,4 +130,4 @@ if __name__ == '__main__':
     except ImportError:
         print("Please install ultralytics: pip install ultralytics")
     else:
-        run_training_for_model(model_variant=args.variant)
\ No newline at end of file
+        run_training_for_model(model_variant=args.variant, use_shards=args.shards, use_video_frames=args.video_frames, use_packed=args.packed)
\ No newline at end of file
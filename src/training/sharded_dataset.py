@@ -0,0 +1,164 @@
+# In src/training/sharded_dataset.py
+
+from pathlib import Path
+import json
+import math
+import cv2
+import numpy as np
+
+from ultralytics.data import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils import colorstr
+try:
+    from ultralytics.utils.torch_utils import unwrap_model as de_parallel
+except ImportError:  # Ultralytics releases before unwrap_model replaced de_parallel
+    from ultralytics.utils.torch_utils import de_parallel
+
+# Must match SHARD_INDEX_VERSION in src/data_processing/build_image_shards.py
+SHARD_INDEX_VERSION = 1
+
+
+def default_shard_index(data_yaml_path: Path, imgsz: int) -> Path:
+    """Where build_image_shards.py writes the index for a dataset YAML."""
+    return Path(data_yaml_path).parent / f"shards_{imgsz}" / "shard_index.json"
+
+
+def resize_to_imgsz(im: np.ndarray, imgsz: int, rect_mode: bool = True) -> np.ndarray:
+    """The resize of BaseDataset.load_image: long side to `imgsz`, or a square stretch without rect_mode."""
+    h0, w0 = im.shape[:2]
+    if rect_mode:
+        r = imgsz / max(h0, w0)
+        if r != 1:
+            w, h = (min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz))
+            im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+    elif not (h0 == w0 == imgsz):
+        im = cv2.resize(im, (imgsz, imgsz), interpolation=cv2.INTER_LINEAR)
+    return im
+
+
+def buffer_loaded_image(dataset, i: int, im: np.ndarray, hw0):
+    """
+    The buffer bookkeeping of BaseDataset.load_image, so mosaic works
+    unchanged for datasets that supply their own pixels. Returns what
+    load_image() returns.
+    """
+    if dataset.augment:
+        dataset.ims[i], dataset.im_hw0[i], dataset.im_hw[i] = im, hw0, im.shape[:2]
+        dataset.buffer.append(i)
+        if len(dataset.buffer) >= dataset.max_buffer_length:
+            j = dataset.buffer.pop(0)
+            if dataset.cache != "ram":
+                dataset.ims[j], dataset.im_hw0[j], dataset.im_hw[j] = None, None, None
+    return im, hw0, im.shape[:2]
+
+
+class ShardIndex:
+    """
+    Read-only view of the shards written by build_image_shards.py. Shard files
+    are memory-mapped lazily, so each dataloader worker maps its own copy
+    after it has been forked or spawned.
+    """
+
+    def __init__(self, index_path: Path):
+        self.index_path = Path(index_path)
+        with open(self.index_path, "r") as f:
+            index = json.load(f)
+        if index.get("version") != SHARD_INDEX_VERSION:
+            raise ValueError(
+                f"{self.index_path} has version {index.get('version')}, expected {SHARD_INDEX_VERSION}; "
+                "rebuild it with build_image_shards.py"
+            )
+        self.imgsz = index["imgsz"]
+        self.images = index["images"]
+        self._shards = {}
+
+    def __getstate__(self):
+        # Memory maps are not sent to worker processes; they re-open them
+        return {**self.__dict__, "_shards": {}}
+
+    def lookup(self, im_file: str):
+        return self.images.get(str(Path(im_file).resolve()))
+
+    def read(self, entry: dict) -> np.ndarray:
+        """Copies one frame (resized, not yet letterboxed) out of its shard."""
+        shard = self._shards.get(entry["shard"])
+        if shard is None:
+            shard = np.load(self.index_path.parent / entry["shard"], mmap_mode="r")
+            self._shards[entry["shard"]] = shard
+        h, w = entry["shape"]
+        return np.array(shard[entry["slot"], :h, :w])
+
+
+class ShardedYOLODataset(YOLODataset):
+    """
+    YOLODataset whose load_image() reads pre-decoded frames from the shards
+    instead of decoding the PNG. Labels, augmentation and letterboxing are
+    unchanged; images missing from the index are decoded from disk as usual.
+    """
+
+    def __init__(self, *args, shard_index: ShardIndex, **kwargs):
+        if kwargs.get("imgsz") != shard_index.imgsz:
+            raise ValueError(
+                f"shards in {shard_index.index_path.parent} were built for imgsz={shard_index.imgsz}, "
+                f"but training uses imgsz={kwargs.get('imgsz')}"
+            )
+        self.shard_index = shard_index
+        super().__init__(*args, **kwargs)
+        hits = sum(self.shard_index.lookup(f) is not None for f in self.im_files)
+        print(f"  ♻️ {hits}/{len(self.im_files)} images will be read from shards.")
+
+    def load_image(self, i, rect_mode=True):
+        im = self.ims[i]
+        if im is not None:  # already in the RAM cache or the mosaic buffer
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+
+        entry = self.shard_index.lookup(self.im_files[i])
+        if entry is None or not rect_mode:
+            return super().load_image(i, rect_mode)
+
+        im = self.shard_index.read(entry)
+        return buffer_loaded_image(self, i, im, tuple(entry["orig_shape"]))
+
+
+def build_custom_yolo_dataset(dataset_class, cfg, img_path, batch, data, mode="train", rect=False, stride=32, **extra):
+    """ultralytics.data.build_yolo_dataset, building `dataset_class` (with `extra` kwargs) instead of YOLODataset."""
+    return dataset_class(
+        img_path=img_path,
+        imgsz=cfg.imgsz,
+        batch_size=batch,
+        augment=mode == "train",
+        hyp=cfg,
+        rect=cfg.rect or rect,
+        cache=cfg.cache or None,
+        single_cls=cfg.single_cls or False,
+        stride=int(stride),
+        pad=0.0 if mode == "train" else 0.5,
+        prefix=colorstr(f"{mode}: "),
+        task=cfg.task,
+        classes=cfg.classes,
+        data=data,
+        fraction=cfg.fraction if mode == "train" else 1.0,
+        **extra,
+    )
+
+
+def custom_dataset_trainer(dataset_class, **extra):
+    """
+    Returns a DetectionTrainer class whose train and val dataloaders build
+    `dataset_class(..., **extra)` (the validator reuses the trainer's val
+    dataloader). Pass it to model.train(trainer=...).
+    """
+
+    class CustomDatasetTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode="train", batch=None):
+            gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+            return build_custom_yolo_dataset(
+                dataset_class, self.args, img_path, batch, self.data, mode=mode, rect=mode == "val", stride=gs, **extra
+            )
+
+    return CustomDatasetTrainer
+
+
+def sharded_trainer(index_path: Path):
+    """A DetectionTrainer class that reads frames from the shards in `index_path`."""
+    return custom_dataset_trainer(ShardedYOLODataset, shard_index=ShardIndex(index_path))
@@ -0,0 +1,320 @@
+# In src/training/tournament_scheduler.py
+
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import time
+import pandas as pd
+
+from run_tournament import TOURNAMENT_EPOCHS, TOURNAMENT_VARIANTS, tournament_run_name
+from training_runs import ROUND_CHECKPOINT, completed_epochs, pause_at_epoch, read_val_scores, resume_checkpoint
+
+def _train_round(job: dict) -> dict:
+    """
+    Worker: trains one variant up to the epoch budget of the current round.
+    Every round belongs to the same 50-epoch run (same folder, same learning
+    rate schedule): the first round starts it from the pretrained weights, a
+    later one resumes it, and a callback pauses it once the budget is reached.
+    """
+    import torch
+    from ultralytics import YOLO
+
+    from run_tournament import TOURNAMENT_TRAIN_ARGS, resolve_data_source
+
+    if job.get("threads"):
+        torch.set_num_threads(job["threads"])
+
+    start = time.perf_counter()
+    run_dir = Path(job["project"]) / job["name"]
+    budget = job["epochs"]
+    # Already trained by a scheduler that stopped before saving the result
+    if completed_epochs(run_dir) >= budget:
+        return {**read_val_scores(run_dir, budget), "seconds": 0.0}
+
+    data_source = resolve_data_source(Path(job["project_root"]), **job["data_source"])
+    if data_source is None:
+        raise FileNotFoundError("the dataset files of the selected data source are missing")
+    data_yaml_path, trainer = data_source
+
+    checkpoint = resume_checkpoint(run_dir)
+    if checkpoint is None and run_dir.exists():
+        shutil.rmtree(run_dir)  # a partial run without a checkpoint would mix up results.csv
+
+    model = YOLO(str(checkpoint) if checkpoint else f"yolov8{job['variant']}.pt")
+    if budget < TOURNAMENT_EPOCHS:
+        pause_at_epoch(model, budget)
+
+    if checkpoint is not None:
+        print(f"  ♻️ Resuming YOLOv8{job['variant']} from {checkpoint}")
+        model.train(resume=True, device=job["device"], trainer=trainer)
+    else:
+        model.train(
+            data=str(data_yaml_path),
+            epochs=TOURNAMENT_EPOCHS,
+            **TOURNAMENT_TRAIN_ARGS,
+            device=job["device"],
+            workers=job["dataloader_workers"],
+            project=job["project"],
+            name=job["name"],
+            exist_ok=True,
+            trainer=trainer,
+        )
+    return {**read_val_scores(run_dir, budget), "seconds": time.perf_counter() - start}
+
+
+class TournamentState:
+    """
+    Progress of a successive-halving tournament, kept in a JSON file next to
+    the runs: the settings, the rounds already closed by a pruning step, and
+    for every variant its status ('active', 'pruned' or 'finished') and its
+    validation scores after each round. Rerunning the scheduler continues
+    from it; the settings must match.
+    """
+
+    def __init__(self, state_path: Path, settings: dict):
+        self.state_path = state_path
+        if state_path.exists():
+            with open(state_path, "r") as f:
+                self.data = json.load(f)
+            if self.data["settings"] != settings:
+                raise ValueError(
+                    f"{state_path} belongs to a tournament with different settings: {self.data['settings']}; "
+                    "rerun with the same settings or delete it to start over"
+                )
+        else:
+            variants = {v: {"status": "active", "rounds": {}} for v in settings["variants"]}
+            self.data = {"settings": settings, "closed_rounds": [], "variants": variants}
+            self.save()
+
+    def save(self):
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2)
+        tmp_path.replace(self.state_path)
+
+    def with_status(self, status: str) -> list:
+        return [v for v, info in self.data["variants"].items() if info["status"] == status]
+
+    def scores(self, variant: str, budget: int):
+        return self.data["variants"][variant]["rounds"].get(str(budget))
+
+    def record(self, variant: str, budget: int, scores: dict):
+        self.data["variants"][variant]["rounds"][str(budget)] = scores
+        self.save()
+
+    def is_closed(self, budget: int) -> bool:
+        return budget in self.data["closed_rounds"]
+
+    def close_round(self, budget: int, variants, status: str = "pruned"):
+        """Marks a round as decided and gives `variants` (the pruned ones, or the finalists) their new status."""
+        for variant in variants:
+            self.data["variants"][variant]["status"] = status
+            self.data["variants"][variant]["decided_at"] = budget
+        self.data["closed_rounds"].append(budget)
+        self.save()
+
+    def summary(self) -> pd.DataFrame:
+        rows = []
+        for variant, info in self.data["variants"].items():
+            row = {"Model": f"YOLOv8{variant}", "Status": info["status"]}
+            for budget in self.data["settings"]["rounds"]:
+                scores = info["rounds"].get(str(budget))
+                row[f"Fitness @{budget}"] = scores["fitness"] if scores else None
+            rows.append(row)
+        return pd.DataFrame(rows).set_index("Model")
+
+
+def _retire_run(tournament_dir: Path, variant: str, epochs: int):
+    """Moves a pruned run out of the tournament layout, so the finale only compares fully trained models."""
+    run_dir = tournament_dir / tournament_run_name(variant)
+    if not run_dir.exists():
+        return
+    retired_dir = tournament_dir / "pruned" / f"yolov8{variant}_{epochs}epochs"
+    if retired_dir.exists():
+        shutil.rmtree(retired_dir)
+    retired_dir.parent.mkdir(parents=True, exist_ok=True)
+    (run_dir / "weights" / ROUND_CHECKPOINT).unlink(missing_ok=True)
+    run_dir.rename(retired_dir)
+
+
+def run_tournament_schedule(
+    rounds,
+    eta: int,
+    workers: int,
+    devices,
+    dataloader_workers: int,
+    data_source: dict,
+):
+    """
+    Runs the whole YOLOv8 tournament with successive halving. All variants
+    are queued and trained in parallel worker processes; after each round's
+    epoch budget their validation fitness is compared and only the top 1/eta
+    carry on, so only the finalists are trained for the full 50 epochs.
+
+    Every variant trains one continuous 50-epoch run in
+    'runs/tournament/yolov8{v}_50epochs' (the run_tournament.py settings and
+    layout that run_tournament_finale.py reads); rounds only pause it. Pruned
+    runs are moved to 'runs/tournament/pruned/'. Progress is saved after every
+    finished round of every variant, so rerunning resumes the tournament.
+
+    Args:
+        rounds (list[int]): Epoch budgets of the pruning rounds; the last round
+            is always the full 50 epochs.
+        eta (int): Keep the best ceil(n / eta) variants after each round.
+        workers (int): Variants trained at the same time.
+        devices (list[str]): Devices the workers are spread over (e.g. ['0', '1'] or ['cpu']).
+        dataloader_workers (int): Dataloader processes of each run.
+        data_source (dict): use_shards / use_video_frames / use_packed flags of
+            run_tournament.resolve_data_source.
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    tournament_dir = project_root / "runs" / "tournament"
+    tournament_dir.mkdir(parents=True, exist_ok=True)
+
+    rounds = sorted({r for r in rounds if 0 < r < TOURNAMENT_EPOCHS} | {TOURNAMENT_EPOCHS})
+    settings = {"rounds": rounds, "eta": eta, "variants": TOURNAMENT_VARIANTS, "data_source": data_source}
+    state = TournamentState(tournament_dir / "tournament_state.json", settings)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"--- Successive-halving tournament: rounds at {rounds} epochs, eta={eta}, {workers} parallel runs ---")
+
+    # Finish moving runs pruned just before an interruption
+    for variant in state.with_status("pruned"):
+        _retire_run(tournament_dir, variant, state.data["variants"][variant]["decided_at"])
+
+    def make_job(variant: str, budget: int, slot: int) -> dict:
+        return {
+            "variant": variant,
+            "epochs": budget,
+            "slot": slot,
+            "device": devices[slot % len(devices)],
+            "dataloader_workers": dataloader_workers,
+            "threads": threads,
+            "project_root": str(project_root),
+            "data_source": data_source,
+            "project": str(tournament_dir),
+            "name": tournament_run_name(variant),
+        }
+
+    # 2. Train every remaining variant up to each round's budget, then prune
+    context = multiprocessing.get_context("spawn")
+    for budget in rounds:
+        contenders = state.with_status("active")
+        if not contenders:
+            break
+        if state.is_closed(budget):
+            continue
+        queue = [v for v in contenders if state.scores(v, budget) is None]
+        if queue:
+            print(f"\n--- Round to {budget} epochs: {', '.join(f'YOLOv8{v}' for v in queue)} ---")
+
+        failed = []
+        running = {}
+        free_slots = list(range(min(workers, len(queue))))
+        with ProcessPoolExecutor(max_workers=max(len(free_slots), 1), mp_context=context) as pool:
+            while queue or running:
+                while queue and free_slots:
+                    job = make_job(queue.pop(0), budget, free_slots.pop())
+                    running[pool.submit(_train_round, job)] = job
+                    print(f"  ▶ YOLOv8{job['variant']}: training to epoch {budget} on device {job['device']}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    free_slots.append(job["slot"])
+                    try:
+                        scores = future.result()
+                    except Exception as e:
+                        failed.append(job["variant"])
+                        print(f"  ❌ YOLOv8{job['variant']} failed in the round to {budget} epochs: {e}")
+                        continue
+                    state.record(job["variant"], budget, scores)
+                    print(
+                        f"  ✅ YOLOv8{job['variant']} at {budget} epochs: "
+                        f"val fitness {scores['fitness']:.4f}, mAP50 {scores['map50']:.4f}"
+                    )
+
+        # Variants are only compared once all of them have reached the budget
+        if failed:
+            print(f"\n❌ The round to {budget} epochs is incomplete. Fix the error and rerun to resume it.")
+            return
+        if budget == TOURNAMENT_EPOCHS:
+            state.close_round(budget, contenders, status="finished")
+            for variant in contenders:
+                (tournament_dir / tournament_run_name(variant) / "weights" / ROUND_CHECKPOINT).unlink(missing_ok=True)
+            break
+
+        ranked = sorted(contenders, key=lambda v: state.scores(v, budget)["fitness"], reverse=True)
+        keep = max(1, math.ceil(len(ranked) / eta))
+        pruned = ranked[keep:]
+        state.close_round(budget, pruned)
+        for variant in pruned:
+            _retire_run(tournament_dir, variant, budget)
+        if pruned:
+            print(f"  ✂️ Pruned after {budget} epochs: {', '.join(f'YOLOv8{v}' for v in pruned)}")
+
+    # 3. Report
+    summary = state.summary()
+    summary.to_csv(tournament_dir / "tournament_schedule.csv")
+    print("\n--- Tournament Schedule Summary (val fitness per round) ---")
+    print(summary.round(4).to_string())
+    finished = state.with_status("finished")
+    if finished:
+        print(f"\n✅ Finalists trained for {TOURNAMENT_EPOCHS} epochs: {', '.join(f'YOLOv8{v}' for v in finished)}")
+        print("   Compare them on the test split with run_tournament_finale.py.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Train all YOLOv8 tournament variants in parallel, pruning the weakest after each round."
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        nargs="+",
+        default=[10, 25],
+        help=f"Epoch budgets after which the weakest variants are pruned ({TOURNAMENT_EPOCHS} is always last).",
+    )
+    parser.add_argument("--eta", type=int, default=2, help="Keep the best 1/eta of the variants after each round.")
+    parser.add_argument("--workers", type=int, default=None, help="Variants trained in parallel (default: one per device).")
+    parser.add_argument(
+        "--devices",
+        type=str,
+        default=None,
+        help="Comma-separated devices for the workers, e.g. '0,1' or 'cpu' (default: every GPU, else cpu).",
+    )
+    parser.add_argument("--dataloader-workers", type=int, default=4, help="Dataloader processes per run.")
+    # Each replaces the PNG dataloader, so only one can be used at a time
+    data_source = parser.add_mutually_exclusive_group()
+    data_source.add_argument(
+        "--shards", action="store_true", help="Read frames from the memory-mapped shards built by build_image_shards.py."
+    )
+    data_source.add_argument(
+        "--video-frames",
+        action="store_true",
+        help="Decode frames from the source videos (split built by create_video_split.py).",
+    )
+    data_source.add_argument(
+        "--packed", action="store_true", help="Read packed splits from the tar shards built by pack_split_shards.py."
+    )
+
+    args = parser.parse_args()
+    if args.devices is None:
+        import torch
+
+        gpus = torch.cuda.device_count()
+        args.devices = ",".join(str(i) for i in range(gpus)) if gpus else "cpu"
+    devices = args.devices.split(",")
+    run_tournament_schedule(
+        rounds=args.rounds,
+        eta=args.eta,
+        workers=args.workers or len(devices),
+        devices=devices,
+        dataloader_workers=args.dataloader_workers,
+        data_source={"use_shards": args.shards, "use_video_frames": args.video_frames, "use_packed": args.packed},
+    )
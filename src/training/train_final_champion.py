@@ -3,21 +3,53 @@
 
 from ultralytics import YOLO
 from pathlib import Path
+import argparse
 
-def run_final_training():
+from packed_dataset import packed_trainer
+from sharded_dataset import default_shard_index, sharded_trainer
+from video_frame_dataset import default_frame_index, video_trainer
+
+def run_final_training(use_shards: bool = False, use_video_frames: bool = False, use_packed: bool = False, use_dedup: bool = False):
     """
     This is the definitive training run. It uses the champion model (YOLOv8l),
     the final dataset, and the optimal hyperparameters discovered by the
     'tune_champion_fast' process.
+
+    Args:
+        use_shards (bool): Read pre-decoded frames from build_image_shards.py output.
+        use_video_frames (bool): Train on the create_video_split.py split, decoding
+            frames from the source videos instead of reading PNGs.
+        use_packed (bool): Train from the pack_split_shards.py YAML, reading packed
+            splits sequentially from their tar shards.
+        use_dedup (bool): Train on the near-duplicate-free training set built by
+            create_dedup_split.py (combines with --shards and --packed).
     """
     # 1. Configuration
     project_root = Path(__file__).resolve().parent.parent.parent
-    data_yaml_path = project_root / 'data' / 'final_dataset' / 'final_dataset.yaml'
+    dataset_name = 'final_dataset_dedup' if use_dedup else 'final_dataset'
+    data_yaml_path = project_root / 'data' / dataset_name / f'{dataset_name}.yaml'
+    if use_video_frames:
+        data_yaml_path = project_root / 'data' / 'final_video_dataset' / 'final_video_dataset.yaml'
+    elif use_packed:
+        data_yaml_path = project_root / 'data' / dataset_name / f'{dataset_name}_packed.yaml'
     
     if not data_yaml_path.exists():
         print(f"❌ ERROR: Dataset YAML file not found at {data_yaml_path}")
         return
 
+    trainer = None
+    if use_shards:
+        shard_index_path = default_shard_index(data_yaml_path, imgsz=640)
+        if not shard_index_path.exists():
+            print(f"❌ ERROR: Shard index not found at {shard_index_path}")
+            print(f"       Please run 'build_image_shards.py --dataset {dataset_name}' first.")
+            return
+        trainer = sharded_trainer(shard_index_path)
+    elif use_video_frames:
+        trainer = video_trainer(default_frame_index(data_yaml_path))
+    elif use_packed:
+        trainer = packed_trainer()
+
     # 2. Initialize the Champion Model
     model = YOLO('yolov8l.pt')
 
@@ -60,11 +92,41 @@ def run_final_training():
         flipud=0.11835,
         fliplr=0.54214,
         mosaic=0.91929,
-        mixup=0.1233
+        mixup=0.1233,
+
+        # --- Data loading ---
+        trainer=trainer,            # None keeps the stock PNG dataloader
     )
     
     print("\n✅ Final training complete!")
     print(f"Your definitive model is saved in the 'runs/training/yolov8l_final_champion_run' folder.")
 
 if __name__ == '__main__':
-    run_final_training()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the final optimized training of the champion model.")
+    # Each replaces the PNG dataloader, so only one can be used at a time
+    data_source = parser.add_mutually_exclusive_group()
+    data_source.add_argument(
+        '--shards',
+        action='store_true',
+        help="Read frames from the memory-mapped shards built by build_image_shards.py."
+    )
+    data_source.add_argument(
+        '--video-frames',
+        action='store_true',
+        help="Decode frames from the source videos (split built by create_video_split.py)."
+    )
+    data_source.add_argument(
+        '--packed',
+        action='store_true',
+        help="Read packed splits from the tar shards built by pack_split_shards.py."
+    )
+    parser.add_argument(
+        '--dedup',
+        action='store_true',
+        help="Train on the deduplicated training set built by create_dedup_split.py."
+    )
+
+    args = parser.parse_args()
+    if args.dedup and args.video_frames:
+        parser.error("--dedup cannot be combined with --video-frames (the video split has its own frame lists)")
+    run_final_training(use_shards=args.shards, use_video_frames=args.video_frames, use_packed=args.packed, use_dedup=args.dedup)
\ No newline at end of file
@@ -2,22 +2,44 @@
 
 from ultralytics import YOLO
 from pathlib import Path
+import argparse
 
-def train_balanced_model():
+from packed_dataset import packed_trainer
+from sharded_dataset import default_shard_index, sharded_trainer
+
+def train_balanced_model(use_shards: bool = False, use_packed: bool = False):
     """
     Trains the champion model (YOLOv8l) on the new, balanced dataset,
     using strong augmentation including copy-paste to further address
     class imbalance.
+
+    Args:
+        use_shards (bool): Read pre-decoded frames from build_image_shards.py output.
+        use_packed (bool): Train from the pack_split_shards.py YAML, reading packed
+            splits sequentially from their tar shards.
     """
     # 1. Configuration
     project_root = Path(__file__).resolve().parent.parent.parent
     data_yaml_path = project_root / 'data' / 'balanced_dataset' / 'balanced_dataset.yaml'
+    if use_packed:
+        data_yaml_path = project_root / 'data' / 'balanced_dataset' / 'balanced_dataset_packed.yaml'
     
     if not data_yaml_path.exists():
         print(f"❌ ERROR: Balanced dataset YAML not found at {data_yaml_path}")
         print("       Please run 'create_balanced_split.py' first.")
         return
 
+    trainer = None
+    if use_shards:
+        shard_index_path = default_shard_index(data_yaml_path, imgsz=640)
+        if not shard_index_path.exists():
+            print(f"❌ ERROR: Shard index not found at {shard_index_path}")
+            print("       Please run 'build_image_shards.py --dataset balanced_dataset' first.")
+            return
+        trainer = sharded_trainer(shard_index_path)
+    elif use_packed:
+        trainer = packed_trainer()
+
     # 2. Initialize the champion model
     model = YOLO('yolov8l.pt')
 
@@ -46,9 +68,25 @@ def train_balanced_model():
         hsv_s=0.7,
         hsv_v=0.4,
         fliplr=0.5,
+        trainer=trainer,  # None keeps the stock PNG dataloader
     )
     
     print("\n✅ Training on balanced data complete!")
 
 if __name__ == '__main__':
-    train_balanced_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the champion model on the balanced dataset.")
+    # Each replaces the PNG dataloader, so only one can be used at a time
+    data_source = parser.add_mutually_exclusive_group()
+    data_source.add_argument(
+        '--shards',
+        action='store_true',
+        help="Read frames from the memory-mapped shards built by build_image_shards.py."
+    )
+    data_source.add_argument(
+        '--packed',
+        action='store_true',
+        help="Read packed splits from the tar shards built by pack_split_shards.py."
+    )
+
+    args = parser.parse_args()
+    train_balanced_model(use_shards=args.shards, use_packed=args.packed)
\ No newline at end of file
@@ -0,0 +1,69 @@
+# In src/training/training_runs.py
+
+from pathlib import Path
+import shutil
+import pandas as pd
+
+
+def read_val_scores(run_dir: Path, epochs: int = None) -> dict:
+    """
+    Best validation scores of a training run from its results.csv (of its
+    first `epochs` epochs, if given), with the fitness Ultralytics uses to
+    pick best.pt (0.1 * mAP50 + 0.9 * mAP50-95).
+    """
+    df = pd.read_csv(run_dir / "results.csv")
+    df.columns = [c.strip() for c in df.columns]
+    if epochs is not None:
+        df = df.iloc[:epochs]
+    fitness = 0.1 * df["metrics/mAP50(B)"] + 0.9 * df["metrics/mAP50-95(B)"]
+    best = fitness.idxmax()
+    return {
+        "fitness": float(fitness[best]),
+        "map50": float(df["metrics/mAP50(B)"][best]),
+        "map50_95": float(df["metrics/mAP50-95(B)"][best]),
+        "epochs": len(df),
+    }
+
+
+# Copy of last.pt taken when a run pauses at an epoch budget: the trainer's
+# final evaluation strips the optimizer from last.pt, which makes it unresumable
+ROUND_CHECKPOINT = "round.pt"
+
+
+def completed_epochs(run_dir: Path) -> int:
+    results_csv = run_dir / "results.csv"
+    return len(pd.read_csv(results_csv)) if results_csv.exists() else 0
+
+
+def resume_checkpoint(run_dir: Path):
+    """The checkpoint an interrupted or paused run continues from, or None if it must start over."""
+    from ultralytics.nn.tasks import torch_safe_load
+
+    # last.pt keeps its optimizer while a round is in progress, so it is the
+    # newer one after a crash; after a clean pause only the round copy is resumable
+    for name in ("last.pt", ROUND_CHECKPOINT):
+        path = run_dir / "weights" / name
+        if path.exists() and torch_safe_load(str(path))[0].get("epoch", -1) >= 0:
+            return path
+    return None
+
+
+def pause_at_epoch(model, epochs: int):
+    """
+    Makes `model.train()` stop after `epochs` epochs of a longer run, keeping
+    a resumable copy of last.pt, so a later resume=True continues the same
+    learning rate schedule.
+
+    The trainer's final_eval() strips last.pt and then fires
+    on_fit_epoch_end once more (with the epoch advanced by one), so the copy
+    is taken only at the budget epoch itself, and only once.
+    """
+    paused = []
+
+    def pause(trainer):
+        if trainer.epoch + 1 == epochs and not paused:
+            shutil.copy2(trainer.last, trainer.last.with_name(ROUND_CHECKPOINT))
+            paused.append(trainer.epoch)
+            trainer.stop = True
+
+    model.add_callback("on_fit_epoch_end", pause)
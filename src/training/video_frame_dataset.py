@@ -0,0 +1,284 @@
+# In src/training/video_frame_dataset.py
+
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+import threading
+import cv2
+import numpy as np
+
+from ultralytics.data import YOLODataset
+from ultralytics.utils.torch_utils import torch_distributed_zero_first
+
+from packed_dataset import stream_dataloader
+from sharded_dataset import buffer_loaded_image, custom_dataset_trainer, resize_to_imgsz
+
+# Must match FRAME_INDEX_VERSION in src/data_processing/create_video_split.py
+FRAME_INDEX_VERSION = 1
+
+
+class FrameIndex:
+    """
+    Read-only view of the frame index written by create_video_split.py: for
+    every frame, its video, frame number and label rows, plus each video's
+    path, size and keyframe positions.
+    """
+
+    def __init__(self, index_path: Path):
+        self.index_path = Path(index_path)
+        with np.load(self.index_path, allow_pickle=False) as data:
+            if int(data["version"]) != FRAME_INDEX_VERSION:
+                raise ValueError(
+                    f"{self.index_path} has version {int(data['version'])}, expected {FRAME_INDEX_VERSION}; "
+                    "rebuild it with create_video_split.py"
+                )
+            arrays = {key: data[key] for key in data.files}
+
+        self.frame_video = arrays["frame_video"]
+        self.frame_number = arrays["frame_number"]
+        self.class_id = arrays["class_id"]
+        self.boxes = arrays["boxes"]
+        self.row_offsets = np.concatenate([[0], np.cumsum(arrays["row_counts"])])
+        self.video_paths = [str(p) for p in arrays["video_paths"]]
+        self.video_shape = arrays["video_shape"]
+        self.video_frame_count = arrays["video_frame_count"]
+        keyframe_offsets = np.concatenate([[0], np.cumsum(arrays["keyframe_counts"])])
+        self.keyframes = [
+            arrays["keyframes"][keyframe_offsets[v] : keyframe_offsets[v + 1]].tolist()
+            for v in range(len(self.video_paths))
+        ]
+        self._frame_of_stem = {str(stem): i for i, stem in enumerate(arrays["stems"])}
+        self._video_frames = [
+            np.sort(self.frame_number[self.frame_video == v]) for v in range(len(self.video_paths))
+        ]
+
+    def lookup(self, im_file: str):
+        """Frame id of an image path from the split lists (matched by file stem), or None."""
+        return self._frame_of_stem.get(Path(im_file).stem)
+
+    def labels(self, frame_id: int):
+        """(class ids, normalized xywh boxes) of one frame."""
+        start, end = self.row_offsets[frame_id], self.row_offsets[frame_id + 1]
+        return self.class_id[start:end], self.boxes[start:end]
+
+    def gop_positions(self, frame_ids):
+        """GOP key (unique across videos) and frame number of each frame id, for ShardStreamSampler."""
+        frame_ids = np.asarray(frame_ids)
+        videos, numbers = self.frame_video[frame_ids], self.frame_number[frame_ids]
+        starts = np.array([self.gop_bounds(int(v), int(n))[0] for v, n in zip(videos, numbers)], dtype=np.int64)
+        return videos.astype(np.int64) * (int(self.video_frame_count.max()) + 1) + starts, numbers
+
+    def gop_bounds(self, video: int, frame: int):
+        """First frame of the GOP holding `frame`, and the first frame of the next one."""
+        keyframes = self.keyframes[video]
+        k = bisect_right(keyframes, frame) - 1
+        end = keyframes[k + 1] if k + 1 < len(keyframes) else int(self.video_frame_count[video])
+        return keyframes[k], end
+
+    def indexed_frames(self, video: int, start: int, end: int) -> np.ndarray:
+        """Sorted frame numbers of `video` in [start, end) that the index knows about."""
+        frames = self._video_frames[video]
+        return frames[np.searchsorted(frames, start) : np.searchsorted(frames, end)]
+
+
+class VideoFrameReader:
+    """
+    Decodes indexed frames straight from the source videos.
+
+    A request seeks to the keyframe that starts the frame's GOP and decodes
+    forward to the last indexed frame of that GOP, keeping only the indexed
+    frames; the decoded GOPs are kept in an LRU cache of at most `cache_mb`,
+    so the other frames of the same GOP cost no extra decoding. This only pays
+    off when a GOP's frames are requested close together, which is what
+    GOP-grouped sampling (ShardStreamSampler over `gop_positions`) does.
+    Captures and the cache are per process, so every dataloader worker has its
+    own; within a process, reads are serialised (the RAM cache loads images
+    from a thread pool).
+
+    Args:
+        frame_index (FrameIndex): The frame index.
+        cache_mb (int): Memory for decoded GOPs, in MB. The GOP being read is
+            always kept, even if it alone is larger.
+    """
+
+    def __init__(self, frame_index: FrameIndex, cache_mb: int = 1024):
+        self.frame_index = frame_index
+        self.cache_bytes = cache_mb * 1024 * 1024
+        self.stats = {"hits": 0, "misses": 0, "seeks": 0}
+        self._captures = {}
+        self._gops = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Video captures cannot be pickled; each worker opens its own
+        state = {**self.__dict__, "_captures": {}, "_gops": OrderedDict(), "_cached_bytes": 0}
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _capture(self, video: int):
+        state = self._captures.get(video)
+        if state is None:
+            cap = cv2.VideoCapture(self.frame_index.video_paths[video])
+            if not cap.isOpened():
+                raise FileNotFoundError(f"Could not open video {self.frame_index.video_paths[video]}")
+            state = self._captures[video] = [cap, 0]  # capture and its next frame number
+        return state
+
+    def _decode_gop(self, video: int, start: int, end: int) -> dict:
+        wanted = self.frame_index.indexed_frames(video, start, end)
+        state = self._capture(video)
+        cap = state[0]
+        # Reading on from the previous GOP needs no seek
+        if state[1] != start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            self.stats["seeks"] += 1
+
+        frames = {}
+        wanted_set = set(wanted.tolist())
+        position = start
+        last = int(wanted[-1]) if len(wanted) else start
+        while position <= last:
+            if position in wanted_set:
+                ok, frame = cap.read()
+                if ok:
+                    frames[position] = frame
+            else:
+                ok = cap.grab()  # decode without the BGR conversion
+            if not ok:
+                position = -1  # force a seek next time
+                break
+            position += 1
+        state[1] = position
+        return frames
+
+    def read(self, video: int, frame: int) -> np.ndarray:
+        """Returns one BGR frame (a copy, safe to modify)."""
+        start, end = self.frame_index.gop_bounds(video, frame)
+        key = (video, start)
+        with self._lock:
+            gop = self._gops.get(key)
+            if gop is None:
+                self.stats["misses"] += 1
+                gop = self._gops[key] = self._decode_gop(video, start, end)
+                self._cached_bytes += sum(im.nbytes for im in gop.values())
+                while self._cached_bytes > self.cache_bytes and len(self._gops) > 1:
+                    _, evicted = self._gops.popitem(last=False)
+                    self._cached_bytes -= sum(im.nbytes for im in evicted.values())
+            else:
+                self.stats["hits"] += 1
+                self._gops.move_to_end(key)
+
+        im = gop.get(frame)
+        if im is None:
+            raise FileNotFoundError(f"Could not decode frame {frame} of {self.frame_index.video_paths[video]}")
+        return im.copy()
+
+    def close(self):
+        for cap, _ in self._captures.values():
+            cap.release()
+        self._captures.clear()
+        self._gops.clear()
+        self._cached_bytes = 0
+
+
+class VideoFrameDataset(YOLODataset):
+    """
+    YOLODataset that takes its labels from the frame index and decodes its
+    images from the source videos, so no PNG or label file is read. The
+    split image lists only name the frames (by stem); augmentation and
+    letterboxing are unchanged.
+    """
+
+    def __init__(self, *args, frame_index: FrameIndex, cache_mb: int = 1024, **kwargs):
+        if kwargs.get("cache") == "disk":
+            raise ValueError("cache='disk' writes .npy files next to the images; use cache='ram' or no cache")
+        self.frame_index = frame_index
+        self.reader = VideoFrameReader(frame_index, cache_mb)
+        super().__init__(*args, **kwargs)
+
+    def get_labels(self):
+        labels, missing = [], 0
+        for im_file in self.im_files:
+            frame_id = self.frame_index.lookup(im_file)
+            if frame_id is None:
+                missing += 1
+                continue
+            class_ids, boxes = self.frame_index.labels(frame_id)
+            h, w = self.frame_index.video_shape[self.frame_index.frame_video[frame_id]]
+            labels.append(
+                {
+                    "im_file": im_file,
+                    "shape": (int(h), int(w)),
+                    "cls": class_ids.astype(np.float32).reshape(-1, 1),
+                    "bboxes": boxes.astype(np.float32).reshape(-1, 4),
+                    "segments": [],
+                    "keypoints": None,
+                    "normalized": True,
+                    "bbox_format": "xywh",
+                }
+            )
+        if missing:
+            print(f"  ⚠️ {missing} listed frames are not in {self.frame_index.index_path.name} and were skipped.")
+        if not labels:
+            raise FileNotFoundError(f"No listed frame was found in {self.frame_index.index_path}")
+        self.im_files = [lb["im_file"] for lb in labels]
+        return labels
+
+    def set_rectangle(self):
+        super().set_rectangle()
+        # argsort is not stable, so frames with equal aspect ratios (all of
+        # them, for one camera) end up in random order; putting ties back in
+        # video order lets val decode each GOP once
+        frame_ids = np.array([self.frame_index.lookup(f) for f in self.im_files])
+        videos, numbers = self.frame_index.frame_video[frame_ids], self.frame_index.frame_number[frame_ids]
+        h, w = self.frame_index.video_shape[videos].T
+        order = np.lexsort((numbers, videos, h / w))
+        self.im_files = [self.im_files[k] for k in order]
+        self.labels = [self.labels[k] for k in order]
+
+    def stream_positions(self):
+        """GOP and frame number of every frame, for ShardStreamSampler."""
+        return self.frame_index.gop_positions([self.frame_index.lookup(f) for f in self.im_files])
+
+    def load_image(self, i, rect_mode=True):
+        im = self.ims[i]
+        if im is not None:  # already in the RAM cache or the mosaic buffer
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+
+        frame_id = self.frame_index.lookup(self.im_files[i])
+        im = self.reader.read(int(self.frame_index.frame_video[frame_id]), int(self.frame_index.frame_number[frame_id]))
+
+        h0, w0 = im.shape[:2]
+        return buffer_loaded_image(self, i, resize_to_imgsz(im, self.imgsz, rect_mode), (h0, w0))
+
+
+def default_frame_index(data_yaml_path: Path) -> Path:
+    """Where create_video_split.py writes the frame index for its YAML."""
+    return Path(data_yaml_path).parent / "frame_index.npz"
+
+
+def video_trainer(index_path: Path, shuffle_buffer: int = 256, cache_mb: int = 1024):
+    """
+    A DetectionTrainer class that decodes frames from the source videos listed
+    in `index_path`. The training split is read GOP by GOP: ShardStreamSampler
+    shuffles the GOPs, deals them out to the dataloader workers and shuffles
+    each worker's frames within buffers of `shuffle_buffer` frames, so
+    `cache_mb` should hold that many decoded frames.
+    """
+    base = custom_dataset_trainer(VideoFrameDataset, frame_index=FrameIndex(index_path), cache_mb=cache_mb)
+
+    class VideoFrameTrainer(base):
+        def get_dataloader(self, dataset_path, batch_size=16, rank=0, mode="train"):
+            # Validation, rect training and multi-GPU training keep Ultralytics' samplers
+            if mode != "train" or self.args.rect or rank != -1:
+                return super().get_dataloader(dataset_path, batch_size, rank, mode)
+            with torch_distributed_zero_first(rank):
+                dataset = self.build_dataset(dataset_path, mode, batch_size)
+            return stream_dataloader(dataset, batch_size, self.args, shuffle_buffer)
+
+    return VideoFrameTrainer
@@ -0,0 +1,424 @@
+# In src/tuning/asha_tune.py
+
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import time
+import pandas as pd
+import yaml
+
+# Like every script in this repository, asha_tune.py runs from a checkout
+# (python src/tuning/asha_tune.py) and imports its helpers from the folders
+# next to it: Python puts the script's own folder on sys.path, and the
+# run-folder helpers it shares with tournament_scheduler.py live in
+# src/training, so that folder is added the same way. The spawned trial
+# workers re-import this module and get the same path.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "training"))
+from training_runs import ROUND_CHECKPOINT, completed_epochs, pause_at_epoch, read_val_scores, resume_checkpoint
+
+# The hyperparameters train_final_champion.py hardcodes, searched over the
+# ranges of Ultralytics' own tuner: (low, high, log-uniform?)
+SEARCH_SPACE = {
+    # Optimizer settings
+    "lr0": (1e-5, 1e-1, True),
+    "lrf": (1e-4, 1e-1, True),
+    "momentum": (0.7, 0.98, False),
+    "weight_decay": (0.0, 0.001, False),
+    "warmup_epochs": (0.0, 5.0, False),
+    # Loss function gains
+    "box": (1.0, 20.0, False),
+    "cls": (0.2, 4.0, False),
+    "dfl": (0.4, 6.0, False),
+    # Augmentation settings
+    "hsv_h": (0.0, 0.1, False),
+    "hsv_s": (0.0, 0.9, False),
+    "hsv_v": (0.0, 0.9, False),
+    "degrees": (0.0, 45.0, False),
+    "translate": (0.0, 0.9, False),
+    "scale": (0.0, 0.95, False),
+    "shear": (0.0, 10.0, False),
+    "flipud": (0.0, 1.0, False),
+    "fliplr": (0.0, 1.0, False),
+    "mosaic": (0.0, 1.0, False),
+    "mixup": (0.0, 1.0, False),
+}
+
+# Settings every trial shares with train_final_champion.py
+FIXED_TRAIN_ARGS = {"optimizer": "AdamW", "batch": 8, "imgsz": 640, "perspective": 0.0, "plots": False}
+
+
+def sample_hyperparameters(rng: random.Random) -> dict:
+    """Draws one configuration from SEARCH_SPACE."""
+    params = {}
+    for name, (low, high, log) in SEARCH_SPACE.items():
+        value = math.exp(rng.uniform(math.log(low), math.log(high))) if log else rng.uniform(low, high)
+        params[name] = round(value, 5)
+    return params
+
+
+def rung_budgets(min_epochs: int, max_epochs: int, eta: int) -> list:
+    """Cumulative epoch budget of every rung: min_epochs * eta^k, capped at max_epochs."""
+    budgets = [min_epochs]
+    while budgets[-1] * eta < max_epochs:
+        budgets.append(budgets[-1] * eta)
+    if budgets[-1] < max_epochs:
+        budgets.append(max_epochs)
+    return budgets
+
+
+class AshaStudy:
+    """
+    State of one ASHA search in a local SQLite database: its settings, its
+    trials and every (trial, rung) training result. Only the scheduler
+    process touches the database, so an interrupted search resumes from it
+    exactly: finished rungs are kept and rungs that were running are started
+    again, continuing from their run's last checkpoint.
+
+    Args:
+        db_path (Path): SQLite file (several studies can share one).
+        name (str): Study name.
+        settings (dict): Rung budgets, eta, seed and data; a resumed study must match
+            them (max_trials may grow, to extend a finished study).
+    """
+
+    def __init__(self, db_path: Path, name: str, settings: dict):
+        self.name = name
+        self.settings = settings
+        self.budgets = settings["budgets"]
+        self.eta = settings["eta"]
+        self.db = sqlite3.connect(str(db_path))
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS studies (name TEXT PRIMARY KEY, settings TEXT, created REAL);
+            CREATE TABLE IF NOT EXISTS trials (
+                study TEXT, trial INTEGER, params TEXT, created REAL, PRIMARY KEY (study, trial));
+            CREATE TABLE IF NOT EXISTS rungs (
+                study TEXT, trial INTEGER, rung INTEGER, epochs INTEGER, status TEXT,
+                fitness REAL, map50 REAL, map50_95 REAL, weights TEXT, seconds REAL, error TEXT,
+                PRIMARY KEY (study, trial, rung));
+            """
+        )
+        row = self.db.execute("SELECT settings FROM studies WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            self.db.execute(
+                "INSERT INTO studies VALUES (?, ?, ?)", (name, json.dumps(settings, sort_keys=True), time.time())
+            )
+        elif json.loads(row[0]) != json.loads(json.dumps(settings, sort_keys=True)):
+            raise ValueError(f"study '{name}' exists with different settings: {row[0]}")
+
+        # Rungs that were running when the last scheduler stopped are started again
+        interrupted = self.db.execute(
+            "DELETE FROM rungs WHERE study = ? AND status = 'running'", (name,)
+        ).rowcount
+        self.db.commit()
+        if interrupted:
+            print(f"  ♻️ Resuming study '{name}': {interrupted} interrupted rung(s) will be resumed.")
+
+    def num_trials(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM trials WHERE study = ?", (self.name,)).fetchone()[0]
+
+    def params(self, trial: int) -> dict:
+        row = self.db.execute(
+            "SELECT params FROM trials WHERE study = ? AND trial = ?", (self.name, trial)
+        ).fetchone()
+        return json.loads(row[0])
+
+    def _promotable(self):
+        """
+        The next (trial, rung) to promote: a trial whose result at rung k is in
+        the top 1/eta of all results at rung k and that has not started rung
+        k + 1 yet. Higher rungs go first, as in ASHA.
+        """
+        for rung in reversed(range(len(self.budgets) - 1)):
+            results = self.db.execute(
+                "SELECT trial, fitness FROM rungs WHERE study = ? AND rung = ? AND status = 'completed' "
+                "ORDER BY fitness DESC",
+                (self.name, rung),
+            ).fetchall()
+            top = results[: len(results) // self.eta]
+            for trial, _ in top:
+                started = self.db.execute(
+                    "SELECT 1 FROM rungs WHERE study = ? AND trial = ? AND rung = ?", (self.name, trial, rung + 1)
+                ).fetchone()
+                if started is None:
+                    return trial, rung + 1
+        return None
+
+    def next_job(self, max_trials: int):
+        """Returns the next (trial, rung) to train, creating a new trial if nothing can be promoted."""
+        promotion = self._promotable()
+        if promotion is not None:
+            return promotion
+        # Trials whose first rung was interrupted start again with the same configuration
+        orphan = self.db.execute(
+            "SELECT trial FROM trials t WHERE study = ? AND NOT EXISTS "
+            "(SELECT 1 FROM rungs r WHERE r.study = t.study AND r.trial = t.trial) ORDER BY trial LIMIT 1",
+            (self.name,),
+        ).fetchone()
+        if orphan is not None:
+            return orphan[0], 0
+        trial = self.num_trials()
+        if trial >= max_trials:
+            return None
+        # Each trial has its own seed, so a resumed study samples the same configurations
+        params = sample_hyperparameters(random.Random(self.settings["seed"] * 100003 + trial))
+        self.db.execute(
+            "INSERT INTO trials VALUES (?, ?, ?, ?)", (self.name, trial, json.dumps(params), time.time())
+        )
+        self.db.commit()
+        return trial, 0
+
+    def start(self, trial: int, rung: int):
+        self.db.execute(
+            "INSERT INTO rungs (study, trial, rung, epochs, status) VALUES (?, ?, ?, ?, 'running')",
+            (self.name, trial, rung, self.budgets[rung]),
+        )
+        self.db.commit()
+
+    def finish(self, trial: int, rung: int, result: dict = None, error: str = None):
+        if result is None:
+            self.db.execute(
+                "UPDATE rungs SET status = 'failed', error = ? WHERE study = ? AND trial = ? AND rung = ?",
+                (error, self.name, trial, rung),
+            )
+        else:
+            self.db.execute(
+                "UPDATE rungs SET status = 'completed', fitness = ?, map50 = ?, map50_95 = ?, weights = ?, "
+                "seconds = ? WHERE study = ? AND trial = ? AND rung = ?",
+                (
+                    result["fitness"],
+                    result["map50"],
+                    result["map50_95"],
+                    result["weights"],
+                    result["seconds"],
+                    self.name,
+                    trial,
+                    rung,
+                ),
+            )
+        self.db.commit()
+
+    def leaderboard(self) -> pd.DataFrame:
+        """Every trial's best completed rung, ranked by rung reached, then fitness."""
+        df = pd.read_sql_query(
+            "SELECT trial, rung, epochs, fitness, map50, map50_95, seconds FROM rungs "
+            "WHERE study = ? AND status = 'completed'",
+            self.db,
+            params=(self.name,),
+        )
+        if df.empty:
+            return df
+        df = df.sort_values(["rung", "fitness"], ascending=False).drop_duplicates("trial")
+        return df.reset_index(drop=True)
+
+
+def _train_rung(job: dict) -> dict:
+    """
+    Worker: trains one trial up to the epoch budget of one rung. Every rung
+    of a trial belongs to the same max-epoch run (same folder, optimizer and
+    learning rate schedule, as in train_final_champion.py): rung 0 starts it
+    from the pretrained weights, a promotion resumes it, and a callback
+    pauses it once the rung's budget is reached.
+    """
+    import torch
+    from ultralytics import YOLO
+
+    if job.get("threads"):
+        torch.set_num_threads(job["threads"])
+
+    start = time.perf_counter()
+    run_dir = Path(job["project"]) / job["name"]
+    budget = job["epochs"]
+    result = {"weights": str(run_dir / "weights" / "last.pt")}
+    # Already trained by a scheduler that stopped before saving the result
+    if completed_epochs(run_dir) >= budget:
+        return {**read_val_scores(run_dir, budget), **result, "seconds": 0.0}
+
+    checkpoint = resume_checkpoint(run_dir)
+    if checkpoint is None and run_dir.exists():
+        shutil.rmtree(run_dir)  # a partial run without a checkpoint would mix up results.csv
+
+    model = YOLO(str(checkpoint) if checkpoint else "yolov8l.pt")
+    if budget < job["max_epochs"]:
+        pause_at_epoch(model, budget)
+
+    if checkpoint is not None:
+        model.train(resume=True, device=job["device"])
+    else:
+        model.train(
+            data=job["data"],
+            epochs=job["max_epochs"],
+            device=job["device"],
+            workers=job["dataloader_workers"],
+            project=job["project"],
+            name=job["name"],
+            exist_ok=True,
+            **FIXED_TRAIN_ARGS,
+            **job["params"],
+        )
+    if budget >= job["max_epochs"]:
+        (run_dir / "weights" / ROUND_CHECKPOINT).unlink(missing_ok=True)
+    return {**read_val_scores(run_dir, budget), **result, "seconds": time.perf_counter() - start}
+
+
+def run_asha_tuning(
+    study_name: str,
+    max_trials: int,
+    min_epochs: int,
+    max_epochs: int,
+    eta: int,
+    workers: int,
+    devices,
+    dataloader_workers: int,
+    seed: int,
+):
+    """
+    Tunes the champion (YOLOv8l) hyperparameters with asynchronous successive
+    halving (ASHA). Trials train in parallel worker processes; each one first
+    gets `min_epochs`, and only the top 1/eta of the trials at every rung are
+    trained further (eta times the epochs), up to `max_epochs`. Poor
+    configurations are therefore stopped after a few epochs instead of being
+    trained fully, and a free worker never waits for a rung to fill up.
+
+    Each trial is one `max_epochs` run in 'runs/tuning/<study>/trial_XXXX'
+    that its rungs pause and resume, so trials are compared on the learning
+    rate schedule a full training run would give them.
+
+    Args:
+        study_name (str): Name of the study in the SQLite database; rerunning
+            with the same name resumes it.
+        max_trials (int): Number of configurations sampled in total.
+        min_epochs (int): Epoch budget of the first rung.
+        max_epochs (int): Epoch budget of the last rung.
+        eta (int): Reduction factor between rungs.
+        workers (int): Trials trained at the same time.
+        devices (list[str]): Devices the workers are spread over (e.g. ['0', '1'] or ['cpu']).
+        dataloader_workers (int): Dataloader processes of each trial.
+        seed (int): Seed of the configuration sampler.
+    """
+    # 1. Configuration
+    project_root = Path(__file__).resolve().parent.parent.parent
+    data_yaml_path = project_root / "data" / "final_dataset" / "final_dataset.yaml"
+    study_dir = project_root / "runs" / "tuning" / study_name
+    if not data_yaml_path.exists():
+        print(f"❌ ERROR: Dataset YAML file not found at {data_yaml_path}")
+        return
+    study_dir.mkdir(parents=True, exist_ok=True)
+
+    budgets = rung_budgets(min_epochs, max_epochs, eta)
+    settings = {"budgets": budgets, "eta": eta, "seed": seed, "data": str(data_yaml_path)}
+    study = AshaStudy(project_root / "runs" / "tuning" / "asha_studies.db", study_name, settings)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"--- ASHA study '{study_name}': rungs at {budgets} epochs, eta={eta}, {workers} parallel trials ---")
+
+    def make_job(trial: int, rung: int, slot: int) -> dict:
+        return {
+            "trial": trial,
+            "rung": rung,
+            "slot": slot,
+            "params": study.params(trial),
+            "epochs": budgets[rung],
+            "max_epochs": budgets[-1],
+            "data": str(data_yaml_path),
+            "device": devices[slot % len(devices)],
+            "dataloader_workers": dataloader_workers,
+            "threads": threads,
+            "project": str(study_dir),
+            "name": f"trial_{trial:04d}",
+        }
+
+    # 2. Keep every worker busy with the next promotion or a new trial
+    context = multiprocessing.get_context("spawn")
+    running = {}
+    free_slots = list(range(workers))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        while True:
+            while free_slots:
+                job = study.next_job(max_trials)
+                if job is None:
+                    break
+                trial, rung = job
+                study.start(trial, rung)
+                job = make_job(trial, rung, free_slots.pop())
+                running[pool.submit(_train_rung, job)] = job
+                print(f"  ▶ Trial {trial} rung {rung}: training to epoch {job['epochs']} on device {job['device']}")
+
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                free_slots.append(job["slot"])
+                try:
+                    result = future.result()
+                except Exception as e:
+                    study.finish(job["trial"], job["rung"], error=str(e))
+                    print(f"  ❌ Trial {job['trial']} rung {job['rung']} failed: {e}")
+                    continue
+                study.finish(job["trial"], job["rung"], result)
+                print(
+                    f"  ✅ Trial {job['trial']} rung {job['rung']} ({budgets[job['rung']]} epochs): "
+                    f"fitness {result['fitness']:.4f}, mAP50 {result['map50']:.4f}"
+                )
+
+    # 3. Report and save the best configuration
+    leaderboard = study.leaderboard()
+    if leaderboard.empty:
+        print("\n❌ No trial completed.")
+        return
+    print("\n--- Leaderboard (best rung per trial) ---")
+    print(leaderboard.head(10).to_string(index=False))
+
+    best = leaderboard.iloc[0]
+    best_params = {**FIXED_TRAIN_ARGS, **study.params(int(best["trial"]))}
+    best_path = study_dir / "best_hyperparameters.yaml"
+    with open(best_path, "w") as f:
+        f.write(f"# Trial {int(best['trial'])}: fitness {best['fitness']:.5f} after {int(best['epochs'])} epochs\n")
+        yaml.dump(best_params, f, sort_keys=False, default_flow_style=False)
+    leaderboard.to_csv(study_dir / "leaderboard.csv", index=False)
+    print(f"\n✅ Best hyperparameters saved to: {best_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Tune the champion's hyperparameters with parallel, early-stopping ASHA trials."
+    )
+    parser.add_argument("--study", type=str, default="yolov8l_asha", help="Study name (rerun to resume).")
+    parser.add_argument("--trials", type=int, default=27, help="Number of configurations to sample.")
+    parser.add_argument("--min-epochs", type=int, default=3, help="Epoch budget of the first rung.")
+    parser.add_argument("--max-epochs", type=int, default=27, help="Epoch budget of the last rung.")
+    parser.add_argument("--eta", type=int, default=3, help="Keep the top 1/eta of the trials at every rung.")
+    parser.add_argument("--workers", type=int, default=2, help="Trials trained in parallel.")
+    parser.add_argument(
+        "--devices",
+        type=str,
+        default=None,
+        help="Comma-separated devices for the workers, e.g. '0,1' or 'cpu' (default: cuda:0 if available).",
+    )
+    parser.add_argument("--dataloader-workers", type=int, default=2, help="Dataloader processes per trial.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the configuration sampler.")
+
+    args = parser.parse_args()
+    if args.devices is None:
+        import torch
+
+        args.devices = "0" if torch.cuda.is_available() else "cpu"
+    run_asha_tuning(
+        study_name=args.study,
+        max_trials=args.trials,
+        min_epochs=args.min_epochs,
+        max_epochs=args.max_epochs,
+        eta=args.eta,
+        workers=args.workers,
+        devices=args.devices.split(","),
+        dataloader_workers=args.dataloader_workers,
+        seed=args.seed,
+    )
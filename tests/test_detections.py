@@ -0,0 +1,88 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "testing"))
+
+from detections import (
+    DETECTION_DTYPE,
+    DETECTION_FORMATS,
+    DetectionWriter,
+    empty_detections,
+    iter_frame_detections,
+    load_detections,
+)
+
+
+def random_frames(num_frames=6, seed=0):
+    """Per-frame (N, 6) detection arrays, with some frames empty."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(num_frames):
+        n = rng.integers(0, 4)
+        xy = rng.uniform(0, 600, size=(n, 2))
+        wh = rng.uniform(5, 80, size=(n, 2))
+        frames.append(
+            np.concatenate(
+                [xy, xy + wh, rng.uniform(0.1, 1, size=(n, 1)), rng.integers(0, 7, size=(n, 1))], axis=1
+            ).astype(np.float32)
+        )
+    frames[2] = empty_detections()
+    return frames
+
+
+def write_detections(output_path, fmt, frames):
+    writer = DetectionWriter(output_path, fmt, {"video": "VID01.mp4", "fps": 25.0})
+    for frame_index, detections in enumerate(frames):
+        writer.write(frame_index, detections)
+    writer.close()
+
+
+def test_records_are_packed():
+    assert DETECTION_DTYPE.itemsize == 26
+
+
+@pytest.mark.parametrize("fmt", DETECTION_FORMATS)
+def test_round_trip(tmp_path, fmt):
+    frames = random_frames()
+    write_detections(tmp_path / "VID01", fmt, frames)
+
+    records, metadata = load_detections(tmp_path / "VID01")
+
+    assert metadata["format"] == fmt
+    assert metadata["video"] == "VID01.mp4"
+    assert metadata["frames"] == len(frames)
+    assert metadata["boxes"] == sum(len(d) for d in frames) == len(records)
+    # jsonl rounds confidences to 4 decimals and coordinates to 1
+    atol = 0.05 if fmt == "jsonl" else 0
+    for loaded, written in zip(iter_frame_detections(records, len(frames)), frames):
+        assert loaded.shape == written.shape
+        np.testing.assert_allclose(loaded, written, atol=atol)
+
+
+@pytest.mark.parametrize("fmt", DETECTION_FORMATS)
+def test_load_accepts_data_and_sidecar_paths(tmp_path, fmt):
+    frames = random_frames()
+    # Dots in the output name must survive the suffix handling
+    output_path = tmp_path / "case.01"
+    write_detections(output_path, fmt, frames)
+
+    expected, _ = load_detections(output_path)
+    data_suffix = ".jsonl" if fmt == "jsonl" else ".bin"
+    for path in [tmp_path / "case.01.json", tmp_path / f"case.01{data_suffix}"]:
+        records, metadata = load_detections(path)
+        assert metadata["format"] == fmt
+        np.testing.assert_array_equal(records, expected)
+
+
+@pytest.mark.parametrize("fmt", DETECTION_FORMATS)
+def test_video_without_boxes(tmp_path, fmt):
+    write_detections(tmp_path / "VID01", fmt, [empty_detections()] * 3)
+
+    records, metadata = load_detections(tmp_path / "VID01")
+
+    assert len(records) == 0 and records.dtype == DETECTION_DTYPE
+    assert metadata["frames"] == 3
+    assert [len(d) for d in iter_frame_detections(records, 3)] == [0, 0, 0]
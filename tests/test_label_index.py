@@ -0,0 +1,98 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "data_processing"))
+
+import label_index
+from label_index import build_label_index
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Records which label files build_label_index actually parses."""
+    calls = []
+    parse = label_index._parse_label_file
+
+    def recording_parse(label_file):
+        calls.append(Path(label_file).name)
+        return parse(label_file)
+
+    monkeypatch.setattr(label_index, "_parse_label_file", recording_parse)
+    return calls
+
+
+def write_label(path: Path, text: str, mtime_ns: int):
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def labels(tmp_path):
+    label_dir = tmp_path / "labels"
+    label_dir.mkdir()
+    write_label(label_dir / "VID01_000001.txt", "0 0.5 0.5 0.1 0.1\n2 0.2 0.2 0.1 0.1\n", 10**18)
+    write_label(label_dir / "VID01_000002.txt", "1 0.5 0.5 0.2 0.2\nbad line\n", 10**18)
+    write_label(label_dir / "VID02_000001.txt", "", 10**18)
+    return label_dir
+
+
+def assert_same_index(a, b):
+    for name in ["files", "row_counts", "videos", "frame_video", "class_id", "boxes", "frame_id", "video_id"]:
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name), err_msg=name)
+
+
+def test_first_build_parses_every_file(labels, tmp_path, parsed):
+    index = build_label_index(labels.glob("*.txt"), tmp_path / "index.npz")
+
+    assert sorted(parsed) == ["VID01_000001.txt", "VID01_000002.txt", "VID02_000001.txt"]
+    assert index.videos.tolist() == ["VID01", "VID02"]
+    assert index.row_counts.tolist() == [2, 1, 0]
+    assert index.frame_class_counts(num_classes=3).tolist() == [[1, 0, 1], [0, 1, 0], [0, 0, 0]]
+    assert index.video_class_counts(num_classes=3).tolist() == [[1, 1, 1], [0, 0, 0]]
+
+
+def test_unchanged_files_are_not_reparsed_or_rewritten(labels, tmp_path, parsed):
+    index_path = tmp_path / "index.npz"
+    first = build_label_index(labels.glob("*.txt"), index_path)
+    written = index_path.stat().st_mtime_ns
+    parsed.clear()
+
+    second = build_label_index(labels.glob("*.txt"), index_path)
+
+    assert parsed == []
+    assert index_path.stat().st_mtime_ns == written
+    assert_same_index(first, second)
+
+
+def test_refresh_reparses_only_changed_and_new_files(labels, tmp_path, parsed):
+    index_path = tmp_path / "index.npz"
+    build_label_index(labels.glob("*.txt"), index_path)
+    parsed.clear()
+
+    write_label(labels / "VID01_000002.txt", "2 0.5 0.5 0.2 0.2\n2 0.1 0.1 0.1 0.1\n", 2 * 10**18)
+    write_label(labels / "VID03_000001.txt", "0 0.5 0.5 0.3 0.3\n", 10**18)
+    (labels / "VID02_000001.txt").unlink()
+
+    refreshed = build_label_index(labels.glob("*.txt"), index_path)
+
+    assert sorted(parsed) == ["VID01_000002.txt", "VID03_000001.txt"]
+    assert refreshed.videos.tolist() == ["VID01", "VID03"]
+    assert refreshed.frame_class_counts(num_classes=3).tolist() == [[1, 0, 1], [0, 0, 2], [1, 0, 0]]
+    # The refreshed index is saved, and equals one built from scratch
+    assert_same_index(refreshed, build_label_index(labels.glob("*.txt"), index_path))
+    assert_same_index(refreshed, build_label_index(labels.glob("*.txt"), tmp_path / "fresh.npz"))
+
+
+def test_stale_index_version_is_rebuilt(labels, tmp_path, parsed, monkeypatch):
+    index_path = tmp_path / "index.npz"
+    build_label_index(labels.glob("*.txt"), index_path)
+    parsed.clear()
+
+    monkeypatch.setattr(label_index, "INDEX_VERSION", label_index.INDEX_VERSION + 1)
+    build_label_index(labels.glob("*.txt"), index_path)
+
+    assert len(parsed) == 3
@@ -0,0 +1,98 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "data_processing"))
+
+from near_duplicates import cluster_near_duplicates, hamming_distances, select_representatives
+
+
+def clustering_reference(hashes, groups, order, max_distance):
+    """Plain leader clustering: closest leader of the same group, first one on ties."""
+    bits = np.unpackbits(hashes, axis=1)
+    cluster = {}
+    distance = {}
+    leaders = []
+    for frame in order:
+        candidates = [(int((bits[leader] != bits[frame]).sum()), c) for c, leader in enumerate(leaders)
+                      if groups[leader] == groups[frame]]
+        if candidates:
+            d, c = min(candidates)
+            if d <= max_distance:
+                cluster[frame], distance[frame] = c, d
+                continue
+        cluster[frame], distance[frame] = len(leaders), 0
+        leaders.append(frame)
+    n = len(hashes)
+    return [cluster[f] for f in range(n)], leaders, [distance[f] for f in range(n)]
+
+
+def test_hamming_distances():
+    hashes = np.array([[0b00000000], [0b11110000], [0b10101010]], dtype=np.uint8)
+    assert hamming_distances(hashes, np.array([0b11110000], dtype=np.uint8)).tolist() == [4, 0, 4]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_distance", [0, 6, 20])
+def test_clustering_matches_reference(seed, max_distance):
+    rng = np.random.default_rng(seed)
+    # A few base hashes with noisy copies, so clusters of several frames form
+    bases = rng.integers(0, 256, size=(6, 8), dtype=np.uint8)
+    bits = np.unpackbits(bases[rng.integers(0, 6, size=120)], axis=1)
+    bits ^= (rng.random(bits.shape) < 0.05).astype(np.uint8)
+    hashes = np.packbits(bits, axis=1)
+    groups = rng.integers(0, 3, size=120)
+    order = rng.permutation(120)
+
+    cluster, leaders, distance = cluster_near_duplicates(hashes, groups, order, max_distance)
+    ref_cluster, ref_leaders, ref_distance = clustering_reference(hashes, groups, order, max_distance)
+
+    assert cluster.tolist() == ref_cluster
+    assert leaders.tolist() == ref_leaders
+    assert distance.tolist() == ref_distance
+    # Clusters never mix groups, and every leader leads its own cluster
+    assert (groups == groups[leaders[cluster]]).all()
+    assert (cluster[leaders] == np.arange(len(leaders))).all()
+
+
+def test_identical_frames_of_different_groups_stay_apart():
+    hashes = np.zeros((4, 8), dtype=np.uint8)
+    cluster, leaders, _ = cluster_near_duplicates(hashes, np.array([0, 1, 0, 1]), np.arange(4), 0)
+    assert cluster.tolist() == [0, 1, 0, 1]
+    assert leaders.tolist() == [0, 1]
+
+
+def test_representatives_without_top_up_are_the_leaders():
+    frame_counts = np.array([[1, 0], [1, 0], [0, 1], [0, 1]])
+    kept = select_representatives(frame_counts, np.array([2, 0]), np.array([0, 3, 0, 5]), min_class_ratio=0)
+    assert kept.tolist() == [0, 2]
+
+
+def test_top_up_restores_thinned_classes_most_distinct_first():
+    # Class 0 keeps all of its frames as leaders; class 1 collapses into one cluster
+    frame_counts = np.array([[1, 0]] * 4 + [[0, 1]] * 4)
+    leaders = np.array([0, 1, 2, 3, 4])
+    distance = np.array([0, 0, 0, 0, 0, 2, 9, 5])
+
+    kept = select_representatives(frame_counts, leaders, distance, min_class_ratio=1.0)
+
+    # 5 of 8 instances kept overall, so class 1 needs ceil(5/8 * 4) = 3 instances
+    assert frame_counts[kept].sum(axis=0).tolist() == [4, 3]
+    assert kept.tolist() == [0, 1, 2, 3, 4, 6, 7]
+
+
+def test_top_up_reaches_every_class_target():
+    rng = np.random.default_rng(0)
+    frame_counts = rng.poisson(0.4, size=(300, 5)) * (rng.random((300, 5)) < [0.9, 0.5, 0.2, 0.1, 0.05])
+    leaders = np.sort(rng.choice(300, 60, replace=False))
+    distance = rng.integers(0, 10, size=300)
+    distance[leaders] = 0
+
+    kept = select_representatives(frame_counts, leaders, distance, min_class_ratio=1.0)
+
+    assert np.isin(leaders, kept).all()
+    totals = frame_counts.sum(axis=0)
+    share = frame_counts[leaders].sum() / totals.sum()
+    assert (frame_counts[kept].sum(axis=0) >= np.ceil(share * totals)).all()
@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "training"))
+
+from packed_dataset import ShardStreamSampler
+
+
+def make_sampler(shard_sizes, batch_size=4, num_workers=3, buffer_size=16, seed=0):
+    shard_of = np.repeat(np.arange(len(shard_sizes)), shard_sizes)
+    offset_of = np.concatenate([np.arange(n) for n in shard_sizes])
+    # Shuffle the dataset order so the sampler cannot rely on it
+    perm = np.random.default_rng(1).permutation(len(shard_of))
+    return ShardStreamSampler(shard_of[perm], offset_of[perm], batch_size, num_workers, buffer_size, seed)
+
+
+def worker_indices(sampler, passes):
+    """Deals the batches of consecutive passes to workers like InfiniteDataLoader does."""
+    per_pass = []
+    batch_count = 0
+    for _ in range(passes):
+        workers = [[] for _ in range(sampler.num_streams)]
+        indices = list(sampler)
+        for start in range(0, len(indices), sampler.batch_size):
+            workers[batch_count % sampler.num_streams] += indices[start : start + sampler.batch_size]
+            batch_count += 1
+        per_pass.append(workers)
+    return per_pass
+
+
+@pytest.mark.parametrize("shard_sizes", [[50] * 8, [37, 5, 90, 12, 61, 1, 44]])
+def test_len_matches_iteration(shard_sizes):
+    sampler = make_sampler(shard_sizes)
+    indices = list(sampler)
+    assert len(indices) == len(sampler)
+    assert len(sampler) % (sampler.batch_size * sampler.num_streams) == 0
+    assert sum(shard_sizes) <= len(sampler) < sum(shard_sizes) + sampler.batch_size * sampler.num_streams
+
+
+@pytest.mark.parametrize("shard_sizes", [[50] * 8, [37, 5, 90, 12, 61, 1, 44]])
+def test_every_index_every_epoch(shard_sizes):
+    sampler = make_sampler(shard_sizes)
+    first, second = list(sampler), list(sampler)
+    assert set(first) == set(second) == set(range(sum(shard_sizes)))
+    assert first != second
+
+
+@pytest.mark.parametrize("shard_sizes", [[50] * 8, [37, 5, 90, 12, 61, 1, 44]])
+def test_workers_read_disjoint_runs_across_passes(shard_sizes):
+    sampler = make_sampler(shard_sizes, num_workers=4)
+    for workers in worker_indices(sampler, passes=2):
+        seen = set()
+        for indices in workers:
+            assert len(indices) == len(sampler) // sampler.num_streams
+            assert seen.isdisjoint(indices)
+            seen.update(indices)
+
+
+def test_whole_shards_stay_with_one_worker():
+    # 8 shards of 50 frames over 4 workers: each worker owns exactly two shards
+    sampler = make_sampler([50] * 8, batch_size=5, num_workers=4)
+    for workers in worker_indices(sampler, passes=2):
+        shards = [set(sampler.shard_of[indices].tolist()) for indices in workers]
+        assert all(len(owned) == 2 for owned in shards)
+        assert set().union(*shards) == set(range(8))
+
+
+def test_buffers_read_frames_in_shard_order():
+    # A shuffle buffer holds buffer_size consecutive frames of the worker's run
+    sampler = make_sampler([64] * 4, batch_size=4, num_workers=1, buffer_size=16)
+    indices = np.asarray(list(sampler))
+    positions = sampler.shard_of[indices] * 64 + sampler.offset_of[indices]
+    for start in range(0, len(indices), 16):
+        buffer = positions[start : start + 16]
+        assert buffer.max() - buffer.min() == 15
@@ -0,0 +1,73 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "data_processing"))
+
+from split_files import file_signature, image_to_label_path, sync_split_files
+
+
+def desired_for(source: Path, use_hash: bool) -> dict:
+    return {"images/train/a.png": {"source": str(source), "split": "train", **file_signature(source, use_hash)}}
+
+
+def touch(path: Path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_sync_places_and_skips_unchanged(tmp_path):
+    source = tmp_path / "src.png"
+    source.write_bytes(b"pixels")
+    out = tmp_path / "out"
+
+    first = desired_for(source, False)
+    assert sync_split_files(out, first, {}, "copy")["added"] == 1
+    assert (out / "images/train/a.png").read_bytes() == b"pixels"
+    assert sync_split_files(out, first, first, "copy")["unchanged"] == 1
+
+    touch(source)
+    assert sync_split_files(out, desired_for(source, False), first, "copy")["updated"] == 1
+
+
+def test_hash_ignores_touched_identical_files(tmp_path):
+    source = tmp_path / "src.png"
+    source.write_bytes(b"pixels")
+    out = tmp_path / "out"
+    first = desired_for(source, True)
+    sync_split_files(out, first, {}, "copy")
+
+    touch(source)
+    assert sync_split_files(out, desired_for(source, True), first, "copy")["unchanged"] == 1
+
+    source.write_bytes(b"other!")
+    stats = sync_split_files(out, desired_for(source, True), first, "copy")
+    assert stats["updated"] == 1
+    assert (out / "images/train/a.png").read_bytes() == b"other!"
+
+
+def test_toggling_hash_keeps_files(tmp_path):
+    source = tmp_path / "src.png"
+    source.write_bytes(b"pixels")
+    out = tmp_path / "out"
+    plain = desired_for(source, False)
+    sync_split_files(out, plain, {}, "copy")
+
+    hashed = desired_for(source, True)
+    assert sync_split_files(out, hashed, plain, "copy")["unchanged"] == 1
+    assert sync_split_files(out, plain, hashed, "copy")["unchanged"] == 1
+
+
+def test_removed_targets(tmp_path):
+    source = tmp_path / "src.png"
+    source.write_bytes(b"pixels")
+    out = tmp_path / "out"
+    first = desired_for(source, False)
+    sync_split_files(out, first, {}, "copy")
+    assert sync_split_files(out, {}, first, "copy")["removed"] == 1
+    assert not (out / "images/train/a.png").exists()
+
+
+def test_image_to_label_path():
+    assert image_to_label_path(Path("/d/images/train/x.png")) == Path("/d/labels/train/x.txt")
+    assert image_to_label_path(Path("/images/d/images/train/x.png")) == Path("/images/d/labels/train/x.txt")
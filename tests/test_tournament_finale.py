@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "testing"))
+
+from run_tournament_finale import pareto_front, recommend_champion
+
+
+def results(rows):
+    return pd.DataFrame(rows, columns=["Model", "mAP50", "Latency p50 (ms)"]).set_index("Model")
+
+
+def test_pareto_front_drops_dominated_models():
+    df = results([
+        ("YOLOv8n", 0.40, 2.0),
+        ("YOLOv8s", 0.50, 4.0),
+        ("YOLOv8m", 0.45, 6.0),  # slower and less accurate than s
+        ("YOLOv8l", 0.60, 9.0),
+        ("YOLOv8x", 0.60, 12.0),  # as accurate as l, but slower
+    ])
+    assert pareto_front(df).to_dict() == {
+        "YOLOv8n": True, "YOLOv8s": True, "YOLOv8m": False, "YOLOv8l": True, "YOLOv8x": False,
+    }
+
+
+def test_pareto_front_keeps_exact_ties():
+    df = results([("A", 0.5, 3.0), ("B", 0.5, 3.0)])
+    assert pareto_front(df).all()
+
+
+def test_pareto_front_matches_pairwise_definition():
+    rng = np.random.default_rng(0)
+    df = results([(f"M{i}", *values) for i, values in enumerate(rng.random((40, 2)).round(1))])
+    accuracy, latency = df["mAP50"].to_numpy(), df["Latency p50 (ms)"].to_numpy()
+    expected = [
+        not any(
+            accuracy[j] >= accuracy[i] and latency[j] <= latency[i]
+            and (accuracy[j] > accuracy[i] or latency[j] < latency[i])
+            for j in range(len(df))
+        )
+        for i in range(len(df))
+    ]
+    assert pareto_front(df).tolist() == expected
+
+
+def test_recommend_most_accurate_within_budget():
+    df = results([("YOLOv8n", 0.40, 2.0), ("YOLOv8s", 0.50, 4.0), ("YOLOv8l", 0.60, 9.0)])
+    assert recommend_champion(df)[0] == "YOLOv8l"
+    assert recommend_champion(df, latency_budget_ms=5.0)[0] == "YOLOv8s"
+
+
+def test_recommend_fastest_within_tolerance():
+    df = results([("YOLOv8n", 0.40, 2.0), ("YOLOv8s", 0.595, 4.0), ("YOLOv8l", 0.60, 9.0)])
+    champion, reason = recommend_champion(df, accuracy_tolerance=0.01)
+    assert champion == "YOLOv8s"
+    assert "YOLOv8l" in reason
+
+
+def test_recommend_fastest_when_nothing_fits_the_budget():
+    df = results([("YOLOv8s", 0.50, 4.0), ("YOLOv8l", 0.60, 9.0)])
+    champion, reason = recommend_champion(df, latency_budget_ms=1.0)
+    assert champion == "YOLOv8s"
+    assert "budget" in reason
+
+
+def test_recommend_without_latency_uses_accuracy():
+    df = results([("YOLOv8s", 0.50, np.nan), ("YOLOv8l", 0.60, np.nan)])
+    assert recommend_champion(df)[0] == "YOLOv8l"
+    df = df.drop(columns="Latency p50 (ms)")
+    assert recommend_champion(df)[0] == "YOLOv8l"
+
+
+def test_recommend_ignores_models_without_latency():
+    df = results([("YOLOv8s", 0.50, 4.0), ("YOLOv8x", 0.70, np.nan)])
+    assert recommend_champion(df)[0] == "YOLOv8s"
@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "training"))
+
+from training_runs import ROUND_CHECKPOINT, completed_epochs, pause_at_epoch, read_val_scores
+
+
+class FakeModel:
+    def __init__(self):
+        self.callbacks = {}
+
+    def add_callback(self, event, fn):
+        self.callbacks.setdefault(event, []).append(fn)
+
+
+class FakeTrainer:
+    """Replays the checkpoint and callback order of Ultralytics' BaseTrainer."""
+
+    def __init__(self, model, weights_dir: Path, epochs: int):
+        self.model, self.epochs, self.stop = model, epochs, False
+        self.last = weights_dir / "last.pt"
+
+    def run_callbacks(self, event):
+        for fn in self.model.callbacks.get(event, []):
+            fn(self)
+
+    def train(self):
+        for self.epoch in range(self.epochs):
+            self.last.write_text(f"epoch={self.epoch} optimizer")
+            self.run_callbacks("on_fit_epoch_end")
+            if self.stop:
+                break
+        # final_eval(): strips last.pt, then fires on_fit_epoch_end at epoch + 1
+        self.last.write_text("epoch=-1")
+        self.epoch += 1
+        self.run_callbacks("on_fit_epoch_end")
+        self.epoch -= 1
+
+
+def test_pause_keeps_the_resumable_checkpoint(tmp_path):
+    model = FakeModel()
+    pause_at_epoch(model, 10)
+    trainer = FakeTrainer(model, tmp_path, epochs=50)
+    trainer.train()
+
+    assert trainer.epoch == 9
+    assert (tmp_path / ROUND_CHECKPOINT).read_text() == "epoch=9 optimizer"
+    assert (tmp_path / "last.pt").read_text() == "epoch=-1"
+
+
+def test_pause_on_the_last_epoch_of_a_shorter_run(tmp_path):
+    model = FakeModel()
+    pause_at_epoch(model, 3)
+    FakeTrainer(model, tmp_path, epochs=3).train()
+    assert (tmp_path / ROUND_CHECKPOINT).read_text() == "epoch=2 optimizer"
+
+
+def write_results(run_dir: Path, map50, map50_95):
+    run_dir.mkdir(parents=True, exist_ok=True)
+    # Ultralytics pads the column names with spaces
+    columns = {"      epoch": range(1, len(map50) + 1), "  metrics/mAP50(B)": map50, "  metrics/mAP50-95(B)": map50_95}
+    pd.DataFrame(columns).to_csv(run_dir / "results.csv", index=False)
+
+
+def test_read_val_scores_limits_epochs(tmp_path):
+    write_results(tmp_path, [0.5, 0.6, 0.9], [0.3, 0.4, 0.7])
+    scores = read_val_scores(tmp_path, 2)
+    assert scores["epochs"] == 2
+    assert scores["map50"] == 0.6
+    assert abs(scores["fitness"] - (0.1 * 0.6 + 0.9 * 0.4)) < 1e-9
+    assert read_val_scores(tmp_path)["map50_95"] == 0.7
+
+
+def test_completed_epochs(tmp_path):
+    assert completed_epochs(tmp_path) == 0
+    write_results(tmp_path, [0.1, 0.2], [0.1, 0.2])
+    assert completed_epochs(tmp_path) == 2
@@ -0,0 +1,85 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "data_processing"))
+
+from undersampling import rarity_order, select_balanced_frames
+
+
+def greedy_reference(frame_counts, ceilings=None, floors=None, seed=0, keep_background=True):
+    """The original per-frame loop, visiting frames in rarity order, with floors filled first."""
+    num_frames, num_classes = frame_counts.shape
+    ceilings = [np.inf] * num_classes if ceilings is None else list(np.broadcast_to(ceilings, (num_classes,)))
+    floors = [0] * num_classes if floors is None else list(np.broadcast_to(floors, (num_classes,)))
+    order = rarity_order(frame_counts, seed=seed)
+    selected = set()
+    totals = np.zeros(num_classes, dtype=np.int64)
+
+    for class_id in np.argsort(frame_counts.sum(axis=0), kind="stable"):
+        for frame in order:
+            if totals[class_id] >= floors[class_id]:
+                break
+            if frame not in selected and frame_counts[frame, class_id] > 0:
+                selected.add(frame)
+                totals += frame_counts[frame]
+
+    for frame in order:
+        if frame in selected:
+            continue
+        counts = frame_counts[frame]
+        if not counts.any():
+            if keep_background:
+                selected.add(frame)
+            continue
+        if all(totals[c] + counts[c] <= ceilings[c] for c in np.flatnonzero(counts)):
+            selected.add(frame)
+            totals += counts
+
+    return np.array(sorted(selected), dtype=np.int64)
+
+
+def random_counts(num_frames, num_classes, seed):
+    rng = np.random.default_rng(seed)
+    counts = rng.poisson(rng.uniform(0.05, 1.5, num_classes), size=(num_frames, num_classes))
+    return counts.astype(np.int32)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize(
+    "ceilings, floors",
+    [
+        (40, None),
+        ([5, 30, 80, 10], None),
+        ([5, 30, 80, 10], [0, 60, 0, 0]),
+        (None, None),
+        (None, [20, 0, 0, 5]),
+    ],
+)
+def test_matches_greedy_loop(seed, ceilings, floors):
+    frame_counts = random_counts(400, 4, seed)
+    expected = greedy_reference(frame_counts, ceilings, floors, seed=seed)
+    actual = select_balanced_frames(frame_counts, ceilings, floors=floors, seed=seed)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_floor_over_ceiling_keeps_other_classes():
+    frame_counts = np.zeros((100, 3), dtype=np.int32)
+    frame_counts[:50, 1] = 1
+    frame_counts[50:, 2] = 1
+    selected = select_balanced_frames(frame_counts, [8, 100, 100], floors=[0, 10, 0])
+    assert np.count_nonzero(frame_counts[selected, 2]) == 50
+
+
+def test_no_ceiling_selects_everything():
+    frame_counts = np.ones((1000, 3), dtype=np.int32)
+    assert select_balanced_frames(frame_counts, None).size == 1000
+
+
+def test_background_frames():
+    frame_counts = np.zeros((10, 2), dtype=np.int32)
+    frame_counts[:4, 0] = 1
+    assert select_balanced_frames(frame_counts, 2).size == 8
+    assert select_balanced_frames(frame_counts, 2, keep_background=False).size == 2